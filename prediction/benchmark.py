@@ -0,0 +1,525 @@
+"""
+합성 데이터 기반 나이 예측 파이프라인 벤치마크
+
+네트워크 없이 실행할 수 있도록 policemonitor_* 형식의 합성 사용자 폴더를 만들고
+DataProcessor(main.py 경로)와 generate_report(generate_age_report.py 경로)를
+스텁 또는 실제 모델로 끝까지 실행해 처리량(images/sec), 단계별 지연 시간,
+최대 RSS를 측정합니다. 시나리오마다 별도 프로세스에서 실행하므로 최대 RSS가
+서로 섞이지 않습니다.
+
+사용 예:
+    python benchmark.py --stub
+    python benchmark.py --stub --users 50 --images-per-user 40 --save-baseline benchmarks/baseline.json
+    python benchmark.py --stub --baseline benchmarks/baseline.json
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import multiprocessing as mp
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import yaml
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    import resource
+except ImportError:  # Windows에는 resource 모듈이 없음
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 얼굴이 있는 합성 이미지의 상단 우측에 그리는 표식 (스텁 모델이 얼굴 유무 판단에 사용)
+FACE_MARKER_COLOR = (0, 255, 0)
+FACE_MARKER_BOX = (0.95, 0.01, 0.99, 0.05)  # (x0, y0, x1, y1) 비율
+
+# 합성 얼굴 위치 (x, y 비율과 이미지 너비 대비 한 변 비율)
+FACE_BOX = (0.3, 0.35, 0.4)
+
+SCENARIOS = ('processor', 'report')
+
+def parse_resolutions(text: str) -> List[Tuple[int, int]]:
+    """'1080x2340,720x1600' 형식의 해상도 목록을 파싱합니다."""
+    resolutions = []
+    for item in text.split(','):
+        width, height = item.lower().strip().split('x')
+        resolutions.append((int(width), int(height)))
+    return resolutions
+
+def face_box_for(width: int, height: int) -> List[int]:
+    """이미지 크기에 대한 합성 얼굴 영역 (x, y, width, height)을 반환합니다."""
+    x_ratio, y_ratio, size_ratio = FACE_BOX
+    size = int(width * size_ratio)
+    return [int(width * x_ratio), int(height * y_ratio), size, size]
+
+def has_face_marker(image: Image.Image) -> bool:
+    """합성 이미지에 얼굴 표식이 있는지 확인합니다. (축소 디코딩과 JPEG 손실에도 유지됨)"""
+    width, height = image.size
+    x0, y0, x1, y1 = FACE_MARKER_BOX
+    pixel = image.convert('RGB').getpixel((int(width * (x0 + x1) / 2), int(height * (y0 + y1) / 2)))
+    return pixel[1] > 200 and pixel[0] < 80 and pixel[2] < 80
+
+def _load_font(size: int):
+    """기본 글꼴을 size 크기로 로드합니다. (Pillow 10.1 미만은 고정 크기)"""
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+def load_sample_faces(faces_dir: Optional[str]) -> List[Image.Image]:
+    """붙여 넣을 샘플 얼굴 이미지들을 로드합니다."""
+    if not faces_dir:
+        return []
+    faces = []
+    for name in sorted(os.listdir(faces_dir)):
+        if os.path.splitext(name)[1].lower() in ('.jpg', '.jpeg', '.png', '.webp'):
+            with Image.open(os.path.join(faces_dir, name)) as face:
+                faces.append(face.convert('RGB'))
+    return faces
+
+def draw_synthetic_face(size: int, rng: random.Random) -> Image.Image:
+    """샘플 얼굴이 없을 때 사용할 단순한 얼굴 그림을 생성합니다."""
+    skin = (rng.randint(170, 240), rng.randint(120, 190), rng.randint(90, 150))
+    face = Image.new('RGB', (size, size), (rng.randint(0, 80),) * 3)
+    draw = ImageDraw.Draw(face)
+    draw.ellipse((size * 0.15, size * 0.05, size * 0.85, size * 0.95), fill=skin)
+    for eye_x in (0.35, 0.65):
+        draw.ellipse((size * (eye_x - 0.06), size * 0.35, size * (eye_x + 0.06), size * 0.45), fill=(40, 30, 30))
+    draw.rectangle((size * 0.47, size * 0.45, size * 0.53, size * 0.6), fill=tuple(c - 30 for c in skin))
+    draw.arc((size * 0.35, size * 0.6, size * 0.65, size * 0.78), 20, 160, fill=(120, 40, 40), width=max(1, size // 40))
+    return face
+
+def render_capture(fb_uid: str, nick: str, size: Tuple[int, int], with_face: bool,
+                   sample_faces: List[Image.Image], rng: random.Random, header_ratio: float) -> Image.Image:
+    """
+    사용자 정보 헤더와 (선택적으로) 얼굴이 있는 합성 캡처를 생성합니다.
+
+    Args:
+        fb_uid: 사용자 ID
+        nick: 헤더에 쓸 닉네임
+        size: (너비, 높이)
+        with_face: 얼굴을 넣을지 여부
+        sample_faces: 붙여 넣을 샘플 얼굴 (없으면 얼굴을 그림)
+        rng: 난수 생성기
+        header_ratio: 헤더 영역 높이 비율
+
+    Returns:
+        Image.Image: 합성 캡처
+    """
+    width, height = size
+    background = tuple(rng.randint(40, 220) for _ in range(3))
+    image = Image.new('RGB', size, background)
+    draw = ImageDraw.Draw(image)
+
+    # 본문 영역에 채팅 말풍선처럼 보이는 사각형들
+    y = int(height * header_ratio) + 10
+    while y < height - 40:
+        box_height = rng.randint(height // 40, height // 12)
+        x0 = rng.randint(0, width // 3)
+        draw.rectangle((x0, y, rng.randint(x0 + width // 4, width), y + box_height),
+                       fill=tuple(rng.randint(0, 255) for _ in range(3)))
+        y += box_height + rng.randint(5, height // 30)
+
+    # 헤더 (OCR 대상)
+    header_height = int(height * header_ratio)
+    draw.rectangle((0, 0, width, header_height), fill=(255, 255, 255))
+    font = _load_font(max(12, header_height // 6))
+    draw.text((width * 0.03, header_height * 0.15), f"fbUid: {fb_uid}, nick: {nick}", fill=(0, 0, 0), font=font)
+    draw.text((width * 0.03, header_height * 0.55), "country: kr, gender: male", fill=(0, 0, 0), font=font)
+
+    if with_face:
+        x, y, face_size, _ = face_box_for(width, height)
+        face = rng.choice(sample_faces) if sample_faces else draw_synthetic_face(face_size, rng)
+        image.paste(face.resize((face_size, face_size), Image.BILINEAR), (x, y))
+        x0, y0, x1, y1 = FACE_MARKER_BOX
+        draw.rectangle((width * x0, height * y0, width * x1, height * y1), fill=FACE_MARKER_COLOR)
+
+    return image
+
+def generate_dataset(root: str, spec: Dict) -> str:
+    """
+    policemonitor_* 형식의 합성 데이터 폴더를 생성합니다.
+    같은 사양의 데이터가 이미 있으면 다시 만들지 않습니다.
+
+    Args:
+        root: 데이터 폴더를 만들 상위 경로
+        spec: users, images_per_user, resolutions, face_share, faces_dir, seed, header_ratio
+
+    Returns:
+        str: 사용자 폴더들이 있는 데이터 경로
+    """
+    start = datetime(2024, 12, 16)
+    end = start + timedelta(days=6)
+    data_path = os.path.join(root, f"policemonitor_{start:%Y%m%d}-{end:%Y%m%d}")
+    spec_file = os.path.join(root, 'dataset.json')
+    if os.path.exists(spec_file) and os.path.isdir(data_path):
+        with open(spec_file, 'r', encoding='utf-8') as f:
+            if json.load(f) == spec:
+                return data_path
+
+    rng = random.Random(spec['seed'])
+    sample_faces = load_sample_faces(spec['faces_dir'])
+    resolutions = parse_resolutions(spec['resolutions'])
+
+    for user_index in range(spec['users']):
+        fb_uid = f"{100000000000000 + user_index}"
+        user_dir = os.path.join(data_path, fb_uid)
+        os.makedirs(user_dir, exist_ok=True)
+        for image_index in range(spec['images_per_user']):
+            date = start + timedelta(days=image_index)
+            image = render_capture(
+                fb_uid, f"bench{user_index}", rng.choice(resolutions),
+                rng.random() < spec['face_share'], sample_faces, rng, spec['header_ratio']
+            )
+            image.save(os.path.join(user_dir, f"{fb_uid}_{date:%Y%m%d}.jpg"), quality=90)
+
+    with open(spec_file, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, indent=2)
+    return data_path
+
+class StubFaceDetector:
+    """합성 이미지의 얼굴 표식으로 얼굴 영역을 돌려주는 스텁 얼굴 감지기"""
+
+    method = 'stub'
+
+    def detect_faces(self, image: Image.Image) -> tuple:
+        if not has_face_marker(image):
+            return False, []
+        return True, [face_box_for(*image.size)]
+
+    def crop_face(self, image: Image.Image, face_box: tuple) -> Image.Image:
+        x, y, width, height = face_box
+        return image.crop((x, y, x + width, y + height))
+
+def _stub_age(image: Image.Image) -> float:
+    """크롭의 평균 밝기로 결정적인 나이 값을 만듭니다."""
+    return 10 + float(np.asarray(image.resize((8, 8))).mean()) / 255 * 40
+
+class StubAgePredictor:
+    """AgePredictor와 같은 형식의 결과를 돌려주는 스텁 나이 예측기"""
+
+    model_name = 'stub'
+
+    def predict_age(self, image: Image.Image, user_info: Optional[Dict] = None) -> dict:
+        return self.predict_batch([image], [user_info] if user_info else None)[0]
+
+    def predict_batch(self, images: List[Image.Image], user_infos: Optional[List[Dict]] = None) -> List[Dict]:
+        results = []
+        for i, image in enumerate(images):
+            age = int(_stub_age(image))
+            result = {
+                'age': age,
+                'age_range': (age - 2, age + 2),
+                'age_label': 'stub',
+                'confidence': 0.9
+            }
+            if user_infos and i < len(user_infos):
+                result.update(user_infos[i])
+            results.append(result)
+        return results
+
+class StubDeepFacePredictor:
+    """DeepFaceAgePredictor와 같은 형식의 결과를 돌려주는 스텁 예측기 (generate_report용)"""
+
+    def __init__(self, config: dict):
+        self.UNDERAGE_MAX = config['age_detection']['underage_threshold']
+        self.crop_mode = config['age_detection'].get('crop_mode', False)
+        self.cache_namespace = 'age:stub'
+        self.crop_cache_namespace = 'age:stub:crop'
+
+    def _result(self, image: Image.Image) -> dict:
+        age = _stub_age(image)
+        return {
+            'has_face': True,
+            'predicted_age': age,
+            'age_range': f"{int(age) - 2}-{int(age) + 2}",
+            'age_group': 'underage' if age < self.UNDERAGE_MAX else 'adult',
+            'confidence': 0.9,
+            'is_reliable': True,
+            'is_underage': age < self.UNDERAGE_MAX,
+            'face_count': 1
+        }
+
+    def predict_age(self, image: Image.Image, user_info: Optional[Dict] = None, pre_detected: bool = False) -> dict:
+        if not pre_detected and not has_face_marker(image):
+            return {
+                'has_face': False, 'predicted_age': None, 'age_range': None, 'age_group': None,
+                'confidence': None, 'is_reliable': False, 'is_underage': None
+            }
+        return self._result(image)
+
+    def predict_batch(self, images: List[Image.Image], user_infos: Optional[List[Dict]] = None,
+                      pre_detected: bool = False) -> List[Dict]:
+        return [self.predict_age(image, pre_detected=pre_detected) for image in images]
+
+def make_stub_processor(config: dict, device):
+    """스텁 모델을 사용하는 DataProcessor를 생성합니다. (워커 프로세스에서도 사용)"""
+    from src.data_processor import DataProcessor
+    from src.ocr_engine import OCREngine
+
+    class StubOCREngine(OCREngine):
+        """헤더 디코딩과 전처리는 그대로 하고 tesseract 호출만 생략하는 OCR 엔진"""
+
+        def _recognize(self, image: Image.Image) -> str:
+            return "nick: bench, country: kr, gender: male"
+
+    return DataProcessor(config, device, StubFaceDetector(), StubAgePredictor(), StubOCREngine(config))
+
+def peak_rss_mb() -> Dict[str, Optional[float]]:
+    """현재 프로세스와 종료된 자식 프로세스의 최대 RSS (MB)를 반환합니다."""
+    if resource is None:
+        return {'self': None, 'children': None}
+    # Linux는 KB, macOS는 바이트 단위
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1)
+    }
+
+def _run_processor(config: dict, data_path: str, stub: bool, workers: int) -> Dict:
+    """DataProcessor 경로를 실행하고 준비/처리 시간과 단계별 측정값을 반환합니다."""
+    from src import timing
+    from src.utils import get_device
+    from src.data_processor import DataProcessor, process_all_users_parallel
+
+    device = get_device(config)
+    setup_start = time.perf_counter()
+    if workers > 1:
+        # 워커가 각자 모델을 로드하므로 준비 시간이 처리 시간에 포함됨
+        setup_s = 0.0
+        run_start = time.perf_counter()
+        process_all_users_parallel(config, device, data_path, workers,
+                                   make_stub_processor if stub else None)
+    else:
+        processor = make_stub_processor(config, device) if stub else DataProcessor(config, device)
+        setup_s = time.perf_counter() - setup_start
+        run_start = time.perf_counter()
+        processor.process_all_users(data_path)
+        processor.ocr_engine.close()
+    run_s = time.perf_counter() - run_start
+    return {'setup_s': setup_s, 'run_s': run_s, 'timings': timing.get_timer().summary()}
+
+def _run_report(config: dict, data_path: str, output_path: str, stub: bool) -> Dict:
+    """generate_report 경로를 실행하고 준비/처리 시간과 단계별 측정값을 반환합니다."""
+    # generate_age_report.py는 src 폴더 기준의 평면 import를 사용
+    sys.path.insert(0, os.path.join(BASE_DIR, 'src'))
+    import timing
+    import generate_age_report
+
+    setup_start = time.perf_counter()
+    predictor = StubDeepFacePredictor(config) if stub else generate_age_report.DeepFaceAgePredictor(config)
+    setup_s = time.perf_counter() - setup_start
+    run_start = time.perf_counter()
+    generate_age_report.generate_report(data_path, output_path, config=config, predictor=predictor)
+    run_s = time.perf_counter() - run_start
+    return {'setup_s': setup_s, 'run_s': run_s, 'timings': timing.get_timer().summary()}
+
+def _scenario_entry(scenario: str, config: dict, data_path: str, output_path: str,
+                    stub: bool, workers: int, queue) -> None:
+    """별도 프로세스에서 시나리오 하나를 실행하고 결과를 queue로 보냅니다."""
+    try:
+        if scenario == 'processor':
+            result = _run_processor(config, data_path, stub, workers)
+        else:
+            result = _run_report(config, data_path, output_path, stub)
+        result['peak_rss_mb'] = peak_rss_mb()
+        queue.put(result)
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+def build_config(config_path: str, output_path: str, scenario: str, use_cache: bool) -> dict:
+    """벤치마크용 설정을 만듭니다. (출력과 캐시는 벤치마크 폴더로 분리)"""
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    config = copy.deepcopy(config)
+    scenario_output = os.path.join(output_path, scenario)
+    os.makedirs(scenario_output, exist_ok=True)
+    config['data']['output_dir'] = scenario_output
+    config.setdefault('cache', {})
+    config['cache']['enabled'] = use_cache
+    config['cache']['path'] = os.path.join(output_path, 'cache', 'predictions.sqlite')
+    config.setdefault('dedup', {})['reference_dirs'] = []
+    config['timing'] = {'enabled': True}
+    return config
+
+def run_scenario(scenario: str, config: dict, data_path: str, stub: bool, workers: int,
+                 num_images: int) -> Dict:
+    """시나리오를 새 프로세스에서 실행하고 처리량과 단계별 지연 시간을 요약합니다."""
+    context = mp.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(
+        target=_scenario_entry,
+        args=(scenario, config, data_path, config['data']['output_dir'], stub, workers, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    if 'error' in result:
+        return result
+
+    run_s = result['run_s']
+    return {
+        'images': num_images,
+        'setup_s': round(result['setup_s'], 3),
+        'run_s': round(run_s, 3),
+        'images_per_sec': round(num_images / run_s, 2) if run_s > 0 else None,
+        'peak_rss_mb': result['peak_rss_mb'],
+        'stages': {
+            stage: {key: summary[key] for key in ('count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms')}
+            for stage, summary in result['timings']['run'].items()
+        }
+    }
+
+def _change(current: Optional[float], baseline: Optional[float]) -> Optional[float]:
+    """기준값 대비 변화율 (%)을 반환합니다."""
+    if current is None or not baseline:
+        return None
+    return (current - baseline) / baseline * 100
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    기준 결과와 비교해 출력하고 허용 범위를 넘은 성능 저하 목록을 반환합니다.
+
+    Args:
+        results: 이번 실행 결과
+        baseline: 저장된 기준 결과
+        tolerance: 허용 변화율 (%), 처리량 감소나 p95 지연 증가가 이보다 크면 저하로 판단
+
+    Returns:
+        List[str]: 성능 저하 설명 리스트
+    """
+    regressions = []
+    if baseline.get('dataset') != results.get('dataset'):
+        print("경고: 기준 결과와 데이터셋 사양이 다릅니다")
+
+    for scenario, current in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(scenario)
+        if not base or 'error' in current or 'error' in base:
+            continue
+
+        print(f"\n=== {scenario} (기준 대비) ===")
+        change = _change(current['images_per_sec'], base['images_per_sec'])
+        if change is not None:
+            print(f"  images/sec      {base['images_per_sec']:10.2f} -> {current['images_per_sec']:10.2f} ({change:+.1f}%)")
+            if change < -tolerance:
+                regressions.append(f"{scenario}: images/sec {change:+.1f}%")
+
+        rss_change = _change(current['peak_rss_mb']['self'], base['peak_rss_mb']['self'])
+        if rss_change is not None:
+            print(f"  peak RSS (MB)   {base['peak_rss_mb']['self']:10.1f} -> "
+                  f"{current['peak_rss_mb']['self']:10.1f} ({rss_change:+.1f}%)")
+
+        for stage, summary in current['stages'].items():
+            base_stage = base['stages'].get(stage)
+            if not base_stage:
+                continue
+            change = _change(summary['p95_ms'], base_stage['p95_ms'])
+            if change is None:
+                continue
+            print(f"  {stage:15} p95 {base_stage['p95_ms']:9.2f}ms -> {summary['p95_ms']:9.2f}ms ({change:+.1f}%)")
+            if change > tolerance:
+                regressions.append(f"{scenario}/{stage}: p95 {change:+.1f}%")
+
+    return regressions
+
+def print_results(results: Dict) -> None:
+    """시나리오별 결과를 출력합니다."""
+    for scenario, result in results['scenarios'].items():
+        print(f"\n=== {scenario} ===")
+        if 'error' in result:
+            print(f"  실패: {result['error']}")
+            continue
+        print(f"  images          {result['images']}")
+        print(f"  setup           {result['setup_s']:.2f}s")
+        print(f"  run             {result['run_s']:.2f}s")
+        print(f"  images/sec      {result['images_per_sec']}")
+        print(f"  peak RSS (MB)   self {result['peak_rss_mb']['self']}, children {result['peak_rss_mb']['children']}")
+        for stage, summary in result['stages'].items():
+            print(f"  {stage:15} n={summary['count']:6} p50 {summary['p50_ms']:9.2f}ms "
+                  f"p95 {summary['p95_ms']:9.2f}ms p99 {summary['p99_ms']:9.2f}ms")
+
+def main(args) -> int:
+    """벤치마크를 실행하고 성능 저하가 있으면 1을 반환합니다."""
+    spec = {
+        'users': args.users,
+        'images_per_user': args.images_per_user,
+        'resolutions': args.resolutions,
+        'face_share': args.face_share,
+        'faces_dir': args.faces_dir,
+        'seed': args.seed,
+        'header_ratio': 0.15
+    }
+    print("합성 데이터 준비 중...")
+    data_path = generate_dataset(os.path.join(args.workdir, 'data'), spec)
+    num_images = args.users * args.images_per_user
+
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'dataset': spec,
+        'stub': args.stub,
+        'workers': args.workers,
+        'cache': args.cache,
+        'scenarios': {}
+    }
+    for scenario in args.scenarios:
+        print(f"{scenario} 시나리오 실행 중...")
+        config = build_config(args.config, os.path.join(args.workdir, 'output'), scenario, args.cache)
+        results['scenarios'][scenario] = run_scenario(
+            scenario, config, data_path, args.stub, args.workers, num_images
+        )
+
+    print_results(results)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results_file = os.path.join(args.workdir, 'benchmark.json')
+    with open(results_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\n결과 저장: {results_file}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"기준 결과 저장: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\n성능 저하:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\n허용 범위를 넘은 성능 저하가 없습니다")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline synthetic benchmark for the age prediction pipeline")
+    parser.add_argument("--config", default=os.path.join(BASE_DIR, "config", "config.yaml"),
+                        help="Base configuration file")
+    parser.add_argument("--workdir", default="benchmarks", help="Directory for synthetic data and outputs")
+    parser.add_argument("--users", type=int, default=10, help="Number of synthetic users")
+    parser.add_argument("--images-per-user", type=int, default=20, help="Images per user")
+    parser.add_argument("--resolutions", default="1080x2340,720x1600,1440x3200",
+                        help="Comma separated WIDTHxHEIGHT list to sample from")
+    parser.add_argument("--face-share", type=float, default=0.4, help="Share of images with a face")
+    parser.add_argument("--faces-dir", default=None,
+                        help="Directory of sample face images to paste (drawn faces if omitted)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic tree")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS),
+                        help="Pipelines to run")
+    parser.add_argument("--stub", action="store_true",
+                        help="Use stub detector/age models/OCR (no model downloads)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the processor scenario")
+    parser.add_argument("--cache", action="store_true", help="Enable the prediction cache")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", default=None, help="Save this run as a baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="Allowed regression in percent before failing")
+    sys.exit(main(parser.parse_args()))
@@ -1,17 +1,46 @@
 import os
+import time
 import argparse
-from src.utils import load_config, get_device, create_output_directories
-from src.data_processor import DataProcessor
 
-def main(config_path: str):
+# 무거운 모듈(torch, transformers, TensorFlow 등)은 --help나 --dry-run에서
+# 불러오지 않도록 실제로 필요한 함수 안에서 import합니다.
+
+def dry_run(config_path: str) -> None:
+    """
+    모델을 로드하지 않고 처리할 사용자와 이미지 수만 출력합니다.
+    
+    Args:
+        config_path: 설정 파일 경로
+    """
+    from src.utils import load_config, get_image_files
+    from src.data_processor import list_user_directories
+    
+    config = load_config(config_path)
+    input_dir = config['data']['input_dir']
+    total_images = 0
+    for user_path in list_user_directories(input_dir):
+        num_images = len(get_image_files(user_path, config['data']['supported_formats']))
+        total_images += num_images
+        print(f"User {os.path.basename(user_path)}: {num_images} images")
+    print(f"\nDry run: {total_images} images would be processed from {input_dir}")
+
+def main(config_path: str, num_workers: int = None, warmup: bool = False, full_scan: bool = False):
     """
     메인 실행 함수
     
     Args:
         config_path: 설정 파일 경로
+        num_workers: 워커 프로세스 수 (None이면 설정 파일 값 사용)
+        warmup: True이면 처리 전에 모델을 로드하고 한 번 추론
+        full_scan: True이면 적응형 샘플링을 끄고 모든 이미지를 처리
     """
+    from src.utils import load_config, get_device, create_output_directories
+    from src.data_processor import DataProcessor, process_all_users_parallel
+    
     # 설정 로드
     config = load_config(config_path)
+    if full_scan:
+        config.setdefault('adaptive', {})['enabled'] = False
     
     # 디바이스 설정
     device = get_device(config)
@@ -20,11 +49,21 @@ def main(config_path: str):
     # 출력 디렉토리 생성
     create_output_directories(config)
     
-    # 데이터 처리기 초기화
-    processor = DataProcessor(config, device)
-    
     # 데이터 처리 실행
-    results_df = processor.process_all_users(config['data']['input_dir'])
+    if num_workers is None:
+        num_workers = config['processing'].get('num_workers', 1)
+    if num_workers > 1:
+        print(f"Using {num_workers} worker processes")
+        results_df = process_all_users_parallel(
+            config, device, config['data']['input_dir'], num_workers, warmup=warmup
+        )
+    else:
+        processor = DataProcessor(config, device)
+        if warmup:
+            start = time.perf_counter()
+            processor.warmup()
+            print(f"Warmup finished in {time.perf_counter() - start:.1f}s")
+        results_df = processor.process_all_users(config['data']['input_dir'])
     
     # 결과 출력
     print("\n=== Processing Results ===")
@@ -40,6 +79,58 @@ def main(config_path: str):
     
     print(f"\nResults saved to: {os.path.join(config['data']['output_dir'], 'results.csv')}")
 
+def verify_onnx(config_path: str, sample_dir: str) -> bool:
+    """
+    ONNX 백엔드 결과를 PyTorch 백엔드와 비교합니다.
+    
+    Args:
+        config_path: 설정 파일 경로
+        sample_dir: 얼굴 크롭 샘플 이미지 폴더
+        
+    Returns:
+        bool: 나이 그룹 일치율이 기준 이상이면 True
+    """
+    from src.utils import load_config, get_device
+    from src.age_predictor import verify_onnx_backend
+    
+    config = load_config(config_path)
+    device = get_device(config)
+    report = verify_onnx_backend(config, device, sample_dir, batch_size=config['processing']['batch_size'])
+    
+    print("\n=== ONNX Verification ===")
+    print(f"Model: {report['model_path']} ({report['backend']})")
+    print(f"Images compared: {report['images']}")
+    print(f"Age group agreement: {report['label_agreement']*100:.2f}% (min {report['min_agreement']*100:.0f}%)")
+    print(f"Max logit difference: {report['max_logit_diff']:.5f}")
+    print(f"Mean confidence difference: {report['mean_confidence_diff']:.5f}")
+    print("PASSED" if report['passed'] else "FAILED")
+    return report['passed']
+
+def verify_preprocess(config_path: str, sample_dir: str) -> bool:
+    """
+    배치 전처리 결과를 HF 프로세서와 비교합니다.
+    
+    Args:
+        config_path: 설정 파일 경로
+        sample_dir: 얼굴 크롭 샘플 이미지 폴더
+        
+    Returns:
+        bool: 평균 오차가 허용 범위 이내이면 True
+    """
+    from src.utils import load_config, get_device
+    from src.age_predictor import verify_fast_preprocess
+    
+    config = load_config(config_path)
+    report = verify_fast_preprocess(config, get_device(config), sample_dir,
+                                    batch_size=config['processing']['batch_size'])
+    
+    print("\n=== Fast Preprocess Verification ===")
+    print(f"Images compared: {report['images']}")
+    print(f"Mean abs difference: {report['mean_abs_diff']:.5f} (tolerance {report['tolerance']})")
+    print(f"Max abs difference: {report['max_abs_diff']:.5f}")
+    print("PASSED" if report['passed'] else "FAILED")
+    return report['passed']
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Age Prediction from Images")
     parser.add_argument(
@@ -48,5 +139,47 @@ if __name__ == "__main__":
         default="config/config.yaml",
         help="Path to configuration file"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (overrides processing.num_workers)"
+    )
+    parser.add_argument(
+        "--verify-onnx",
+        type=str,
+        default=None,
+        metavar="SAMPLE_DIR",
+        help="Compare the ONNX backend against the torch backend on face crops in SAMPLE_DIR and exit"
+    )
+    parser.add_argument(
+        "--verify-preprocess",
+        type=str,
+        default=None,
+        metavar="SAMPLE_DIR",
+        help="Compare fast batched preprocessing against the HF processor on images in SAMPLE_DIR and exit"
+    )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Load models and run one dummy inference before processing"
+    )
+    parser.add_argument(
+        "--full-scan",
+        action="store_true",
+        help="Process every image of every user (disables adaptive.enabled early exit)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List users and image counts without loading any model"
+    )
     args = parser.parse_args()
-    main(args.config)
+    if args.verify_onnx:
+        raise SystemExit(0 if verify_onnx(args.config, args.verify_onnx) else 1)
+    if args.verify_preprocess:
+        raise SystemExit(0 if verify_preprocess(args.config, args.verify_preprocess) else 1)
+    if args.dry_run:
+        dry_run(args.config)
+    else:
+        main(args.config, args.workers, args.warmup, args.full_scan)
@@ -0,0 +1,135 @@
+"""
+사용자별 적응형 샘플링 (판정이 확정되면 남은 이미지 처리 중단)
+
+사용자의 이미지를 정보가 많은 순서(최신 이미지, 큰 얼굴 먼저)로 처리하면서
+신뢰할 수 있는 예측이 충분히 모이고 모두 확실한 성인(또는 모두 확실한
+미성년자)이면 판정이 확정된 것으로 보고 나머지 이미지는 건너뜁니다.
+예측이 한 번이라도 경계 부근이거나 서로 엇갈리면 끝까지 처리합니다.
+"""
+
+import os
+import threading
+from typing import Iterable, Optional, Set
+
+# 판정 값
+VERDICT_ADULT = 'adult'
+VERDICT_UNDERAGE = 'underage'
+
+# 건너뛴 이미지의 skip_reason
+SKIP_EARLY_EXIT = 'early_exit'
+
+def load_user_list(path: str) -> Set[str]:
+    """한 줄에 사용자 ID 하나씩 적힌 파일을 읽습니다. (빈 줄과 # 주석 무시)"""
+    users = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                users.add(line)
+    return users
+
+class VerdictTracker:
+    """한 사용자의 신뢰할 수 있는 예측을 모아 판정 확정 여부를 계산하는 클래스 (스레드 안전)"""
+
+    def __init__(self, min_predictions: int, adult_age: float, underage_age: float):
+        """
+        Args:
+            min_predictions: 확정에 필요한 신뢰할 수 있는 예측 수
+            adult_age: 이 나이 이상이면 확실한 성인
+            underage_age: 이 나이 미만이면 확실한 미성년자
+        """
+        self.min_predictions = min_predictions
+        self.adult_age = adult_age
+        self.underage_age = underage_age
+        self.reliable = 0
+        self.adult = 0
+        self.underage = 0
+        self._lock = threading.Lock()
+
+    def add(self, age: Optional[float], reliable: bool) -> None:
+        """예측 하나를 추가합니다. 신뢰할 수 없는 예측은 판정에 사용하지 않습니다."""
+        if age is None or not reliable:
+            return
+        with self._lock:
+            self.reliable += 1
+            if age >= self.adult_age:
+                self.adult += 1
+            elif age < self.underage_age:
+                self.underage += 1
+
+    @property
+    def can_settle(self) -> bool:
+        """지금까지의 예측이 모두 한쪽으로 확실하면 True (엇갈리면 더 처리해도 확정되지 않음)"""
+        return self.adult == self.reliable or self.underage == self.reliable
+
+    @property
+    def verdict(self) -> Optional[str]:
+        """확정된 판정 ('adult' 또는 'underage'), 아직 확정되지 않았으면 None"""
+        if self.reliable < self.min_predictions:
+            return None
+        if self.adult == self.reliable:
+            return VERDICT_ADULT
+        if self.underage == self.reliable:
+            return VERDICT_UNDERAGE
+        return None
+
+    @property
+    def settled(self) -> bool:
+        return self.verdict is not None
+
+    def needed(self) -> Optional[int]:
+        """확정에 더 필요한 예측 수, 확정될 수 없으면 None"""
+        if not self.can_settle:
+            return None
+        return max(0, self.min_predictions - self.reliable)
+
+class AdaptiveSampler:
+    """설정의 adaptive 섹션으로 사용자별 판정 추적기를 만드는 클래스"""
+
+    def __init__(self, config: dict):
+        """
+        Args:
+            config: 설정 딕셔너리 (age_detection.underage_threshold, adaptive 섹션)
+        """
+        adaptive_config = config.get('adaptive') or {}
+        threshold = config['age_detection']['underage_threshold']
+        self.min_predictions = adaptive_config.get('min_predictions', 8)
+        self.adult_age = threshold + adaptive_config.get('adult_margin', 4)
+        self.underage_age = threshold - adaptive_config.get('underage_margin', 2)
+
+        # 항상 전체 이미지를 처리할 사용자 (이전에 문제로 분류된 사용자 등)
+        self.full_scan_users = set(str(uid) for uid in adaptive_config.get('force_full_scan') or [])
+        full_scan_file = adaptive_config.get('force_full_scan_file')
+        if full_scan_file and os.path.exists(full_scan_file):
+            self.full_scan_users |= load_user_list(full_scan_file)
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['AdaptiveSampler']:
+        """설정의 adaptive 섹션으로 생성합니다. 비활성화되어 있으면 None을 반환합니다."""
+        if not (config.get('adaptive') or {}).get('enabled', False):
+            return None
+        return cls(config)
+
+    def is_full_scan(self, user_id: str) -> bool:
+        """전체 이미지를 처리해야 하는 사용자이면 True를 반환합니다."""
+        return str(user_id) in self.full_scan_users
+
+    def tracker(self, user_id: str) -> Optional[VerdictTracker]:
+        """사용자의 판정 추적기를 반환합니다. 전체 처리 대상이면 None을 반환합니다."""
+        if self.is_full_scan(user_id):
+            return None
+        return VerdictTracker(self.min_predictions, self.adult_age, self.underage_age)
+
+def newest_first(paths: Iterable[str], date_of) -> list:
+    """이미지 경로를 날짜(date_of(path)의 YYYYMMDD 문자열) 최신순으로 정렬합니다."""
+    return sorted(paths, key=lambda path: date_of(path) or '', reverse=True)
+
+def should_flush_for(tracker: Optional[VerdictTracker], pending: int) -> bool:
+    """
+    대기 중인 이 사용자의 얼굴 크롭(pending개)만으로 판정이 확정될 수 있으면 True를 반환합니다.
+    (배치가 다 차기 전에 추론해 남은 이미지를 일찍 건너뛰기 위함)
+    """
+    if tracker is None or tracker.settled:
+        return False
+    needed = tracker.needed()
+    return needed is not None and pending >= needed
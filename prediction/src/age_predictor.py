@@ -1,16 +1,25 @@
-import torch
+import os
+import logging
+import cv2
 from PIL import Image
-from transformers import AutoImageProcessor, AutoModelForImageClassification
 import numpy as np
-from typing import Optional, Dict, List
-import torch.nn as nn
+from typing import Optional, Dict, List, Tuple
+
+# torch, transformers, onnxruntime은 import에 수 초가 걸리므로 선택된 백엔드가
+# 모델을 처음 사용할 때 가져옵니다.
+
+# 로컬 샘플로 ONNX 백엔드를 검증할 때 읽을 이미지 확장자
+SAMPLE_FORMATS = ('.jpg', '.jpeg', '.png', '.webp')
 
 class AgePredictor:
     """나이 예측을 위한 클래스"""
     
-    def __init__(self, config: dict, device: torch.device):
+    # 캐시 네임스페이스 등에 사용하는 백엔드 이름
+    backend = 'torch'
+
+    def __init__(self, config: dict, device: 'torch.device'):
         """
-        나이 예측기를 초기화합니다.
+        나이 예측기를 초기화합니다. 모델과 프로세서는 처음 예측할 때 로드합니다.
         
         Args:
             config: 설정 딕셔너리
@@ -20,15 +29,17 @@ class AgePredictor:
         self.device = device
         self.model_name = config['models']['vit']['name']
         self.image_size = config['models']['vit']['image_size']
+        self.processor = None
+        self._loaded = False
         
-        # 모델과 프로세서 로드
-        self.processor = AutoImageProcessor.from_pretrained(self.model_name)
-        self.model = AutoModelForImageClassification.from_pretrained(
-            self.model_name,
-            torch_dtype=torch.float16 if device.type == "cuda" else torch.float32,
-            device_map="auto"
-        ).to(device)
-        self.model.eval()
+        # 배치 전처리: 크롭을 미리 할당한 버퍼에 OpenCV로 리사이즈하고 한 번에 정규화
+        # (버퍼를 재사용하므로 한 예측기를 여러 스레드에서 동시에 호출하지 않아야 함)
+        self.fast_preprocess = config['models']['vit'].get('fast_preprocess', False)
+        self.fast_preprocess_tolerance = config['models']['vit'].get('fast_preprocess_tolerance', 0.02)
+        self._fast_params = None
+        self._fast_checked = False
+        self._uint8_buffer = None
+        self._float_buffer = None
         
         # 나이 그룹 매핑 (UTKFace 데이터셋 기준)
         self.age_groups = {
@@ -54,24 +65,172 @@ class AgePredictor:
             'elderly (70+)'
         ]
         
-    def _process_image(self, image: Image.Image) -> torch.Tensor:
-        """이미지를 전처리합니다."""
-        return self.processor(
-            images=image,
-            return_tensors="pt"
+    def _ensure_loaded(self) -> None:
+        """프로세서와 모델을 아직 로드하지 않았으면 로드합니다."""
+        if self._loaded:
+            return
+        from transformers import AutoImageProcessor
+        self.processor = AutoImageProcessor.from_pretrained(self.model_name)
+        if self.fast_preprocess:
+            self._fast_params = self._fast_preprocess_params()
+        self._load_model()
+        self._loaded = True
+
+    def warmup(self) -> None:
+        """모델을 미리 로드하고 빈 이미지로 한 번 추론합니다."""
+        self.predict_batch([Image.new('RGB', (self.image_size, self.image_size))])
+        # 빈 이미지로는 배치 전처리 검증이 의미 없으므로 첫 실제 배치에서 다시 검증
+        self._fast_checked = False
+
+    def _load_model(self) -> None:
+        """PyTorch 모델을 로드합니다."""
+        import torch
+        from transformers import AutoModelForImageClassification
+        self.model = AutoModelForImageClassification.from_pretrained(
+            self.model_name,
+            torch_dtype=torch.float16 if self.device.type == "cuda" else torch.float32
         ).to(self.device)
+        self.model.eval()
         
-    def _get_age_prediction(self, logits: torch.Tensor) -> tuple:
-        """로짓에서 나이 예측을 계산합니다."""
-        probs = torch.softmax(logits, dim=1)
-        predicted_class = torch.argmax(logits, dim=1).item()
-        confidence = probs[0][predicted_class].item()
+    def _fast_preprocess_params(self) -> Optional[Tuple[int, int, np.ndarray, np.ndarray]]:
+        """
+        HF 프로세서 설정에서 배치 전처리에 필요한 값을 계산합니다.
+
+        Returns:
+            (높이, 너비, 채널별 배율, 채널별 오프셋), 고정 크기 리사이즈가 아닌
+            프로세서(짧은 변 기준 리사이즈, 중앙 크롭 등)이면 None
+        """
+        processor = self.processor
+        size = getattr(processor, 'size', None)
+        if isinstance(size, dict) and 'height' in size and 'width' in size:
+            height, width = size['height'], size['width']
+        elif isinstance(size, int):
+            height = width = size
+        else:
+            height = width = None
+        if not getattr(processor, 'do_resize', True) or height is None or getattr(processor, 'do_center_crop', False):
+            logging.warning("이 모델의 전처리 방식은 배치 전처리를 지원하지 않아 HF 프로세서를 사용합니다")
+            return None
+
+        if getattr(processor, 'do_normalize', True):
+            mean = np.asarray(processor.image_mean, dtype=np.float32)
+            std = np.asarray(processor.image_std, dtype=np.float32)
+        else:
+            mean, std = np.zeros(3, dtype=np.float32), np.ones(3, dtype=np.float32)
+        rescale = processor.rescale_factor if getattr(processor, 'do_rescale', True) else 1.0
+
+        # (x * rescale - mean) / std 를 x * scale + offset 한 번으로 계산
+        scale = (rescale / std).reshape(1, 3, 1, 1).astype(np.float32)
+        offset = (-mean / std).reshape(1, 3, 1, 1).astype(np.float32)
+        return height, width, scale, offset
+
+    def _batch_buffers(self, count: int, height: int, width: int) -> Tuple[np.ndarray, np.ndarray]:
+        """count장 이상을 담을 수 있는 uint8/float32 배치 버퍼를 반환합니다. (부족할 때만 새로 할당)"""
+        if self._uint8_buffer is None or self._uint8_buffer.shape[0] < count:
+            self._uint8_buffer = np.empty((count, height, width, 3), dtype=np.uint8)
+            self._float_buffer = np.empty((count, 3, height, width), dtype=np.float32)
+        return self._uint8_buffer[:count], self._float_buffer[:count]
+
+    def _fast_pixel_values(self, images: List[Image.Image]) -> np.ndarray:
+        """크롭들을 재사용 버퍼에 리사이즈하고 한 번의 연산으로 정규화합니다."""
+        height, width, scale, offset = self._fast_params
+        resized, pixel_values = self._batch_buffers(len(images), height, width)
+        for i, image in enumerate(images):
+            array = np.asarray(image.convert('RGB'))
+            # 축소는 PIL BILINEAR(안티에일리어싱)에 가까운 INTER_AREA, 확대는 INTER_LINEAR
+            shrinking = array.shape[0] > height or array.shape[1] > width
+            cv2.resize(array, (width, height), dst=resized[i],
+                       interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+        np.multiply(resized.transpose(0, 3, 1, 2), scale, out=pixel_values, casting='unsafe')
+        pixel_values += offset
+        return pixel_values
+
+    def _hf_pixel_values(self, images: List[Image.Image]) -> np.ndarray:
+        """HF 프로세서로 전처리합니다."""
+        inputs = self.processor(images=images, return_tensors="np")
+        return np.ascontiguousarray(inputs['pixel_values'], dtype=np.float32)
+
+    def _pixel_values(self, images: List[Image.Image]) -> np.ndarray:
+        """
+        이미지들을 (N, 3, 높이, 너비) float32 모델 입력으로 전처리합니다.
+
+        배치 전처리를 사용하면 첫 배치에서 한 번 HF 프로세서 결과와 비교해
+        평균 절대 오차가 허용 범위를 넘으면 HF 프로세서로 되돌립니다.
+        반환값은 다음 호출에서 덮어쓰이는 버퍼일 수 있습니다.
+        """
+        if self._fast_params is None:
+            return self._hf_pixel_values(images)
+
+        pixel_values = self._fast_pixel_values(images)
+        if not self._fast_checked:
+            self._fast_checked = True
+            reference = self._hf_pixel_values(images)
+            difference = float(np.abs(pixel_values - reference).mean())
+            if difference > self.fast_preprocess_tolerance:
+                logging.warning(
+                    f"배치 전처리 결과가 HF 프로세서와 다릅니다 (평균 오차 {difference:.4f} > "
+                    f"{self.fast_preprocess_tolerance}), HF 프로세서를 사용합니다"
+                )
+                self._fast_params = None
+                return reference
+        return pixel_values
+
+    def preprocess_difference(self, images: List[Image.Image]) -> Dict[str, float]:
+        """배치 전처리와 HF 프로세서 결과의 평균/최대 절대 오차를 반환합니다."""
+        self._ensure_loaded()
+        params = self._fast_params or self._fast_preprocess_params()
+        if params is None:
+            return {'mean_abs_diff': 0.0, 'max_abs_diff': 0.0}
+        self._fast_params, saved = params, self._fast_params
+        try:
+            difference = np.abs(self._fast_pixel_values(images) - self._hf_pixel_values(images))
+        finally:
+            self._fast_params = saved
+        return {'mean_abs_diff': float(difference.mean()), 'max_abs_diff': float(difference.max())}
+
+    def _forward(self, images: List[Image.Image]) -> np.ndarray:
+        """이미지들을 전처리하고 모델을 실행해 (이미지 수, 클래스 수) 로짓을 반환합니다."""
+        import torch
+        self._ensure_loaded()
+        pixel_values = torch.from_numpy(self._pixel_values(images)).to(self.device, dtype=self.model.dtype)
+        with torch.no_grad():
+            logits = self.model(pixel_values=pixel_values).logits
+        return logits.float().cpu().numpy()
+
+    def _get_age_prediction(self, logits: np.ndarray) -> tuple:
+        """로짓 한 행에서 나이 예측을 계산합니다."""
+        logits = np.asarray(logits, dtype=np.float64).reshape(-1)
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        predicted_class = int(np.argmax(logits))
+        confidence = probs[predicted_class]
         
         age_range = self.age_groups[predicted_class]
         predicted_age = (age_range[0] + age_range[1]) // 2
         age_label = self.age_labels[predicted_class]
         
-        return predicted_age, age_range, age_label, confidence
+        # 그룹 중간 나이의 확률 가중 평균 (그룹 경계 부근 판단용 연속값)
+        midpoints = np.array([(low + high) / 2 for low, high in self.age_groups.values()])
+        expected_age = float(probs @ midpoints)
+
+        return predicted_age, age_range, age_label, confidence, expected_age
+
+    def _build_result(self, logits: np.ndarray, user_info: Optional[Dict] = None) -> dict:
+        """로짓 한 행으로 결과 딕셔너리를 생성합니다."""
+        predicted_age, age_range, age_label, confidence, expected_age = self._get_age_prediction(logits)
+        result = {
+            'age': predicted_age,
+            'expected_age': round(expected_age, 1),
+            'age_range': age_range,
+            'age_label': age_label,
+            'confidence': float(confidence)
+        }
+
+        # 사용자 정보가 있으면 추가
+        if user_info:
+            result.update(user_info)
+
+        return result
         
     def predict_age(self, image: Image.Image, user_info: Optional[Dict] = None) -> dict:
         """
@@ -88,27 +247,8 @@ class AgePredictor:
         Returns:
             dict: 예측된 나이와 신뢰도를 포함하는 딕셔너리
         """
-        # 이미지 전처리
-        inputs = self._process_image(image)
-        
-        # 예측 수행
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            predicted_age, age_range, age_label, confidence = self._get_age_prediction(outputs.logits)
-        
-        # 결과 생성
-        result = {
-            'age': predicted_age,
-            'age_range': age_range,
-            'age_label': age_label,
-            'confidence': float(confidence)
-        }
-        
-        # 사용자 정보가 있으면 추가
-        if user_info:
-            result.update(user_info)
-            
-        return result
+        logits = self._forward([image])
+        return self._build_result(logits[0], user_info)
         
     def predict_batch(self, images: List[Image.Image], user_infos: Optional[List[Dict]] = None) -> List[Dict]:
         """
@@ -124,32 +264,224 @@ class AgePredictor:
         if not images:
             return []
             
-        # 이미지 전처리
-        batch_inputs = self.processor(
-            images=images,
-            return_tensors="pt"
-        ).to(self.device)
+        logits = self._forward(images)
+        return [
+            self._build_result(row, user_infos[i] if user_infos and i < len(user_infos) else None)
+            for i, row in enumerate(logits)
+        ]
         
-        # 예측 수행
-        with torch.no_grad():
-            outputs = self.model(**batch_inputs)
+def export_onnx(model_name: str, onnx_path: str, image_size: int, opset: int = 17) -> None:
+    """
+    HuggingFace ViT 모델을 배치 크기가 가변인 ONNX 파일로 내보냅니다.
             
-        # 결과 생성
-        results = []
-        for i, logits in enumerate(outputs.logits):
-            predicted_age, age_range, age_label, confidence = self._get_age_prediction(logits.unsqueeze(0))
+    Args:
+        model_name: HuggingFace 모델 이름
+        onnx_path: 저장할 ONNX 파일 경로
+        image_size: 모델 입력 이미지 크기
+        opset: ONNX opset 버전
+    """
+    import torch
+    import torch.nn as nn
+    from transformers import AutoModelForImageClassification
             
-            result = {
-                'age': predicted_age,
-                'age_range': age_range,
-                'age_label': age_label,
-                'confidence': float(confidence)
-            }
+    class LogitsOnly(nn.Module):
+        """HuggingFace 모델 출력에서 로짓만 반환하는 래퍼"""
             
-            # 사용자 정보가 있으면 추가
-            if user_infos and i < len(user_infos):
-                result.update(user_infos[i])
+        def __init__(self, model: nn.Module):
+            super().__init__()
+            self.model = model
                 
-            results.append(result)
+        def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+            return self.model(pixel_values=pixel_values).logits
             
-        return results
+    model = AutoModelForImageClassification.from_pretrained(model_name, torch_dtype=torch.float32)
+    model.eval()
+    dummy = torch.zeros(1, 3, image_size, image_size, dtype=torch.float32)
+
+    # 내보내기 도중 중단되어도 불완전한 파일이 캐시로 쓰이지 않도록 임시 파일 후 교체
+    temp_path = onnx_path + '.tmp'
+    with torch.no_grad():
+        torch.onnx.export(
+            LogitsOnly(model),
+            (dummy,),
+            temp_path,
+            input_names=['pixel_values'],
+            output_names=['logits'],
+            dynamic_axes={'pixel_values': {0: 'batch'}, 'logits': {0: 'batch'}},
+            opset_version=opset,
+            do_constant_folding=True
+        )
+    os.replace(temp_path, onnx_path)
+
+def quantize_onnx(onnx_path: str, quantized_path: str) -> None:
+    """ONNX 모델의 가중치를 int8로 동적 양자화합니다."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    temp_path = quantized_path + '.tmp.onnx'
+    quantize_dynamic(onnx_path, temp_path, weight_type=QuantType.QInt8)
+    os.replace(temp_path, quantized_path)
+
+def ensure_onnx_model(model_name: str, image_size: int, onnx_config: dict) -> str:
+    """
+    캐시된 ONNX 모델 경로를 반환합니다. 없으면 한 번만 내보내고 (선택적으로) 양자화합니다.
+
+    파일은 cache_dir/<모델 이름>/ 아래에 opset과 입력 크기별로 저장됩니다.
+
+    Args:
+        model_name: HuggingFace 모델 이름
+        image_size: 모델 입력 이미지 크기
+        onnx_config: models.vit.onnx 설정
+
+    Returns:
+        str: 추론에 사용할 ONNX 파일 경로
+    """
+    opset = onnx_config.get('opset', 17)
+    model_dir = os.path.join(onnx_config.get('cache_dir', 'cache/onnx'), model_name.replace('/', '__'))
+    os.makedirs(model_dir, exist_ok=True)
+
+    onnx_path = os.path.join(model_dir, f"model-opset{opset}-{image_size}.onnx")
+    if not os.path.exists(onnx_path):
+        print(f"Exporting {model_name} to ONNX: {onnx_path}")
+        export_onnx(model_name, onnx_path, image_size, opset)
+
+    if not onnx_config.get('quantize', False):
+        return onnx_path
+
+    quantized_path = os.path.join(model_dir, f"model-opset{opset}-{image_size}.int8.onnx")
+    if not os.path.exists(quantized_path):
+        print(f"Quantizing ONNX model to int8: {quantized_path}")
+        quantize_onnx(onnx_path, quantized_path)
+    return quantized_path
+
+class OnnxAgePredictor(AgePredictor):
+    """ONNX Runtime(CPU)으로 추론하는 나이 예측기 (전처리와 후처리는 AgePredictor와 동일)"""
+
+    def __init__(self, config: dict, device: 'torch.device'):
+        super().__init__(config, device)
+        self.onnx_config = config['models']['vit'].get('onnx') or {}
+        self.quantized = self.onnx_config.get('quantize', False)
+        self.backend = 'onnx-int8' if self.quantized else 'onnx'
+        self.model_path = None
+
+    def _load_model(self) -> None:
+        """캐시된 ONNX 모델로 추론 세션을 생성합니다. (없으면 내보내기 후 생성)"""
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("ONNX 백엔드를 사용하려면 onnxruntime을 설치해야 합니다")
+
+        onnx_config = self.onnx_config
+        self.model_path = ensure_onnx_model(self.model_name, self.image_size, onnx_config)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0이면 ONNX Runtime 기본값 (물리 코어 수) 사용
+        if onnx_config.get('intra_op_threads'):
+            options.intra_op_num_threads = onnx_config['intra_op_threads']
+        if onnx_config.get('inter_op_threads'):
+            options.inter_op_num_threads = onnx_config['inter_op_threads']
+
+        self.session = ort.InferenceSession(self.model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def _forward(self, images: List[Image.Image]) -> np.ndarray:
+        """이미지들을 전처리하고 ONNX 세션을 실행해 로짓을 반환합니다."""
+        self._ensure_loaded()
+        return self.session.run(None, {self.input_name: self._pixel_values(images)})[0]
+
+def create_age_predictor(config: dict, device: 'torch.device') -> AgePredictor:
+    """설정의 models.vit.backend ('torch' 또는 'onnx')에 따라 나이 예측기를 생성합니다."""
+    backend = config['models']['vit'].get('backend', 'torch')
+    if backend == 'onnx':
+        return OnnxAgePredictor(config, device)
+    if backend != 'torch':
+        raise ValueError(f"지원하지 않는 나이 예측 백엔드: {backend}")
+    return AgePredictor(config, device)
+
+def list_sample_images(sample_dir: str, max_images: int) -> List[str]:
+    """샘플 폴더의 이미지 경로를 정렬해 최대 max_images개 반환합니다."""
+    paths = sorted(
+        os.path.join(sample_dir, name) for name in os.listdir(sample_dir)
+        if name.lower().endswith(SAMPLE_FORMATS)
+    )[:max_images]
+    if not paths:
+        raise ValueError(f"샘플 이미지가 없습니다: {sample_dir}")
+    return paths
+
+def load_sample_images(paths: List[str]) -> List[Image.Image]:
+    """샘플 이미지들을 RGB로 로드합니다."""
+    images = []
+    for path in paths:
+        with Image.open(path) as image:
+            images.append(image.convert('RGB'))
+    return images
+
+def verify_fast_preprocess(config: dict, device: 'torch.device', sample_dir: str,
+                           max_images: int = 200, batch_size: int = 32) -> Dict:
+    """
+    로컬 샘플 이미지로 배치 전처리 결과를 HF 프로세서와 비교합니다.
+
+    Returns:
+        dict: 이미지 수, 평균/최대 절대 오차, 허용 오차, 통과 여부
+    """
+    paths = list_sample_images(sample_dir, max_images)
+    predictor = AgePredictor(config, device)
+
+    mean_diffs, max_diff = [], 0.0
+    for start in range(0, len(paths), batch_size):
+        difference = predictor.preprocess_difference(load_sample_images(paths[start:start + batch_size]))
+        mean_diffs.append(difference['mean_abs_diff'])
+        max_diff = max(max_diff, difference['max_abs_diff'])
+
+    mean_diff = float(np.mean(mean_diffs))
+    return {
+        'images': len(paths),
+        'mean_abs_diff': mean_diff,
+        'max_abs_diff': max_diff,
+        'tolerance': predictor.fast_preprocess_tolerance,
+        'passed': mean_diff <= predictor.fast_preprocess_tolerance
+    }
+
+def verify_onnx_backend(config: dict, device: 'torch.device', sample_dir: str,
+                        max_images: int = 200, batch_size: int = 32) -> Dict:
+    """
+    로컬 샘플 이미지(얼굴 크롭)로 ONNX 백엔드의 결과를 PyTorch 백엔드와 비교합니다.
+
+    Args:
+        config: 설정 딕셔너리 (models.vit.onnx 설정 사용)
+        device: PyTorch 백엔드 연산 장치
+        sample_dir: 샘플 이미지 폴더
+        max_images: 비교할 최대 이미지 수
+        batch_size: 배치 크기
+
+    Returns:
+        dict: 이미지 수, 나이 그룹 일치율, 최대 로짓 차이, 평균 신뢰도 차이, 통과 여부
+    """
+    paths = list_sample_images(sample_dir, max_images)
+    torch_predictor = AgePredictor(config, device)
+    onnx_predictor = OnnxAgePredictor(config, device)
+
+    agreements, logit_diffs, confidence_diffs = [], [], []
+    for start in range(0, len(paths), batch_size):
+        images = load_sample_images(paths[start:start + batch_size])
+        torch_logits = torch_predictor._forward(images)
+        onnx_logits = onnx_predictor._forward(images)
+        logit_diffs.append(float(np.abs(torch_logits - onnx_logits).max()))
+        for torch_row, onnx_row in zip(torch_logits, onnx_logits):
+            torch_result = torch_predictor._build_result(torch_row)
+            onnx_result = onnx_predictor._build_result(onnx_row)
+            agreements.append(torch_result['age_label'] == onnx_result['age_label'])
+            confidence_diffs.append(abs(torch_result['confidence'] - onnx_result['confidence']))
+
+    min_agreement = (config['models']['vit'].get('onnx') or {}).get('verify_min_agreement', 0.98)
+    agreement = float(np.mean(agreements))
+    return {
+        'images': len(paths),
+        'backend': onnx_predictor.backend,
+        'model_path': onnx_predictor.model_path,
+        'label_agreement': agreement,
+        'max_logit_diff': max(logit_diffs),
+        'mean_confidence_diff': float(np.mean(confidence_diffs)),
+        'min_agreement': min_agreement,
+        'passed': agreement >= min_agreement
+    }
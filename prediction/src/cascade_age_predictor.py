@@ -0,0 +1,183 @@
+"""
+2단계 나이 예측 (빠른 ViT 모델 → 경계 부근만 DeepFace)
+
+대부분의 얼굴은 미성년자 기준 나이와 멀리 떨어진 성인이므로, 가벼운 1단계
+모델로 모든 얼굴을 먼저 예측하고 기준 나이 ± band 안에 드는 얼굴만
+DeepFace 나이 모델로 다시 예측합니다.
+"""
+
+import copy
+import logging
+from typing import Dict, List, Optional
+from PIL import Image
+from age_predictor import create_age_predictor
+from deepface_age_predictor import estimate_age_range
+from utils import get_device
+
+# 리포트의 tier 값
+TIER_FAST = 'fast'
+TIER_DEEPFACE = 'deepface'
+
+def fast_tier_config(config: dict) -> dict:
+    """
+    cascade.fast_backend ('torch', 'onnx', 'onnx-int8')를 models.vit 설정에 반영한 복사본을 반환합니다.
+    fast_backend가 없으면 models.vit.backend를 그대로 사용합니다.
+    """
+    fast_backend = (config.get('cascade') or {}).get('fast_backend')
+    if not fast_backend:
+        return config
+    config = copy.deepcopy(config)
+    vit_config = config['models']['vit']
+    vit_config['backend'] = 'torch' if fast_backend == 'torch' else 'onnx'
+    vit_config['onnx'] = {**(vit_config.get('onnx') or {}), 'quantize': fast_backend == 'onnx-int8'}
+    return config
+
+def _fast_tier_device(config: dict):
+    """1단계 PyTorch 모델의 연산 장치를 반환합니다. (ONNX 백엔드는 CPU만 사용하므로 None)"""
+    if config['models']['vit'].get('backend', 'torch') != 'torch':
+        return None
+    return get_device(config)
+
+def expected_age(prediction: Dict) -> float:
+    """1단계 결과의 기대 나이 (없으면 예측 그룹의 중간 나이)를 반환합니다."""
+    return float(prediction.get('expected_age', prediction['age']))
+
+class CascadeAgePredictor:
+    """1단계 ViT 예측이 기준 나이 부근일 때만 DeepFace로 넘기는 나이 예측기"""
+
+    def __init__(self, config: dict, fast_predictor, accurate_predictor):
+        """
+        2단계 나이 예측기를 초기화.
+
+        Args:
+            config: 설정 딕셔너리 (age_detection, cascade 섹션)
+            fast_predictor: 1단계 예측기 (AgePredictor 또는 RemoteAgePredictor)
+            accurate_predictor: 2단계 예측기 (DeepFaceAgePredictor 또는 RemoteDeepFacePredictor)
+        """
+        cascade_config = config.get('cascade') or {}
+        self.UNDERAGE_MAX = config['age_detection']['underage_threshold']
+        self.MIN_CONFIDENCE = config['age_detection']['min_confidence']
+        self.band = cascade_config.get('band', 4)
+        self.fast = fast_predictor
+        self.accurate = accurate_predictor
+
+        # 1단계는 얼굴 크롭을 입력으로 받으므로 항상 크롭 모드 (사전 필터가 없으면 DeepFace만 사용)
+        self.crop_mode = True
+
+        # 캐시 네임스페이스 (1단계 모델/백엔드와 band가 바뀌면 결과 구분)
+        fast_backend = getattr(self.fast, 'backend', 'torch')
+        suffix = f"cascade:{self.fast.model_name}:{fast_backend}:{self.band}"
+        self.cache_namespace = f"{self.accurate.cache_namespace}|{suffix}"
+        self.crop_cache_namespace = f"{self.accurate.crop_cache_namespace}|{suffix}"
+
+    @classmethod
+    def from_config(cls, config: dict, client=None) -> Optional['CascadeAgePredictor']:
+        """
+        설정의 cascade 섹션으로 예측기를 생성합니다. 비활성화되어 있으면 None을 반환합니다.
+
+        Args:
+            config: 설정 딕셔너리
+            client: 추론 서버 클라이언트 (있으면 두 모델 모두 서버의 모델 사용)
+        """
+        if not (config.get('cascade') or {}).get('enabled', False):
+            return None
+        if client is not None:
+            from inference_server import RemoteAgePredictor, RemoteDeepFacePredictor
+            return cls(config, RemoteAgePredictor(client), RemoteDeepFacePredictor(client))
+
+        from deepface_age_predictor import DeepFaceAgePredictor
+        fast_config = fast_tier_config(config)
+        fast_predictor = create_age_predictor(fast_config, _fast_tier_device(fast_config))
+        return cls(config, fast_predictor, DeepFaceAgePredictor(config))
+
+    def needs_escalation(self, age: float) -> bool:
+        """1단계 나이가 기준 나이 ± band 안에 있으면 True를 반환합니다."""
+        return abs(age - self.UNDERAGE_MAX) <= self.band
+
+    def _fast_result(self, prediction: Dict) -> Dict:
+        """
+        1단계 예측만으로 리포트 결과를 생성합니다. (신뢰도는 1단계 모델의 확률)
+        나이와 범위는 모두 기대 나이 기준이며, 범위는 DeepFace 결과와 같은 방식으로 계산합니다.
+        """
+        age = expected_age(prediction)
+        age_range = estimate_age_range(age)
+        confidence = float(prediction['confidence'])
+        is_underage = age < self.UNDERAGE_MAX
+        return {
+            'has_face': True,
+            'predicted_age': round(age, 1),
+            'age_range': f"{age_range[0]}-{age_range[1]}",
+            'age_group': 'underage' if is_underage else 'adult',
+            'confidence': confidence,
+            'is_reliable': confidence >= self.MIN_CONFIDENCE,
+            'is_underage': is_underage
+        }
+
+    def predict_crops(self, crops: List[Image.Image], user_infos: Optional[list] = None) -> list:
+        """
+        얼굴 크롭들을 1단계 모델로 배치 예측하고, 경계 부근의 크롭만 DeepFace로 다시 예측합니다.
+
+        Returns:
+            List[Dict]: 각 크롭의 예측 결과 (tier, tier1_age, tier1_confidence 포함)
+        """
+        if not crops:
+            return []
+
+        try:
+            fast_predictions = self.fast.predict_batch(crops)
+        except Exception as e:
+            # 1단계 실패 시 모든 크롭을 DeepFace로 예측
+            logging.error(f"1단계 나이 예측 중 오류 발생: {str(e)}")
+            fast_predictions = [None] * len(crops)
+
+        results = [None] * len(crops)
+        escalated = []
+        for i, prediction in enumerate(fast_predictions):
+            if prediction is None or self.needs_escalation(expected_age(prediction)):
+                escalated.append(i)
+            else:
+                results[i] = {**self._fast_result(prediction), 'tier': TIER_FAST}
+
+        if escalated:
+            accurate_predictions = self.accurate.predict_batch(
+                [crops[i] for i in escalated], pre_detected=True
+            )
+            for i, prediction in zip(escalated, accurate_predictions):
+                results[i] = {**prediction, 'tier': TIER_DEEPFACE}
+
+        for i, result in enumerate(results):
+            prediction = fast_predictions[i]
+            result['tier1_age'] = round(expected_age(prediction), 1) if prediction else None
+            result['tier1_confidence'] = float(prediction['confidence']) if prediction else None
+            if user_infos and i < len(user_infos) and user_infos[i]:
+                result.update(user_infos[i])
+        return results
+
+    def predict_age(self, image: Image.Image, user_info: Optional[Dict] = None,
+                    pre_detected: bool = False) -> dict:
+        """
+        이미지 한 장의 나이를 예측합니다.
+        얼굴 크롭이 아니면 1단계 모델을 쓸 수 없으므로 DeepFace로만 예측합니다.
+        """
+        if pre_detected:
+            return self.predict_crops([image], [user_info] if user_info else None)[0]
+        result = self.accurate.predict_age(image, user_info)
+        result.update({'tier': TIER_DEEPFACE, 'tier1_age': None, 'tier1_confidence': None})
+        return result
+
+    def predict_batch(self, images: list, user_infos: Optional[list] = None,
+                      pre_detected: bool = False) -> list:
+        """여러 이미지의 나이를 예측합니다. (pre_detected이면 2단계 배치 예측)"""
+        if pre_detected:
+            return self.predict_crops(images, user_infos)
+        return [
+            self.predict_age(image, user_infos[i] if user_infos and i < len(user_infos) else None)
+            for i, image in enumerate(images)
+        ]
+
+    def warmup(self) -> None:
+        """두 모델을 미리 로드하고 빈 이미지로 한 번씩 추론합니다."""
+        for predictor in (self.fast, self.accurate):
+            warmup = getattr(predictor, 'warmup', None)
+            if warmup is not None:
+                warmup()
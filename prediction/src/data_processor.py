@@ -1,41 +1,248 @@
 import os
+import time
+import multiprocessing as mp
 from PIL import Image
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Tuple
-import torch
 import numpy as np
 from .face_detector import FaceDetector
-from .age_predictor import AgePredictor
-from .utils import get_image_files, extract_date_from_filename, extract_user_info_from_image
+from .age_predictor import create_age_predictor
+from .prediction_cache import PredictionCache, hash_file
+from .quality_gate import FaceQualityGate
+from .adaptive_sampling import AdaptiveSampler, newest_first, should_flush_for
+from .scheduler import UserScheduler, deadline_passed
+from .ocr_engine import OCREngine, default_user_info
+from .inference_server import InferenceClient, RemoteAgePredictor, RemoteFaceDetector
+from .image_io import DEFAULT_MAX_PIXELS, open_for_detection, scale_boxes, load_full_resolution
+from .timing import activate_from_config, get_timer
+from .pipeline import Pipeline, Stage
+from .utils import get_image_files, extract_date_from_filename
+
+def list_user_directories(base_directory: str) -> List[str]:
+    """기본 디렉토리 아래의 사용자 디렉토리 경로를 정렬된 순서로 반환합니다."""
+    return [
+        os.path.join(base_directory, user_dir)
+        for user_dir in sorted(os.listdir(base_directory))
+        if os.path.isdir(os.path.join(base_directory, user_dir))
+    ]
+
+def save_results(config: dict, all_results: List[Dict]) -> pd.DataFrame:
+    """
+    사용자별 처리 결과를 DataFrame으로 변환하고 results.csv로 저장합니다.
+    단계별 처리 시간은 같은 폴더의 timings.json으로 저장합니다.
+    """
+    timer = get_timer()
+    with timer.stage('csv_write'):
+        df = pd.DataFrame(all_results)
+        output_path = os.path.join(
+            config['data']['output_dir'],
+            'results.csv'
+        )
+        df.to_csv(output_path, index=False)
+        
+    if timer.enabled:
+        timer.save(config['data']['output_dir'])
+    return df
+
+def save_skipped_users(config: dict, scheduler: UserScheduler) -> None:
+    """시간 예산을 넘겨 건너뛴 사용자 목록을 results.csv와 같은 폴더에 저장합니다."""
+    skipped_file = scheduler.save_skipped(config['data']['output_dir'])
+    if skipped_file:
+        print(f"Time budget exceeded: {len(scheduler.skipped)} users skipped (see {skipped_file})")
 
 class DataProcessor:
     """데이터 처리를 위한 클래스"""
     
-    def __init__(self, config: dict, device: torch.device):
+    def __init__(self, config: dict, device: 'torch.device', face_detector=None,
+                 age_predictor=None, ocr_engine=None):
         """
         데이터 처리기를 초기화합니다.
         
         Args:
             config: 설정 딕셔너리
             device: 연산 장치 (CPU/GPU/MPS)
+            face_detector: 사용할 얼굴 감지기 (None이면 설정에 따라 FaceDetector 생성)
+            age_predictor: 사용할 나이 예측기 (None이면 models.vit.backend에 따라 생성)
+            ocr_engine: 사용할 OCR 엔진 (None이면 OCREngine 생성)
+            
+        inference_server.enabled이고 서버에 연결되면 주어지지 않은 모델은
+        직접 로드하지 않고 추론 서버의 모델을 사용합니다.
         """
         self.config = config
         self.device = device
-        self.face_detector = FaceDetector(config)
-        self.age_predictor = AgePredictor(config, device)
+        client = None
+        if face_detector is None or age_predictor is None:
+            client = InferenceClient.from_config(config)
+        if client is not None:
+            face_detector = face_detector or RemoteFaceDetector(client)
+            age_predictor = age_predictor or RemoteAgePredictor(client)
+        self.face_detector = face_detector or FaceDetector(config)
+        self.age_predictor = age_predictor or create_age_predictor(config, device)
         self.batch_size = config['processing']['batch_size']
         
-    def process_directory(self, directory: str) -> Dict:
+        # 검출은 축소 디코딩한 이미지에서 수행하고, 전체 해상도는 얼굴 크롭에만 사용
+        decode_config = config.get('decode') or {}
+        self.detection_max_side = decode_config.get('detection_max_side', 1024)
+        self.max_pixels = decode_config.get('max_pixels', DEFAULT_MAX_PIXELS)
+        
+        # 예측 결과 캐시 (모델/백엔드별 네임스페이스)
+        self.cache = PredictionCache.from_config(config)
+        self.faces_namespace = f"faces-detailed:{self.face_detector.method}:{self.detection_max_side}"
+        if not hasattr(self.face_detector, 'detect_faces_detailed'):
+            # 신뢰도/랜드마크가 없는 결과는 품질 검사를 거친 결과와 섞이지 않도록 따로 캐시
+            self.faces_namespace += ":boxes"
+        self.age_namespace = f"age:vit:{self.age_predictor.model_name}"
+        backend = getattr(self.age_predictor, 'backend', 'torch')
+        if backend != 'torch':
+            # ONNX/int8 결과는 PyTorch 결과와 미세하게 다르므로 별도로 캐시
+            self.age_namespace += f":{backend}"
+        
+        # 검출과 나이 추론 사이에서 쓸 수 없는 얼굴을 거르는 품질 검사 (비활성화 시 None)
+        self.quality_gate = FaceQualityGate.from_config(config)
+        
+        # 판정이 확정된 사용자의 남은 이미지를 건너뛰는 적응형 샘플링 (비활성화 시 None)
+        self.adaptive = AdaptiveSampler.from_config(config)
+        self.min_confidence = config['age_detection']['min_confidence']
+        
+        # 위험도 순서로 사용자를 처리하고 시간 예산을 넘기면 남은 사용자를 건너뜀 (비활성화 시 None)
+        self.scheduler = UserScheduler.from_config(config)
+        
+        # 얼굴 감지와 동시에 실행되는 OCR 엔진 풀
+        self.ocr_engine = ocr_engine or OCREngine(config, self.cache)
+        
+        # 배치 추론을 기다리는 얼굴 크롭 (얼굴 이미지, 결과를 받을 이미지 작업, 날짜, 캐시 키)
+        self._pending_faces: List[Tuple[Image.Image, Dict, str, str]] = []
+        
+    def warmup(self) -> None:
+        """얼굴 감지기와 나이 예측기를 미리 로드하고 빈 이미지로 한 번씩 실행합니다."""
+        dummy = Image.new('RGB', (self.detection_max_side or 224, self.detection_max_side or 224))
+        self.face_detector.detect_faces(dummy)
+        warmup = getattr(self.age_predictor, 'warmup', None)
+        if warmup is not None:
+            warmup()
+        
+    def _detect(self, image: Image.Image) -> List[Dict]:
         """
-        디렉토리 내의 모든 이미지를 처리합니다.
+        얼굴을 감지해 {'box', 'confidence', 'keypoints'} 리스트로 반환합니다.
+        신뢰도/랜드마크를 주지 않는 감지기는 None으로 채웁니다.
+        """
+        detect_detailed = getattr(self.face_detector, 'detect_faces_detailed', None)
+        if detect_detailed is not None:
+            return detect_detailed(image)
+        _, face_boxes = self.face_detector.detect_faces(image)
+        return [{'box': box, 'confidence': None, 'keypoints': None} for box in face_boxes]
         
-        Args:
-            directory: 처리할 디렉토리 경로
+    def _skip_face(self, results: Dict, reason: str) -> None:
+        """품질 검사에서 제외된 얼굴을 사유별로 집계합니다."""
+        results['faces_skipped'] += 1
+        results['skip_reasons'][reason] = results['skip_reasons'].get(reason, 0) + 1
+        
+    def _queue_face(self, face_image: Image.Image, results: Dict, date: str, cache_key: str = None) -> None:
+        """
+        얼굴 크롭을 대기열에 추가하고 배치 크기에 도달하면 추론합니다.
+        results는 user_id와 age_predictions를 가진 딕셔너리 (이미지 작업)입니다.
+        """
+        self._pending_faces.append((face_image, results, date, cache_key))
+        if len(self._pending_faces) >= self.batch_size or self._can_settle(results.get('tracker')):
+            self.flush_predictions()
             
-        Returns:
-            Dict: 처리 결과를 포함하는 딕셔너리
+    def _can_settle(self, tracker) -> bool:
+        """대기 중인 사용자의 크롭만으로 판정이 확정될 수 있으면 배치가 차기 전에 추론합니다."""
+        if tracker is None:
+            return False
+        pending = sum(1 for _, target, _, _ in self._pending_faces if target.get('tracker') is tracker)
+        return should_flush_for(tracker, pending)
+            
+    def _add_prediction(self, results: Dict, age_prediction: Dict, date: str) -> None:
+        """나이 예측 결과에 날짜를 붙여 이미지 작업에 추가합니다. (사용자 정보는 통계 계산 시 추가)"""
+        age_prediction['date'] = date
+        results['age_predictions'].append(age_prediction)
+        tracker = results.get('tracker')
+        if tracker is not None:
+            tracker.add(float(age_prediction.get('expected_age', age_prediction['age'])),
+                        age_prediction.get('confidence', 0) >= self.min_confidence)
+            
+    def flush_predictions(self) -> None:
         """
+        대기 중인 얼굴 크롭들을 한 번의 배치 추론으로 처리하고
+        결과를 원래 이미지의 사용자 결과와 날짜로 분배합니다.
+        """
+        if not self._pending_faces:
+            return
+            
+        pending, self._pending_faces = self._pending_faces, []
+        timer = get_timer()
+        start = time.perf_counter()
+        try:
+            predictions = self.age_predictor.predict_batch(
+                [face_image for face_image, _, _, _ in pending]
+            )
+        except Exception as e:
+            # 배치에 여러 사용자의 얼굴이 섞여 있으므로 문제 있는 크롭만 잃도록 하나씩 다시 추론
+            print(f"Error predicting batch of {len(pending)} faces, retrying one by one: {str(e)}")
+            predictions = []
+            for face_image, results, _, _ in pending:
+                try:
+                    predictions.append(self.age_predictor.predict_batch([face_image])[0])
+                except Exception as e:
+                    print(f"Error predicting face of user {results['user_id']}: {str(e)}")
+                    predictions.append(None)
+            
+        # 배치 시간을 얼굴 수로 나눠 얼굴마다 해당 사용자에 기록
+        per_face = (time.perf_counter() - start) / len(pending)
+        for (_, results, date, cache_key), age_prediction in zip(pending, predictions):
+            if age_prediction is None:
+                continue
+            timer.record('age_inference', per_face, results['user_id'])
+            self._cache_put(cache_key, self.age_namespace, age_prediction)
+            self._add_prediction(results, age_prediction, date)
+            
+    def _cache_get(self, key: str, namespace: str):
+        """캐시에서 값을 조회합니다. 캐시가 없거나 키가 없으면 None을 반환합니다."""
+        if self.cache is None or key is None:
+            return None
+        return self.cache.get(key, namespace)
+        
+    def _cache_put(self, key: str, namespace: str, value) -> None:
+        """캐시가 활성화되어 있으면 값을 저장합니다."""
+        if self.cache is not None and key is not None:
+            self.cache.put(key, namespace, value)
+            
+    def _finalize_results(self, results: Dict) -> Dict:
+        """모든 예측이 분배된 뒤 이미지별 결과를 합치고 사용자 정보와 사용자별 통계를 계산합니다."""
+        for task in sorted(results.pop('_tasks', []), key=lambda task: task['index']):
+            self._merge_task(results, task)
+            
+        # 백그라운드 OCR 결과 대기
+        user_info_future = results.pop('_user_info_future', None)
+        if user_info_future is not None:
+            results['user_info'] = user_info_future.result()
+        if results['user_info'] is None:
+            results['user_info'] = default_user_info(results['user_id'])
+            
+        # 적응형 샘플링: 확정된 판정과 처리하지 않은 이미지가 있는지 기록
+        tracker = results.pop('_tracker', None)
+        if tracker is not None:
+            results['verdict'] = tracker.verdict
+            results['early_exit'] = results['images_processed'] < results['total_images']
+        for age_prediction in results['age_predictions']:
+            age_prediction.update(results['user_info'])
+            
+        # 판정이 확정되어 건너뛴 이미지는 보지 않았으므로 얼굴 비율은 처리한 이미지 기준
+        images_seen = results['images_processed'] if results['early_exit'] else results['total_images']
+        if images_seen > 0:
+            results['face_ratio'] = results['faces_detected'] / images_seen
+            
+        if results['age_predictions']:
+            ages = [float(pred['age']) for pred in results['age_predictions']]
+            results['average_age'] = np.mean(ages)
+            results['age_std'] = np.std(ages)
+            
+        return results
+        
+    def _start_user(self, directory: str) -> Dict:
+        """사용자 디렉토리의 이미지 목록과 내용 해시를 읽어 사용자 작업을 만듭니다."""
         user_id = Path(directory).name
         results = {
             'user_id': user_id,
@@ -44,70 +251,315 @@ class DataProcessor:
             'age_predictions': [],
             'face_ratio': 0.0,
             'dates': [],
+            'faces_skipped': 0,  # 품질 검사에서 제외된 얼굴 수
+            'skip_reasons': {},  # 제외 사유별 얼굴 수
+            'images_processed': 0,  # 실제로 처리한 이미지 수 (적응형 샘플링으로 건너뛴 이미지 제외)
+            'verdict': None,  # 적응형 샘플링으로 확정된 판정 ('adult', 'underage')
+            'early_exit': False,  # 판정이 확정되어 남은 이미지를 건너뛰었는지 여부
             'user_info': None  # 사용자 정보 저장
         }
         
         # 이미지 파일 목록 가져오기
-        image_files = get_image_files(directory, self.config['data']['supported_formats'])
+        timer = get_timer()
+        with timer.stage('list', user_id):
+            image_files = get_image_files(directory, self.config['data']['supported_formats'])
         results['total_images'] = len(image_files)
         
-        if not image_files:
-            return results
+        # 전체 처리 대상이 아닌 사용자는 판정이 확정되면 남은 이미지를 건너뜀
+        tracker = self.adaptive.tracker(user_id) if self.adaptive and image_files else None
+        if tracker is not None:
+            results['_tracker'] = tracker
             
-        # 먼저 사용자 정보 추출 시도
-        for img_path in image_files:
-            user_info = extract_user_info_from_image(img_path)
-            if user_info['nick'] and user_info['country'] and user_info['gender']:
-                results['user_info'] = user_info
-                break
-        
-        # 사용자 정보를 찾지 못한 경우 기본값 사용
-        if not results['user_info']:
-            results['user_info'] = {
-                'fbUid': user_id,
-                'nick': None,
-                'country': None,
-                'gender': None
-            }
-            
-        # 이미지 처리
-        for img_path in image_files:
-            try:
-                image = Image.open(img_path).convert('RGB')
-                date = extract_date_from_filename(img_path)
-                
-                # 얼굴 감지
-                has_face, face_boxes = self.face_detector.detect_faces(image)
+        # 캐시 키로 사용할 이미지 내용 해시
+        content_hashes = {}
+        if self.cache:
+            for img_path in image_files:
+                try:
+                    content_hashes[img_path] = hash_file(img_path)
+                except OSError as e:
+                    print(f"Error hashing {img_path}: {str(e)}")
+                    
+        return {'results': results, 'image_files': image_files, 'content_hashes': content_hashes,
+                'tracker': tracker}
+        
+    def _image_tasks(self, job: Dict) -> List[Dict]:
+        """
+        사용자 작업을 이미지별 작업으로 나눕니다.
+        
+        작업은 검출 결과, 얼굴 크롭, 나이 예측, 건너뛴 사유를 모았다가 사용자 결과에
+        합쳐지며, user_id와 age_predictions를 가지므로 배치 추론 결과를 직접 받을 수
+        있습니다. 이미지가 없는 사용자는 빈 작업 하나로 표시합니다.
+        적응형 샘플링이 활성화되어 있으면 최신 이미지부터 처리합니다.
+        """
+        paths = job['image_files'] or [None]
+        if self.adaptive is not None and job['image_files']:
+            paths = newest_first(paths, extract_date_from_filename)
+        return [{
+            'job': job,
+            'index': index,
+            'user_id': job['results']['user_id'],
+            'path': img_path,
+            'hash': job['content_hashes'].get(img_path),
+            'date': extract_date_from_filename(img_path) if img_path else None,
+            'faces': None,
+            'detection_image': None,
+            'scale': 1.0,
+            'crops': [],  # 나이 예측을 기다리는 (얼굴 크롭, 캐시 키)
+            'age_predictions': [],
+            'skip_reasons': [],
+            'tracker': job['tracker'],  # 사용자의 판정 추적기 (적응형 샘플링이 아니면 None)
+            'early_exit': False,  # 판정이 확정되어 처리하지 않은 이미지
+            'done': img_path is None  # True이면 이후 단계를 건너뜀 (빈 작업, 오류, 판정 확정)
+        } for index, img_path in enumerate(paths)]
+        
+    def _merge_task(self, results: Dict, task: Dict) -> None:
+        """이미지 작업의 결과를 사용자 결과에 합칩니다. (판정 확정으로 건너뛴 이미지는 제외)"""
+        if task['early_exit']:
+            return
+        if task['path'] is not None:
+            results['images_processed'] += 1
+        if task['faces']:
+            results['faces_detected'] += 1
+            results['dates'].append(task['date'])
+        results['age_predictions'].extend(task['age_predictions'])
+        for reason in task['skip_reasons']:
+            self._skip_face(results, reason)
+            
+    def _task_stage(self, fn):
+        """
+        이미지 작업 단계 함수를 감싸 파이프라인 단계로 만듭니다.
+        오류가 난 이미지는 기록하고 이후 단계를 건너뛰되, 사용자 집계에는 전달합니다.
+        사용자의 판정이 확정되었으면 남은 단계를 실행하지 않습니다.
+        """
+        def run(task: Dict, *args) -> List[Dict]:
+            tracker = task['tracker']
+            if not task['done'] and tracker is not None and tracker.settled:
+                task['done'] = task['early_exit'] = True
+                task['crops'] = []
+            if not task['done']:
+                try:
+                    fn(task, *args)
+                except Exception as e:
+                    print(f"Error processing {task['path']}: {str(e)}")
+                    task['done'] = True
+            return [task]
+        return run
+        
+    def _decode_image(self, task: Dict) -> None:
+        """캐시에 얼굴 검출 결과가 없을 때만 검출용으로 축소 디코딩합니다."""
+        if task['faces'] is not None or task['detection_image'] is not None:
+            return
+        task['faces'] = self._cache_get(task['hash'], self.faces_namespace)
+        if task['faces'] is None:
+            with get_timer().stage('decode', task['user_id']):
+                task['detection_image'], task['scale'] = open_for_detection(
+                    task['path'], self.detection_max_side, max_pixels=self.max_pixels
+                )
                 
-                if has_face:
-                    results['faces_detected'] += 1
-                    results['dates'].append(date)
+    def _detect_image(self, task: Dict, detect=None) -> None:
+        """
+        축소 이미지에서 얼굴을 검출해 원본 해상도 좌표로 바꾸고 캐시에 저장합니다.
+        
+        Args:
+            task: 이미지 작업
+            detect: 축소 이미지를 받아 얼굴 리스트를 반환하는 함수 (None이면 현재 스레드에서 검출)
+        """
+        self._decode_image(task)  # decode 단계를 생략한 구성
+        if task['faces'] is not None:
+            return
+        detection_image, task['detection_image'] = task['detection_image'], None
+        with get_timer().stage('detection', task['user_id']):
+            faces = (detect or self._detect)(detection_image)
+        # 랜드마크는 자세 비율 계산에만 쓰므로 축소 좌표 그대로 둠
+        for face, box in zip(faces, scale_boxes([face['box'] for face in faces], task['scale'])):
+            face['box'] = box
+        self._cache_put(task['hash'], self.faces_namespace, faces)
+        task['faces'] = faces
+        
+    def _check_faces(self, task: Dict) -> None:
+        """
+        검출된 얼굴마다 품질 검사와 예측 캐시 조회를 하고, 예측이 필요한 얼굴만
+        전체 해상도에서 잘라 작업의 크롭 목록에 추가합니다.
+        """
+        timer = get_timer()
+        user_id = task['user_id']
+        image = None
+        faces = list(enumerate(task['faces'] or []))
+        if self.adaptive is not None:
+            # 큰 얼굴이 더 신뢰할 수 있는 예측을 주므로 먼저 처리 (캐시 키는 검출 순서 유지)
+            faces.sort(key=lambda indexed: -indexed[1]['box'][2] * indexed[1]['box'][3])
+        for face_index, face in faces:
+            face_box = face['box']
+            # 크기/신뢰도/자세 검사는 전체 해상도 디코딩 전에 수행
+            if self.quality_gate is not None:
+                reason = self.quality_gate.check_detection(
+                    face_box, face.get('confidence'), face.get('keypoints')
+                )
+                if reason:
+                    task['skip_reasons'].append(reason)
+                    continue
                     
-                    # 각 얼굴에 대해 나이 예측
-                    for face_box in face_boxes:
-                        face_image = self.face_detector.crop_face(image, face_box)
-                        age_prediction = self.age_predictor.predict_age(face_image, results['user_info'])
-                        age_prediction['date'] = date
-                        results['age_predictions'].append(age_prediction)
-                        
-            except Exception as e:
-                print(f"Error processing {img_path}: {str(e)}")
+            cache_key = f"{task['hash']}:{face_index}" if task['hash'] else None
+            age_prediction = self._cache_get(cache_key, self.age_namespace)
+            if age_prediction is not None:
+                self._add_prediction(task, age_prediction, task['date'])
                 continue
                 
+            # 전체 해상도는 얼굴 크롭이 필요할 때만 디코딩
+            if image is None:
+                with timer.stage('decode', user_id):
+                    image = load_full_resolution(task['path'], self.max_pixels)
+            with timer.stage('crop', user_id):
+                face_image = self.face_detector.crop_face(image, face_box)
+            if self.quality_gate is not None:
+                with timer.stage('quality_gate', user_id):
+                    reason = self.quality_gate.check_crop(face_image)
+                if reason:
+                    task['skip_reasons'].append(reason)
+                    continue
+            task['crops'].append((face_image, cache_key))
+            
+    def _queue_crops(self, task: Dict) -> None:
+        """작업의 얼굴 크롭을 배치 대기열에 넣습니다. (예측 결과는 작업에 추가됨)"""
+        crops, task['crops'] = task['crops'], []
+        tracker = task['tracker']
+        if crops and tracker is not None and tracker.settled:
+            # 크롭하는 사이에 판정이 확정되었으면 추론하지 않음 (캐시된 예측이 있으면 처리한 이미지로 집계)
+            task['early_exit'] = not task['age_predictions']
+            return
+        for face_image, cache_key in crops:
+            self._queue_face(face_image, task, task['date'], cache_key)
+            
+    def process_directory(self, directory: str, flush: bool = True) -> Dict:
+        """
+        디렉토리 내의 모든 이미지를 현재 스레드에서 차례로 처리합니다.
+        (파이프라인의 decode/detect/quality 단계와 같은 함수 사용)
+        
+        Args:
+            directory: 처리할 디렉토리 경로
+            flush: True이면 남은 얼굴 크롭을 바로 추론하고 통계를 계산합니다.
+                False이면 크롭을 다음 사용자와 같은 배치에 모으며, 호출자가
+                flush_predictions()와 _finalize_results()를 호출해야 합니다.
+            
+        Returns:
+            Dict: 처리 결과를 포함하는 딕셔너리
+        """
+        job = self._start_user(directory)
+        results = job['results']
+        if not job['image_files']:
+            return results
+            
+        # 사용자 정보 추출은 얼굴 감지와 동시에 백그라운드에서 실행
+        # (정보를 모두 읽은 첫 이미지에서 중단, 찾지 못하면 기본값 사용)
+        results['_user_info_future'] = self.ocr_engine.submit_user(results['user_id'], job['image_files'])
+        
+        # 이미지 처리 (얼굴 크롭은 배치 단위로 나이 예측)
+        detect = self._task_stage(self._detect_image)
+        check = self._task_stage(self._check_faces)
+        tasks = self._image_tasks(job)
+        for task in tasks:
+            detect(task)
+            check(task)
+            self._queue_crops(task)
+        results['_tasks'] = tasks
+                
+        if not flush:
+            return results
+            
         # 결과 계산
-        if results['total_images'] > 0:
-            results['face_ratio'] = results['faces_detected'] / results['total_images']
+        self.flush_predictions()
+        return self._finalize_results(results)
+        
+    def build_pipeline(self) -> Pipeline:
+        """
+        설정의 pipeline.processor 구성으로 사용자 디렉토리를 처리하는 파이프라인을 만듭니다.
+        
+        단계: list(사용자 → 이미지 작업) → decode → detect → quality →
+        predict(사용자 경계를 넘는 배치 추론) → aggregate(사용자별 통계) → write(results.csv)
+        
+        스케줄러가 있으면 list 단계에서 시간 예산을 넘긴 사용자를 건너뛰고,
+        write 단계에서 checkpoint_every명마다 중간 결과를 results.csv에 저장합니다.
+        """
+        held_tasks = []  # 배치 추론을 기다리는 작업
+        open_jobs = {}  # 아직 모든 이미지가 모이지 않은 사용자 작업
+        collected = []  # 확정된 사용자 결과
+        
+        def list_user(directory):
+            if self.scheduler is not None and not self.scheduler.admit(Path(directory).name):
+                return []
+            print(f"Processing user: {Path(directory).name}")
+            job = self._start_user(directory)
+            if job['image_files']:
+                # 사용자 정보 추출은 얼굴 감지와 동시에 백그라운드에서 실행 (aggregate 단계에서 결과 사용)
+                job['results']['_user_info_future'] = self.ocr_engine.submit_user(
+                    job['results']['user_id'], job['image_files']
+                )
+            return self._image_tasks(job)
             
-        if results['age_predictions']:
-            ages = [float(pred['age']) for pred in results['age_predictions']]
-            results['average_age'] = np.mean(ages)
-            results['age_std'] = np.std(ages)
+        def predict(task):
+            self._queue_crops(task)
+            held_tasks.append(task)
+            # 크롭이 모두 추론된 작업만 다음 단계로 보냄
+            pending = {id(target) for _, target, _, _ in self._pending_faces}
+            released = [held for held in held_tasks if id(held) not in pending]
+            held_tasks[:] = [held for held in held_tasks if id(held) in pending]
+            return released
             
-        return results
+        def flush_predict():
+            self.flush_predictions()
+            released = list(held_tasks)
+            held_tasks.clear()
+            return released
+            
+        def finalize(job):
+            results = job['results']
+            results['_tasks'] = job.get('tasks', [])
+            return self._finalize_results(results)
+            
+        def aggregate(task):
+            job = task['job']
+            job.setdefault('tasks', []).append(task)
+            open_jobs[id(job)] = job
+            if len(job['tasks']) < max(1, len(job['image_files'])):
+                return []
+            del open_jobs[id(job)]
+            return [finalize(job)]
+            
+        def flush_aggregate():
+            # 오류로 일부 이미지 작업이 전달되지 않은 사용자도 모은 결과로 확정
+            jobs = list(open_jobs.values())
+            open_jobs.clear()
+            return [finalize(job) for job in jobs]
+            
+        def collect(results):
+            collected.append(results)
+            if self.scheduler is not None and self.scheduler.should_checkpoint(len(collected)):
+                # 실행이 중간에 끊겨도 위험도가 높은 사용자의 결과는 남도록 중간 저장
+                save_results(self.config, sorted(collected, key=lambda results: results['user_id']))
+            return []
+            
+        def write():
+            # 사용자 디렉토리 이름 순서로 저장
+            df = save_results(self.config, sorted(collected, key=lambda results: results['user_id']))
+            if self.scheduler is not None:
+                save_skipped_users(self.config, self.scheduler)
+            return [df]
+            
+        return Pipeline.from_config(self.config, 'processor', [
+            Stage('list', list_user),
+            Stage('decode', self._task_stage(self._decode_image), optional=True),
+            Stage('detect', self._task_stage(self._detect_image), work=self._detect,
+                  process_work=_detect_in_worker, initializer=_init_detect_worker,
+                  initargs=(self.config,)),
+            Stage('quality', self._task_stage(self._check_faces)),
+            Stage('predict', predict, flush=flush_predict),
+            Stage('aggregate', aggregate, flush=flush_aggregate),
+            Stage('write', collect, flush=write)
+        ])
         
     def process_all_users(self, base_directory: str) -> pd.DataFrame:
         """
-        모든 사용자의 데이터를 처리합니다.
+        모든 사용자의 데이터를 파이프라인으로 처리합니다.
         
         Args:
             base_directory: 기본 디렉토리 경로
@@ -115,23 +567,150 @@ class DataProcessor:
         Returns:
             pd.DataFrame: 모든 사용자의 처리 결과
         """
-        all_results = []
+        activate_from_config(self.config)
+        pipeline = self.build_pipeline()
+        print(f"Pipeline: {pipeline.describe()}")
         
-        for user_dir in os.listdir(base_directory):
-            user_path = os.path.join(base_directory, user_dir)
-            if os.path.isdir(user_path):
-                print(f"Processing user: {user_dir}")
-                result = self.process_directory(user_path)
-                all_results.append(result)
-                
-        # 결과를 DataFrame으로 변환
-        df = pd.DataFrame(all_results)
+        user_paths = list_user_directories(base_directory)
+        if self.scheduler is not None:
+            self.scheduler.start()
+            user_paths = self.scheduler.order(user_paths)
+            
+        # 얼굴 크롭은 사용자 경계를 넘어 배치로 모아서 추론
+        outputs = pipeline.run(user_paths)
+        return outputs[0] if outputs else pd.DataFrame()
+
+# 파이프라인 detect 단계를 프로세스로 실행할 때 워커의 얼굴 감지기
+_worker_detector = None
+
+def _init_detect_worker(config: dict) -> None:
+    """detect 단계 워커 프로세스의 얼굴 감지기를 만듭니다. (모델은 처음 사용할 때 로드)"""
+    global _worker_detector
+    _worker_detector = FaceDetector(config)
+
+def _detect_in_worker(image: Image.Image) -> List[Dict]:
+    """워커 프로세스에서 축소 이미지의 얼굴을 검출합니다."""
+    return _worker_detector.detect_faces_detailed(image)
+
+# 워커 프로세스의 데이터 처리기 (프로세스당 모델을 한 번만 로드)
+_worker_processor = None
+
+def _init_worker(config: dict, device_name: str, processor_factory=None, warmup: bool = False) -> None:
+    """워커 프로세스 시작 시 데이터 처리기를 만듭니다. (모델은 처음 사용할 때 로드)"""
+    import torch
+    global _worker_processor
+    _worker_processor = (processor_factory or DataProcessor)(config, torch.device(device_name))
+    if warmup:
+        _worker_processor.warmup()
+
+def _process_shard(shard: Tuple[List[str], float]) -> Tuple[List[Dict], Dict, List[str]]:
+    """
+    워커 프로세스에서 사용자 디렉토리 묶음을 처리합니다.
+    
+    Args:
+        shard: (사용자 디렉토리 경로 리스트, 시간 예산 마감 시각 또는 None)
+    
+    Returns:
+        (List[Dict], Dict, List[str]): 사용자별 결과, 이 묶음의 단계별 처리 시간 측정값,
+            마감 시각이 지나 건너뛴 사용자 ID
+    """
+    user_paths, deadline = shard
+    timer = activate_from_config(_worker_processor.config)
+    results = []
+    skipped = []
+    for user_path in user_paths:
+        if deadline_passed(deadline):
+            skipped.append(Path(user_path).name)
+            continue
+        print(f"[worker {os.getpid()}] Processing user: {Path(user_path).name}")
+        results.append(_worker_processor.process_directory(user_path, flush=False))
         
-        # 결과 저장
-        output_path = os.path.join(
-            self.config['data']['output_dir'],
-            'results.csv'
-        )
-        df.to_csv(output_path, index=False)
+    _worker_processor.flush_predictions()
+    results = [_worker_processor._finalize_results(result) for result in results]
+    return results, timer.export(), skipped
+
+def _build_shards(user_paths: List[str], supported_formats: list, max_images: int) -> List[List[str]]:
+    """
+    사용자 디렉토리를 이미지 수 기준으로 묶습니다.
+    
+    max_images가 0이면 사용자 하나가 하나의 작업이 되고, 그렇지 않으면
+    각 묶음의 이미지 수가 max_images를 넘지 않도록 연속된 사용자를 묶습니다.
+    (사용자 한 명의 이미지가 max_images보다 많으면 단독 묶음이 됩니다.)
+    """
+    if not max_images:
+        return [[user_path] for user_path in user_paths]
         
-        return df
+    shards = []
+    current, current_images = [], 0
+    for user_path in user_paths:
+        num_images = len(get_image_files(user_path, supported_formats))
+        if current and current_images + num_images > max_images:
+            shards.append(current)
+            current, current_images = [], 0
+        current.append(user_path)
+        current_images += num_images
+        
+    if current:
+        shards.append(current)
+    return shards
+
+def process_all_users_parallel(config: dict, device: 'torch.device', base_directory: str,
+                               num_workers: int, processor_factory=None,
+                               warmup: bool = False) -> pd.DataFrame:
+    """
+    사용자 디렉토리를 여러 프로세스에 나눠 처리합니다.
+    
+    각 워커는 시작할 때 모델을 한 번 로드하며, processing.max_images_per_worker가
+    설정되어 있으면 그만큼의 이미지를 처리한 뒤 새 프로세스로 교체되어
+    TensorFlow/torch 메모리 증가를 제한합니다. 결과는 사용자 디렉토리 이름 순서로
+    병합되어 단일 프로세스 모드와 같은 results.csv에 저장됩니다.
+    스케줄러가 설정되어 있으면 위험도 순서로 묶음을 만들고, 시간 예산을 넘긴 뒤
+    시작하지 못한 사용자는 건너뜁니다.
+    
+    Args:
+        config: 설정 딕셔너리
+        device: 연산 장치 (CPU/GPU/MPS)
+        base_directory: 기본 디렉토리 경로
+        num_workers: 워커 프로세스 수
+        processor_factory: 워커에서 (config, device)로 처리기를 만드는 모듈 수준 함수
+            (None이면 DataProcessor, 벤치마크의 스텁 모델 등에 사용)
+        warmup: True이면 각 워커가 시작할 때 모델을 로드하고 한 번 추론
+        
+    Returns:
+        pd.DataFrame: 모든 사용자의 처리 결과
+    """
+    max_images = config['processing'].get('max_images_per_worker', 0)
+    user_paths = list_user_directories(base_directory)
+    scheduler = UserScheduler.from_config(config)
+    if scheduler is not None:
+        scheduler.start()
+        user_paths = scheduler.order(user_paths)
+    shards = _build_shards(user_paths, config['data']['supported_formats'], max_images)
+    deadline = scheduler.deadline if scheduler is not None else None
+    
+    # torch/TensorFlow는 fork 이후 안전하지 않으므로 spawn 사용
+    context = mp.get_context('spawn')
+    timer = activate_from_config(config)
+    all_results = []
+    with context.Pool(
+        processes=num_workers,
+        initializer=_init_worker,
+        initargs=(config, str(device), processor_factory, warmup),
+        maxtasksperchild=1 if max_images else None
+    ) as pool:
+        # imap은 작업 순서대로 결과를 돌려주므로 출력 순서가 결정적임
+        for shard_results, shard_timings, shard_skipped in pool.imap(
+                _process_shard, [(shard, deadline) for shard in shards]):
+            all_results.extend(shard_results)
+            timer.merge(shard_timings)
+            for user_id in shard_skipped:
+                scheduler.mark_skipped(user_id)
+            if scheduler is not None and scheduler.checkpoint_every:
+                # 묶음이 끝날 때마다 중간 결과 저장
+                save_results(config, sorted(all_results, key=lambda results: results['user_id']))
+                
+    if scheduler is None:
+        return save_results(config, all_results)
+    df = save_results(config, sorted(all_results, key=lambda results: results['user_id']))
+    save_skipped_users(config, scheduler)
+    return df
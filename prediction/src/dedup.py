@@ -0,0 +1,152 @@
+"""
+지각 해시(dHash)를 이용한 근접 중복 캡처 그룹화
+
+연속된 날짜에 거의 같은 캡처가 반복되는 경우, 그룹마다 대표 이미지 하나만
+추론하고 결과를 나머지 이미지에 전파하기 위해 사용합니다.
+"""
+
+import os
+import glob
+import logging
+from typing import Dict, List, Optional, Sequence
+from PIL import Image
+
+def dhash(path: str, hash_size: int = 8, ignore_header_ratio: float = 0.0) -> int:
+    """
+    이미지의 차분 해시(dHash)를 계산합니다.
+
+    Args:
+        path: 이미지 파일 경로
+        hash_size: 해시 한 변의 크기 (hash_size^2 비트)
+        ignore_header_ratio: 해시에서 제외할 상단 영역 비율 (날짜 등 캡처마다 다른 텍스트)
+
+    Returns:
+        int: hash_size^2 비트 해시
+    """
+    with Image.open(path) as image:
+        # 해시는 아주 작은 이미지로 계산하므로 JPEG은 최대한 축소 디코딩
+        if image.format == 'JPEG':
+            image.draft('L', (hash_size * 8, hash_size * 8))
+        gray = image.convert('L')
+
+    if ignore_header_ratio:
+        width, height = gray.size
+        gray = gray.crop((0, int(height * ignore_header_ratio), width, height))
+
+    pixels = list(gray.resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | int(pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+def hamming_distance(a: int, b: int) -> int:
+    """두 해시의 해밍 거리를 반환합니다."""
+    return bin(a ^ b).count('1')
+
+class NearDuplicateGrouper:
+    """사용자 폴더 안(선택적으로 다른 주차 포함)의 근접 중복 이미지를 그룹화하는 클래스"""
+
+    def __init__(self, config: dict, cache=None):
+        """
+        그룹화기를 초기화.
+
+        Args:
+            config: 설정 딕셔너리
+            cache: PredictionCache (선택사항, 이미지 해시 저장)
+        """
+        dedup_config = config.get('dedup') or {}
+        self.hash_size = dedup_config.get('hash_size', 8)
+        self.max_distance = dedup_config.get('max_distance', 6)
+        self.ignore_header_ratio = dedup_config.get('ignore_header_ratio', 0.15)
+        self.reference_dirs = dedup_config.get('reference_dirs') or []
+        self.supported_formats = [fmt.lower() for fmt in config['data']['supported_formats']]
+        self.cache = cache
+        self.cache_namespace = f"phash:dhash:{self.hash_size}:{self.ignore_header_ratio}"
+
+    @classmethod
+    def from_config(cls, config: dict, cache=None) -> Optional['NearDuplicateGrouper']:
+        """설정의 dedup 섹션으로 그룹화기를 생성합니다. 비활성화되어 있으면 None을 반환합니다."""
+        if not (config.get('dedup') or {}).get('enabled', False):
+            return None
+        return cls(config, cache)
+
+    @staticmethod
+    def stat_key(path: str) -> str:
+        """내용 해시 대신 쓰는 캐시 키 (경로+크기+수정 시각, 증분 매니페스트와 같은 기준)"""
+        stat = os.stat(path)
+        return f"stat:{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def image_hash(self, path: str, content_hash: Optional[str] = None) -> int:
+        """
+        이미지의 지각 해시를 계산합니다. 캐시가 있으면 먼저 조회하며, 내용 해시가 없으면
+        (다른 주차 이미지 등) 경로+크기+수정 시각을 키로 씁니다.
+        """
+        if self.cache is not None and not content_hash:
+            content_hash = self.stat_key(path)
+        if self.cache is not None and content_hash:
+            cached = self.cache.get(content_hash, self.cache_namespace)
+            if cached is not None:
+                return int(cached, 16)
+
+        value = dhash(path, self.hash_size, self.ignore_header_ratio)
+        if self.cache is not None and content_hash:
+            # JSON 정수 범위를 넘지 않도록 16진수 문자열로 저장
+            self.cache.put(content_hash, self.cache_namespace, format(value, 'x'))
+        return value
+
+    def reference_files(self, folder_path: str) -> List[str]:
+        """다른 주차 데이터 경로에서 같은 사용자 폴더의 이미지들을 찾습니다."""
+        user_folder = os.path.basename(os.path.normpath(folder_path))
+        files = []
+        for pattern in self.reference_dirs:
+            for reference_dir in sorted(glob.glob(pattern)):
+                candidate = os.path.join(reference_dir, user_folder)
+                if not os.path.isdir(candidate) or os.path.samefile(candidate, folder_path):
+                    continue
+                files.extend(
+                    os.path.join(candidate, name) for name in sorted(os.listdir(candidate))
+                    if os.path.splitext(name)[1].lower() in self.supported_formats
+                )
+        return files
+
+    def group(self, image_files: Sequence[str], reference_files: Sequence[str] = (),
+              content_hashes: Optional[Dict[str, str]] = None) -> List[List[str]]:
+        """
+        이미지들을 근접 중복 그룹으로 나눕니다.
+
+        다른 주차 이미지(reference_files)는 먼저 그룹의 대표가 되어 이번 주차
+        이미지가 이전 결과를 재사용할 수 있게 하고, 이번 주차 이미지와 묶이지
+        않은 다른 주차 이미지의 그룹은 결과에서 제외합니다.
+
+        Args:
+            image_files: 이번 주차 이미지 경로 리스트
+            reference_files: 다른 주차 이미지 경로 리스트
+            content_hashes: 이미지별 내용 해시 (캐시 키)
+
+        Returns:
+            List[List[str]]: 그룹 리스트, 각 그룹의 첫 번째 요소가 대표 이미지
+        """
+        content_hashes = content_hashes or {}
+        current = set(image_files)
+        groups = []  # (대표 해시, 그룹 멤버 리스트)
+
+        for path in list(reference_files) + list(image_files):
+            try:
+                value = self.image_hash(path, content_hashes.get(path))
+            except Exception as e:
+                logging.warning(f"지각 해시 계산 중 오류 발생 {path}: {str(e)}")
+                if path in current:
+                    groups.append((None, [path]))
+                continue
+
+            for representative_hash, members in groups:
+                if representative_hash is not None and \
+                        hamming_distance(representative_hash, value) <= self.max_distance:
+                    members.append(path)
+                    break
+            else:
+                groups.append((value, [path]))
+
+        return [members for _, members in groups if any(member in current for member in members)]
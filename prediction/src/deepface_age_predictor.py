@@ -3,12 +3,39 @@ DeepFace를 사용한 나이 예측 클래스
 """
 
 import os
-from deepface import DeepFace
+import cv2
+from importlib import metadata
 from PIL import Image
 import numpy as np
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, List, Tuple
 import logging
 
+# DeepFace 나이 모델 입력 크기
+AGE_MODEL_INPUT_SIZE = 224
+
+def estimate_age_range(age: float) -> Tuple[int, int]:
+    """예측된 나이에 대한 추정 범위 (최소 나이, 최대 나이)를 반환합니다."""
+    # 나이에 따라 다른 범위 적용
+    if age < 15:
+        margin = 1
+    elif age < 20:
+        margin = 2
+    else:
+        margin = 3
+    return (max(0, int(age - margin)), int(age + margin))
+
+def _deepface():
+    """DeepFace를 처음 사용할 때 가져옵니다. (TensorFlow 로딩에 수 초가 걸림)"""
+    from deepface import DeepFace
+    return DeepFace
+
+def _deepface_version() -> str:
+    """DeepFace를 import하지 않고 설치된 버전을 반환합니다."""
+    try:
+        return metadata.version('deepface')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
 class DeepFaceAgePredictor:
     """DeepFace를 사용한 나이 예측 클래스"""
     
@@ -21,6 +48,18 @@ class DeepFaceAgePredictor:
         """
         self.UNDERAGE_MAX = config['age_detection']['underage_threshold']
         self.MIN_CONFIDENCE = config['age_detection']['min_confidence']
+        self.detector_backend = config['age_detection'].get('detector_backend', 'opencv')
+        
+        # 크롭 모드: 사전 검출된 얼굴 크롭만 나이 모델에 배치로 입력 (검출 백엔드 생략)
+        self.crop_mode = config['age_detection'].get('crop_mode', False)
+        
+        # 예측 캐시 네임스페이스 (DeepFace 버전별로 결과 구분)
+        version = _deepface_version()
+        self.cache_namespace = f"age:deepface:{version}:{self.detector_backend}"
+        self.crop_cache_namespace = f"age:deepface-crop:{version}"
+        
+        # 크롭 모드에서 사용하는 나이 모델 (최초 사용 시 한 번만 로드)
+        self._age_model = None
         
     def _convert_to_age_group(self, age: float) -> str:
         """
@@ -46,15 +85,7 @@ class DeepFaceAgePredictor:
         Returns:
             Tuple[int, int]: (최소 나이, 최대 나이)
         """
-        # 나이에 따라 다른 범위 적용
-        if age < 15:
-            margin = 1
-        elif age < 20:
-            margin = 2
-        else:
-            margin = 3
-            
-        return (max(0, int(age - margin)), int(age + margin))
+        return estimate_age_range(age)
         
     def _calculate_confidence(self, result: dict) -> float:
         """
@@ -78,57 +109,84 @@ class DeepFaceAgePredictor:
         confidence = (face_confidence + age_confidence) / 2
         return min(1.0, max(0.0, confidence))
         
-    def predict_age(self, image: Image.Image, user_info: Optional[Dict] = None) -> dict:
+    def _empty_result(self, error: Optional[str] = None) -> dict:
+        """얼굴이 없거나 분석에 실패한 경우의 결과를 생성."""
+        result = {
+            'has_face': False,
+            'predicted_age': None,
+            'age_range': None,
+            'age_group': None,
+            'confidence': None,
+            'is_reliable': False,
+            'is_underage': None
+        }
+        if error is not None:
+            result['error'] = error
+        return result
+        
+    def _build_result(self, predicted_age: float, analysis: dict) -> dict:
+        """
+        예측된 나이로 결과 딕셔너리를 생성.
+        
+        Args:
+            predicted_age: 예측된 나이
+            analysis: 신뢰도 계산에 사용할 분석 결과 ('age', 'face_confidence')
+                face_confidence는 품질 검사용으로 결과에도 그대로 포함
+            
+        Returns:
+            dict: 예측 결과 딕셔너리
+        """
+        # 나이 범위와 그룹 계산
+        age_range = self._get_age_range(predicted_age)
+        age_group = self._convert_to_age_group(predicted_age)
+        
+        # 신뢰도 계산
+        confidence = self._calculate_confidence(analysis)
+        
+        return {
+            'has_face': True,
+            'predicted_age': round(predicted_age, 1),
+            'age_range': f"{age_range[0]}-{age_range[1]}",
+            'age_group': age_group,
+            'confidence': confidence,
+            'is_reliable': confidence >= self.MIN_CONFIDENCE,
+            'is_underage': age_group == 'underage',
+            'face_confidence': analysis.get('face_confidence')
+        }
+        
+    def predict_age(self, image: Image.Image, user_info: Optional[Dict] = None,
+                    pre_detected: bool = False) -> dict:
         """
         이미지에서 나이를 예측.
         
         Args:
             image: PIL Image 객체
             user_info: 사용자 정보 딕셔너리 (선택사항)
+            pre_detected: True이면 이미 잘라낸 얼굴 이미지로 보고 얼굴 검출을 건너뜀
             
         Returns:
             dict: 예측 결과를 포함하는 딕셔너리
         """
+        if pre_detected:
+            return self.predict_crops([image], [user_info] if user_info else None)[0]
+            
         try:
             # PIL Image를 numpy 배열로 변환
             img_array = np.array(image)
             
             # DeepFace 분석 수행
-            result = DeepFace.analyze(
+            result = _deepface().analyze(
                 img_array,
                 actions=['age'],
+                detector_backend=self.detector_backend,
                 enforce_detection=False,
                 silent=True
             )[0]  # 첫 번째 얼굴만 사용
             
             if not result or 'age' not in result:
-                return {
-                    'has_face': False,
-                    'predicted_age': None,
-                    'age_range': None,
-                    'age_group': None,
-                    'confidence': None,
-                    'is_reliable': False
-                }
-            
-            predicted_age = float(result['age'])
-            
-            # 나이 범위와 그룹 계산
-            age_range = self._get_age_range(predicted_age)
-            age_group = self._convert_to_age_group(predicted_age)
-            
-            # 신뢰도 계산
-            confidence = self._calculate_confidence(result)
-            
-            result = {
-                'has_face': True,
-                'predicted_age': round(predicted_age, 1),
-                'age_range': f"{age_range[0]}-{age_range[1]}",
-                'age_group': age_group,
-                'confidence': confidence,
-                'is_reliable': confidence >= self.MIN_CONFIDENCE,
-                'is_underage': age_group == 'underage'
-            }
+                return self._empty_result()
+            
+            result = self._build_result(float(result['age']), result)
             
             # 사용자 정보가 있으면 추가
             if user_info:
@@ -138,30 +196,115 @@ class DeepFaceAgePredictor:
             
         except Exception as e:
             logging.error(f"DeepFace 분석 중 오류 발생: {str(e)}")
-            return {
-                'has_face': False,
-                'predicted_age': None,
-                'age_range': None,
-                'age_group': None,
-                'confidence': None,
-                'is_reliable': False,
-                'error': str(e)
-            }
-            
-    def predict_batch(self, images: list, user_infos: Optional[list] = None) -> list:
+            return self._empty_result(str(e))
+            
+    def _get_age_model(self):
+        """DeepFace 나이 모델을 로드해 메모리에 유지."""
+        if self._age_model is None:
+            DeepFace = _deepface()
+            try:
+                model = DeepFace.build_model(model_name='Age', task='facial_attribute')
+            except TypeError:
+                # 이전 버전 DeepFace는 task 인자를 받지 않음
+                model = DeepFace.build_model('Age')
+            # 최근 버전은 keras 모델을 감싼 클라이언트 객체를 반환
+            self._age_model = getattr(model, 'model', model)
+        return self._age_model
+        
+    def _preprocess_crops(self, crops: List[Image.Image]) -> np.ndarray:
+        """
+        얼굴 크롭들을 나이 모델 입력 배치로 변환.
+        
+        DeepFace와 같이 비율을 유지한 채 224x224에 맞춰 가운데 정렬하고,
+        BGR 순서와 0~1 범위로 정규화.
+        
+        Args:
+            crops: 얼굴 크롭 PIL Image 리스트
+            
+        Returns:
+            np.ndarray: (N, 224, 224, 3) float32 배열
+        """
+        size = AGE_MODEL_INPUT_SIZE
+        batch = np.zeros((len(crops), size, size, 3), dtype=np.float32)
+        for i, crop in enumerate(crops):
+            face = np.array(crop.convert('RGB'))[:, :, ::-1]
+            height, width = face.shape[:2]
+            factor = min(size / height, size / width)
+            new_width, new_height = max(1, int(width * factor)), max(1, int(height * factor))
+            face = cv2.resize(face, (new_width, new_height))
+            top, left = (size - new_height) // 2, (size - new_width) // 2
+            batch[i, top:top + new_height, left:left + new_width] = face
+        batch /= 255.0
+        return batch
+        
+    def predict_crops(self, crops: List[Image.Image], user_infos: Optional[list] = None,
+                      face_confidences: Optional[List[float]] = None) -> list:
+        """
+        이미 검출/정렬된 얼굴 크롭들의 나이를 한 번의 배치 추론으로 예측.
+        
+        얼굴 검출 백엔드를 실행하지 않고, 메모리에 유지된 나이 모델로
+        크롭 전체를 한 번에 추론합니다.
+        
+        Args:
+            crops: 얼굴 크롭 PIL Image 리스트
+            user_infos: 사용자 정보 딕셔너리들의 리스트 (선택사항)
+            face_confidences: 얼굴 검출기의 신뢰도 리스트 (선택사항, 없으면 0.5로 간주)
+            
+        Returns:
+            List[Dict]: 각 크롭의 예측 결과 딕셔너리 리스트
+        """
+        if not crops:
+            return []
+            
+        try:
+            model = self._get_age_model()
+            probabilities = model.predict(self._preprocess_crops(crops), batch_size=len(crops), verbose=0)
+            # DeepFace와 같이 나이별 확률의 기댓값을 나이로 사용
+            ages = probabilities @ np.arange(probabilities.shape[1])
+        except Exception as e:
+            logging.error(f"DeepFace 나이 모델 추론 중 오류 발생: {str(e)}")
+            return [self._empty_result(str(e)) for _ in crops]
+            
+        results = []
+        for i, age in enumerate(ages):
+            analysis = {'age': float(age)}
+            if face_confidences and i < len(face_confidences) and face_confidences[i] is not None:
+                analysis['face_confidence'] = face_confidences[i]
+            result = self._build_result(float(age), analysis)
+            
+            # 사용자 정보가 있으면 추가
+            if user_infos and i < len(user_infos) and user_infos[i]:
+                result.update(user_infos[i])
+            results.append(result)
+        return results
+            
+    def predict_batch(self, images: list, user_infos: Optional[list] = None,
+                      pre_detected: bool = False) -> list:
         """
         여러 이미지의 나이를 한 번에 예측.
         
         Args:
             images: PIL Image 객체들의 리스트
             user_infos: 사용자 정보 딕셔너리들의 리스트 (선택사항)
+            pre_detected: True이면 이미 잘라낸 얼굴 이미지로 보고 배치 추론
             
         Returns:
             List[Dict]: 각 이미지의 예측 결과 딕셔너리 리스트
         """
+        if pre_detected:
+            return self.predict_crops(images, user_infos)
+            
         results = []
         for i, image in enumerate(images):
             user_info = user_infos[i] if user_infos and i < len(user_infos) else None
             result = self.predict_age(image, user_info)
             results.append(result)
-        return results 
\ No newline at end of file
+        return results
+        
+    def warmup(self) -> None:
+        """모델을 미리 로드하고 빈 이미지로 한 번 추론합니다."""
+        dummy = Image.new('RGB', (AGE_MODEL_INPUT_SIZE, AGE_MODEL_INPUT_SIZE))
+        if self.crop_mode:
+            self.predict_crops([dummy])
+        else:
+            self.predict_age(dummy)
@@ -1,7 +1,5 @@
 import numpy as np
 from PIL import Image
-from mtcnn import MTCNN
-import dlib
 
 class FaceDetector:
     """얼굴 감지를 위한 클래스"""
@@ -14,10 +12,20 @@ class FaceDetector:
             config: 설정 딕셔너리
         """
         self.method = config['models']['face_detection']['method']
-        if self.method == 'mtcnn':
-            self.detector = MTCNN()
-        else:  # dlib
-            self.detector = dlib.get_frontal_face_detector()
+        self._detector = None
+
+    @property
+    def detector(self):
+        """선택된 방식의 검출기를 처음 사용할 때 import하고 생성합니다."""
+        if self._detector is None:
+            if self.method == 'mtcnn':
+                # mtcnn은 TensorFlow를 불러오므로 mtcnn을 사용할 때만 import
+                from mtcnn import MTCNN
+                self._detector = MTCNN()
+            else:  # dlib
+                import dlib
+                self._detector = dlib.get_frontal_face_detector()
+        return self._detector
 
     def detect_faces(self, image: Image.Image) -> tuple:
         """
@@ -29,28 +37,46 @@ class FaceDetector:
         Returns:
             (bool, list): 얼굴 감지 여부와 감지된 얼굴 영역 리스트
         """
+        faces = self.detect_faces_detailed(image)
+        return bool(faces), [face['box'] for face in faces]
+
+    def detect_faces_detailed(self, image: Image.Image) -> list:
+        """
+        이미지에서 얼굴을 감지하고 신뢰도와 랜드마크를 함께 반환.
+        
+        Args:
+            image: PIL Image 객체
+        
+        Returns:
+            list: 얼굴별 {'box': (x, y, width, height), 'confidence': 신뢰도 또는 None,
+                'keypoints': 랜드마크 딕셔너리 또는 None} 리스트
+        """
         if self.method == 'mtcnn':
             return self._detect_faces_mtcnn(image)
         else:
             return self._detect_faces_dlib(image)
 
-    def _detect_faces_mtcnn(self, image: Image.Image) -> tuple:
+    def _detect_faces_mtcnn(self, image: Image.Image) -> list:
         """MTCNN을 사용한 얼굴 감지"""
         image_array = np.array(image)
         faces = self.detector.detect_faces(image_array)
-        if not faces:
-            return False, []
-        return True, [face['box'] for face in faces]
+        return [{
+            'box': face['box'],
+            'confidence': float(face['confidence']) if face.get('confidence') is not None else None,
+            'keypoints': face.get('keypoints')
+        } for face in faces or []]
 
-    def _detect_faces_dlib(self, image: Image.Image) -> tuple:
-        """dlib을 사용한 얼굴 감지"""
+    def _detect_faces_dlib(self, image: Image.Image) -> list:
+        """dlib을 사용한 얼굴 감지 (신뢰도와 랜드마크 없음)"""
         image_array = np.array(image)
         faces = self.detector(image_array)
-        if not faces:
-            return False, []
-        return True, [(face.left(), face.top(), 
-                      face.right() - face.left(),
-                      face.bottom() - face.top()) for face in faces]
+        return [{
+            'box': (face.left(), face.top(),
+                    face.right() - face.left(),
+                    face.bottom() - face.top()),
+            'confidence': None,
+            'keypoints': None
+        } for face in faces]
 
     def crop_face(self, image: Image.Image, face_box: tuple) -> Image.Image:
         """감지된 얼굴 영역을 크롭합니다."""
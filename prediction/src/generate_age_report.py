@@ -8,8 +8,21 @@ import csv
 import json
 import re
 import shutil
+import threading
+import time
+import argparse
 from PIL import Image
 from deepface_age_predictor import DeepFaceAgePredictor
+from cascade_age_predictor import CascadeAgePredictor
+from prediction_cache import PredictionCache, hash_file
+from image_io import DEFAULT_MAX_PIXELS, open_for_detection, scale_boxes, load_full_resolution
+from dedup import NearDuplicateGrouper
+from quality_gate import FaceQualityGate
+from adaptive_sampling import SKIP_EARLY_EXIT, AdaptiveSampler, newest_first, should_flush_for
+from scheduler import UserScheduler
+from timing import activate_from_config, get_timer
+from inference_server import InferenceClient, RemoteDeepFacePredictor
+from pipeline import Pipeline, Stage
 from pathlib import Path
 import yaml
 from tqdm import tqdm
@@ -24,6 +37,20 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# 리포트 CSV 컬럼
+REPORT_FIELDNAMES = [
+    'fbUid', 'nick', 'country', 'gender', 'date',
+    'image_name', 'has_face',
+    'predicted_age', 'age_range', 'age_group',
+    'confidence', 'is_reliable', 'is_underage',
+    'face_count', 'skip_reason', 'dup_group', 'dup_of',
+    'tier', 'tier1_age', 'tier1_confidence',
+    'images_processed', 'images_available', 'verdict'
+]
+
+# 증분 실행용 처리 파일 목록 (출력 폴더에 저장)
+MANIFEST_FILE = 'manifest.json'
+
 def load_config():
     """설정 파일을 로드합니다."""
     config_path = Path("config/config.yaml")
@@ -75,9 +102,20 @@ def get_image_files(folder_path):
     image_files.sort()
     return image_files
 
+# Haar cascade 분류기 (스레드마다 최초 사용 시 한 번만 생성, 파이프라인 detect 단계를 여러 스레드로 실행)
+_face_cascade = threading.local()
+
+def get_face_cascade():
+    """현재 스레드의 Haar cascade 얼굴 분류기를 반환합니다."""
+    cascade = getattr(_face_cascade, 'classifier', None)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        _face_cascade.classifier = cascade
+    return cascade
+
 def detect_face(image):
     """이미지에서 얼굴을 검출합니다."""
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    face_cascade = get_face_cascade()
     
     # PIL Image를 OpenCV 형식으로 변환
     img_array = np.array(image)
@@ -88,45 +126,749 @@ def detect_face(image):
     
     return len(faces) > 0, len(faces)
 
-def process_folder(folder_path, predictor):
-    """하나의 폴더에 대한 나이 예측을 수행합니다."""
-    folder_metadata = extract_metadata_from_folder(folder_path)
-    image_files = get_image_files(folder_path)
+class HaarPrefilter:
+    """
+    DeepFace 실행 전에 축소된 그레이스케일 이미지에서 Haar cascade로
+    얼굴 유무를 빠르게 확인하는 사전 필터
+    """
+    
+    def __init__(self, config):
+        prefilter_config = config.get('prefilter') or {}
+        self.max_side = prefilter_config.get('max_side', 640)
+        self.scale_factor = prefilter_config.get('scale_factor', 1.1)
+        self.min_neighbors = prefilter_config.get('min_neighbors', 4)
+        self.min_face_size = prefilter_config.get('min_face_size', 24)
+        self.max_pixels = (config.get('decode') or {}).get('max_pixels', DEFAULT_MAX_PIXELS)
+        
+        # 검출 파라미터가 바뀌면 캐시된 결과를 재사용하지 않도록 네임스페이스에 포함
+        self.cache_namespace = (
+            f"faces:haar:{cv2.__version__}:{self.max_side}:"
+            f"{self.scale_factor}:{self.min_neighbors}:{self.min_face_size}"
+        )
+    
+    @classmethod
+    def from_config(cls, config):
+        """설정의 prefilter 섹션으로 사전 필터를 생성합니다. 비활성화되어 있으면 None을 반환합니다."""
+        if not (config.get('prefilter') or {}).get('enabled', False):
+            return None
+        return cls(config)
+    
+    def detect(self, img_path):
+        """
+        이미지에서 얼굴 영역을 검출합니다.
+        
+        Returns:
+            list: 원본 해상도 기준 (x, y, width, height) 얼굴 영역 리스트
+        """
+        timer = get_timer()
+        
+        # 긴 변이 max_side가 되도록 그레이스케일로 축소 디코딩
+        with timer.stage('decode'):
+            gray, scale = open_for_detection(img_path, self.max_side, mode='L', max_pixels=self.max_pixels)
+        
+        with timer.stage('detection'):
+            faces = get_face_cascade().detectMultiScale(
+                np.asarray(gray),
+                scaleFactor=self.scale_factor,
+                minNeighbors=self.min_neighbors,
+                minSize=(self.min_face_size, self.min_face_size)
+            )
+        
+        # 축소 좌표를 원본 해상도 좌표로 변환
+        return scale_boxes(faces, scale)
+
+def no_face_result(skip_reason=None):
+    """얼굴이 없거나 예측을 건너뛴 이미지의 결과를 생성합니다."""
+    return {
+        'has_face': False,
+        'face_count': 0,
+        'predicted_age': None,
+        'age_range': None,
+        'age_group': None,
+        'confidence': None,
+        'is_reliable': False,
+        'is_underage': None,
+        'skip_reason': skip_reason
+    }
+
+def skipped_face_result(skip_reason, face_count):
+    """얼굴은 검출됐지만 품질 검사에서 예측을 건너뛴 이미지의 결과를 생성합니다."""
+    result = no_face_result(skip_reason)
+    result['has_face'] = True
+    result['face_count'] = face_count
+    return result
+
+def early_exit_result():
+    """사용자의 판정이 확정되어 처리하지 않은 이미지의 결과를 생성합니다."""
+    return no_face_result(SKIP_EARLY_EXIT)
+
+def largest_face(face_boxes):
+    """검출된 얼굴 중 가장 큰 얼굴 영역을 반환합니다."""
+    return max(face_boxes, key=lambda box: box[2] * box[3])
+
+def create_predictor(config, client=None):
+    """
+    설정에 따라 나이 예측기를 생성합니다.
+    2단계 모드(cascade)가 켜져 있으면 CascadeAgePredictor, 아니면 추론 서버 또는 DeepFace를 사용합니다.
+    """
+    predictor = CascadeAgePredictor.from_config(config, client)
+    if predictor is None:
+        predictor = RemoteDeepFacePredictor(client) if client else DeepFaceAgePredictor(config)
+    return predictor
+
+def predict_path(predictor, img_path, max_pixels=DEFAULT_MAX_PIXELS):
+    """이미지를 디코딩해 나이를 예측합니다. (캐시 미사용)"""
+    timer = get_timer()
+    with timer.stage('decode'):
+        image = load_full_resolution(img_path, max_pixels)
+    # DeepFace는 얼굴 검출과 나이 예측을 함께 수행하므로 age_inference로 기록
+    with timer.stage('age_inference'):
+        return predictor.predict_age(image)
+
+def predict_image(img_path, predictor, cache=None, content_hash=None, max_pixels=DEFAULT_MAX_PIXELS,
+                  call=None):
+    """
+    이미지 한 장의 나이를 예측합니다.
+    캐시가 있으면 이미지 내용 해시로 먼저 조회하고, 없을 때만 DeepFace를 실행합니다.
+    call이 주어지면 (이미지 경로, max_pixels)로 예측을 맡깁니다. (파이프라인 워커 프로세스)
+    """
+    if cache and content_hash is None:
+        content_hash = hash_file(img_path)
+    if cache:
+        prediction = cache.get(content_hash, predictor.cache_namespace)
+        if prediction is not None:
+            return prediction
+    
+    if call:
+        prediction = call((img_path, max_pixels))
+    else:
+        prediction = predict_path(predictor, img_path, max_pixels)
+    
+    # 오류 결과는 다음 실행에서 다시 시도하도록 저장하지 않음
+    if cache and 'error' not in prediction:
+        cache.put(content_hash, predictor.cache_namespace, prediction)
+    return prediction
+
+def prefilter_image(img_path, prefilter, cache=None, content_hash=None, call=None):
+    """
+    사전 필터로 얼굴 영역을 검출합니다. 캐시가 있으면 먼저 조회합니다.
+    call이 주어지면 이미지 경로로 검출을 맡깁니다. (파이프라인 워커 프로세스)
+    """
+    if cache and content_hash is None:
+        content_hash = hash_file(img_path)
+    if cache:
+        face_boxes = cache.get(content_hash, prefilter.cache_namespace)
+        if face_boxes is not None:
+            return face_boxes
+    
+    face_boxes = call(img_path) if call else prefilter.detect(img_path)
+    if cache:
+        cache.put(content_hash, prefilter.cache_namespace, face_boxes)
+    return face_boxes
+
+def crop_largest_face(image, face_boxes):
+    """검출된 얼굴 중 가장 큰 얼굴 영역을 잘라냅니다."""
+    x, y, width, height = largest_face(face_boxes)
+    return image.crop((x, y, x + width, y + height))
+
+def predict_pending_crops(pending, predictor, cache=None, cache_namespace=None):
+    """
+    크롭 모드에서 모아둔 얼굴 크롭들을 한 번에 예측하고 결과를 각 행에 채웁니다.
+    
+    Args:
+        pending: (결과 딕셔너리, 얼굴 크롭, 내용 해시) 리스트
+    """
+    if not pending:
+        return
+    
+    start = time.perf_counter()
+    predictions = predictor.predict_batch([crop for _, crop, _ in pending], pre_detected=True)
+    per_crop = (time.perf_counter() - start) / len(pending)
+    
+    timer = get_timer()
+    for (row, _, content_hash), prediction in zip(pending, predictions):
+        timer.record('age_inference', per_crop, row.get('fbUid'))
+        if cache and content_hash and 'error' not in prediction:
+            cache.put(content_hash, cache_namespace, prediction)
+        row.update(prediction)
+
+# 파이프라인 단계를 프로세스로 실행할 때 워커의 사전 필터와 예측기
+_worker_prefilter = None
+_worker_predictor = None
+
+def _init_prefilter_worker(config):
+    """detect 단계 워커 프로세스의 사전 필터를 만듭니다."""
+    global _worker_prefilter
+    _worker_prefilter = HaarPrefilter(config)
+
+def _prefilter_in_worker(img_path):
+    """워커 프로세스에서 사전 필터로 얼굴 영역을 검출합니다."""
+    return _worker_prefilter.detect(img_path)
+
+def _init_predict_worker(config):
+    """predict 단계 워커 프로세스의 예측기를 만듭니다. (모델은 처음 예측할 때 로드)"""
+    global _worker_predictor
+    _worker_predictor = create_predictor(config)
+
+def _predict_in_worker(payload):
+    """워커 프로세스에서 이미지를 디코딩해 나이를 예측합니다."""
+    img_path, max_pixels = payload
+    return predict_path(_worker_predictor, img_path, max_pixels)
+
+class ReportPipeline:
+    """
+    generate_report의 단계 그래프
+    
+    list(폴더 → 변경된 이미지) → dedup(근접 중복 대표 이미지 작업) → detect(Haar 사전 필터) →
+    quality(품질 검사, 크롭 모드의 얼굴 크롭) → predict(DeepFace) → aggregate(폴더별 행) →
+    write(리포트, 통계, 처리 파일 목록)
+    
+    적응형 샘플링이 켜져 있으면 폴더의 이미지를 최신순으로 처리하고, 판정이 확정된
+    폴더의 남은 이미지 작업은 detect/quality/predict 단계를 건너뜁니다.
+    스케줄러가 있으면 시간 예산을 넘긴 뒤의 폴더는 list 단계에서 건너뛰고,
+    checkpoint_every개 폴더마다 중간 리포트를 저장합니다.
+    """
+    
+    def __init__(self, config, data_path, output_path, predictor, cache=None, prefilter=None,
+                 quality_gate=None, deduplicator=None, manifest=None, incremental=False,
+                 adaptive=None, scheduler=None):
+        """
+        Args:
+            config: 설정 딕셔너리
+            data_path: 사용자 폴더들이 있는 데이터 경로
+            output_path: 리포트 출력 경로
+            predictor: 나이 예측기
+            cache: 예측 결과 캐시 (선택사항)
+            prefilter: Haar 사전 필터 (선택사항)
+            quality_gate: 얼굴 품질 검사기 (선택사항)
+            deduplicator: 근접 중복 그룹화 (선택사항)
+            manifest: 이전 실행의 처리 파일 목록 (증분 실행)
+            incremental: True이면 결과를 기존 리포트와 병합
+            adaptive: 적응형 샘플링 (선택사항, 판정이 확정되면 폴더의 남은 이미지를 건너뜀)
+            scheduler: 사용자 스케줄러 (선택사항, 시간 예산과 중간 저장)
+        """
+        self.config = config
+        self.data_path = data_path
+        self.output_path = output_path
+        self.predictor = predictor
+        self.cache = cache
+        self.prefilter = prefilter
+        self.quality_gate = quality_gate
+        self.deduplicator = deduplicator
+        self.manifest = manifest or {}
+        self.incremental = incremental
+        self.adaptive = adaptive
+        self.scheduler = scheduler
+        
+        self.max_pixels = prefilter.max_pixels if prefilter else DEFAULT_MAX_PIXELS
+        # 크롭 모드: 사전 필터가 찾은 가장 큰 얼굴만 잘라 여러 폴더의 크롭을 한 번에 예측
+        self.crop_mode = prefilter is not None and predictor.crop_mode
+        if prefilter is None and isinstance(predictor, CascadeAgePredictor):
+            logging.warning("cascade가 켜져 있지만 사전 필터(prefilter)가 꺼져 있어 크롭을 만들 수 없습니다. "
+                            "1단계 모델 없이 DeepFace로만 예측합니다. prefilter.enabled를 켜세요.")
+        self.crop_namespace = (
+            f"{predictor.crop_cache_namespace}|{prefilter.cache_namespace}" if self.crop_mode else None
+        )
+        self.batch_size = config['processing'].get('batch_size', 32)
+        
+        self.manifest_updates = {}
+        self.present_images = {}  # 이번 실행에서 나열한 폴더(fbUid)별 현재 이미지 이름
+        self.all_results = []
+        self._collected_folders = 0
+        self._pending = []  # 크롭 모드에서 배치 예측을 기다리는 작업
+        self._open_jobs = {}  # 아직 모든 이미지가 모이지 않은 폴더 작업
+        self._lock = threading.Lock()
+    
+    def _task_stage(self, fn):
+        """
+        이미지 작업 단계 함수를 감싸 파이프라인 단계로 만듭니다.
+        오류가 난 이미지는 기록하고 결과 없이 폴더 집계에 전달합니다. (다음 실행에서 재시도)
+        폴더의 판정이 확정되었으면 남은 단계를 실행하지 않습니다.
+        """
+        def run(task, *args):
+            self._skip_if_settled(task)
+            if not task['done']:
+                try:
+                    with get_timer().for_user(task['job']['fb_uid']):
+                        fn(task, *args)
+                except Exception as e:
+                    logging.error(f"이미지 처리 중 오류 발생 {task['path']}: {str(e)}")
+                    task['prediction'] = None
+                    task['done'] = True
+            return [task]
+        return run
     
-    if not image_files:
-        logging.warning(f"이미지를 찾을 수 없음: {folder_metadata['fbUid']}")
+    def _skip_if_settled(self, task):
+        """폴더의 판정이 이미 확정되었으면 이미지 작업을 처리하지 않은 것으로 표시합니다."""
+        tracker = task['job']['tracker']
+        if task['done'] or tracker is None or not tracker.settled:
+            return False
+        task['prediction'] = early_exit_result()
+        task['crop'] = None
+        task['done'] = True
+        return True
+    
+    def list_folder(self, folder):
+        """폴더의 이미지 중 새로 추가되었거나 변경된 이미지를 골라 폴더 작업을 만듭니다. (list 단계)"""
+        timer = get_timer()
+        fb_uid = os.path.basename(folder)
+        if self.scheduler and not self.scheduler.admit(fb_uid):
+            # 처리 파일 목록을 갱신하지 않으므로 다음 실행에서 처리됨
+            return []
+        with timer.stage('list', fb_uid):
+            image_files = get_image_files(folder)
+        metadata = extract_metadata_from_folder(folder)
+        with self._lock:
+            # 증분 실행에서 그 사이 삭제된 이미지의 리포트 행과 목록 항목을 지우기 위해 기록
+            names = {os.path.basename(img_path) for img_path in image_files}
+            self.present_images[fb_uid] = names
+            self.present_images[metadata['fbUid']] = names
+        # 전체 처리 대상 사용자는 이전 실행에서 판정 확정으로 건너뛴 이미지도 다시 처리
+        sampled = self.adaptive is not None and not self.adaptive.is_full_scan(fb_uid)
+        with timer.stage('hash', fb_uid):
+            changed, content_hashes, entries = select_changed_images(
+                image_files, self.data_path, self.manifest, rescan_early_exit=not sampled
+            )
+        if image_files and not changed:
+            with self._lock:
+                self.manifest_updates.update(entries)
+            return []
         return [{
-            **folder_metadata,
-            'date': None,
-            'has_face': False,
-            'face_count': 0,
-            'predicted_age': None,
-            'age_range': None,
-            'age_group': None,
-            'confidence': None,
-            'is_reliable': False,
-            'is_underage': None
+            'fb_uid': fb_uid,
+            'folder': folder,
+            'metadata': metadata,
+            'image_files': changed,
+            'content_hashes': content_hashes,
+            'entries': entries,
+            'tracker': self.adaptive.tracker(fb_uid) if sampled and changed else None,
+            'tasks': []
         }]
     
-    results = []
-    for img_path in image_files:
+    def split_folder(self, job):
+        """
+        근접 중복 그룹마다 대표 이미지 하나만 이미지 작업으로 만듭니다. (dedup 단계)
+        이미지가 없는 폴더는 빈 작업 하나로 표시합니다.
+        적응형 샘플링 중이면 최신 이미지부터 처리합니다.
+        """
+        image_files = job['image_files']
+        if not image_files:
+            logging.warning(f"이미지를 찾을 수 없음: {job['metadata']['fbUid']}")
+        
+        # 근접 중복 그룹화: 이미지별 대표 이미지 (다른 주차 이미지가 대표일 수 있음)
+        representative_of = {img_path: img_path for img_path in image_files}
+        if self.deduplicator and image_files:
+            with get_timer().stage('dedup', job['fb_uid']):
+                groups = self.deduplicator.group(
+                    image_files, self.deduplicator.reference_files(job['folder']), job['content_hashes']
+                )
+            for group in groups:
+                for member in group:
+                    representative_of[member] = group[0]
+        job['representative_of'] = representative_of
+        
+        targets = list(dict.fromkeys(representative_of[img_path] for img_path in image_files)) or [None]
+        if job['tracker'] is not None:
+            targets = newest_first(targets, lambda path: extract_metadata_from_filename(os.path.basename(path)))
+        job['expected'] = len(targets)
+        return [{
+            'job': job,
+            'path': img_path,
+            'hash': job['content_hashes'].get(img_path),
+            'face_boxes': None,
+            'crop': None,
+            'prediction': None,
+            'done': img_path is None
+        } for img_path in targets]
+    
+    def detect(self, task, call=None):
+        """사전 필터로 얼굴 영역을 검출합니다. (detect 단계, 사전 필터가 없으면 통과)"""
+        if self.cache and task['hash'] is None:
+            task['hash'] = hash_file(task['path'])
+        if self.prefilter:
+            task['face_boxes'] = prefilter_image(task['path'], self.prefilter, self.cache, task['hash'], call)
+    
+    def check_quality(self, task):
+        """
+        얼굴이 없거나 품질 검사를 통과하지 못한 이미지는 결과를 확정하고,
+        크롭 모드에서는 가장 큰 얼굴을 잘라 예측을 준비합니다. (quality 단계)
+        """
+        face_boxes = task['face_boxes']
+        # 품질 검사: 사전 필터가 찾은 가장 큰 얼굴의 크기 확인 (Haar는 신뢰도 없음)
+        skip_reason = None
+        if self.quality_gate and face_boxes:
+            skip_reason = self.quality_gate.check_detection(largest_face(face_boxes))
+        
+        if face_boxes is not None and not face_boxes:
+            # 사전 필터에서 얼굴이 없으면 DeepFace를 건너뜀
+            task['prediction'] = no_face_result('prefilter_no_face')
+        elif skip_reason:
+            task['prediction'] = skipped_face_result(skip_reason, len(face_boxes))
+        elif self.crop_mode:
+            # 캐시에 없으면 가장 큰 얼굴을 잘라 배치 대기열에 추가
+            prediction = self.cache.get(task['hash'], self.crop_namespace) if self.cache else None
+            if prediction is None:
+                timer = get_timer()
+                with timer.stage('decode'):
+                    image = load_full_resolution(task['path'], self.max_pixels)
+                with timer.stage('crop'):
+                    face_crop = crop_largest_face(image, face_boxes)
+                if self.quality_gate:
+                    with timer.stage('quality_gate'):
+                        skip_reason = self.quality_gate.check_crop(face_crop)
+                if skip_reason:
+                    prediction = skipped_face_result(skip_reason, len(face_boxes))
+                else:
+                    # fbUid는 배치 예측 시간을 사용자별로 기록하는 데 사용 (행에서는 폴더 정보로 덮어씀)
+                    prediction = {'fbUid': task['job']['fb_uid']}
+                    task['crop'] = face_crop
+            prediction['face_count'] = len(face_boxes)
+            task['prediction'] = prediction
+        else:
+            return
+        if task['crop'] is None:
+            task['done'] = True
+    
+    def predict_crop(self, task):
+        """크롭 모드: 얼굴 크롭을 모아 배치 크기마다 한 번에 예측하고 작업들을 내보냅니다. (predict 단계)"""
+        if task['crop'] is None or self._skip_if_settled(task):
+            return [task]
+        self._pending.append(task)
+        # 적응형 샘플링: 대기 중인 크롭만으로 폴더의 판정이 확정될 수 있으면 바로 예측
+        tracker = task['job']['tracker']
+        pending = sum(1 for pending_task in self._pending if pending_task['job'] is task['job'])
+        if len(self._pending) < self.batch_size and not should_flush_for(tracker, pending):
+            return []
+        return self.flush_crops()
+    
+    def flush_crops(self):
+        """대기 중인 얼굴 크롭을 모두 예측하고 작업들을 내보냅니다."""
+        pending, self._pending = self._pending, []
         try:
-            image = Image.open(img_path)
-            date = extract_metadata_from_filename(os.path.basename(img_path))
+            predict_pending_crops(
+                [(task['prediction'], task['crop'], task['hash']) for task in pending],
+                self.predictor, self.cache, self.crop_namespace
+            )
+        except Exception as e:
+            logging.error(f"얼굴 크롭 {len(pending)}개 예측 중 오류 발생: {str(e)}")
+            for task in pending:
+                task['prediction'] = None
+        for task in pending:
+            task['crop'] = None
+        return pending
+    
+    def predict_full(self, task, call=None):
+        """전체 이미지 모드: DeepFace로 얼굴 검출과 나이 예측을 함께 수행합니다. (predict 단계)"""
+        prediction = predict_image(task['path'], self.predictor, self.cache, task['hash'], self.max_pixels, call)
+        # DeepFace가 검출한 얼굴의 신뢰도는 예측 후에만 알 수 있음
+        if self.quality_gate and prediction.get('has_face'):
+            skip_reason = self.quality_gate.check_confidence(prediction.get('face_confidence'))
+            if skip_reason:
+                prediction = skipped_face_result(skip_reason, prediction.get('face_count', 1))
+        if task['face_boxes']:
+            prediction['face_count'] = len(task['face_boxes'])
+        task['prediction'] = prediction
+    
+    def aggregate(self, task):
+        """이미지 작업을 폴더별로 모으고, 폴더의 모든 작업이 끝나면 리포트 행을 만듭니다. (aggregate 단계)"""
+        job = task['job']
+        job['tasks'].append(task)
+        prediction = task['prediction']
+        if job['tracker'] is not None and prediction and prediction.get('has_face'):
+            job['tracker'].add(prediction.get('predicted_age'), bool(prediction.get('is_reliable')))
+        self._open_jobs[id(job)] = job
+        if len(job['tasks']) < job['expected']:
+            return []
+        del self._open_jobs[id(job)]
+        return [self.folder_rows(job)]
+    
+    def flush_aggregate(self):
+        """일부 이미지 작업이 전달되지 않은 폴더도 모은 결과로 행을 만듭니다."""
+        jobs = list(self._open_jobs.values())
+        self._open_jobs.clear()
+        return [self.folder_rows(job) for job in jobs]
+    
+    def folder_rows(self, job):
+        """대표 이미지의 결과를 그룹의 모든 이미지에 기록해 폴더의 리포트 행을 만들고 처리 파일 목록을 갱신합니다."""
+        folder_metadata = job['metadata']
+        image_files = job['image_files']
+        if not image_files:
+            return [{
+                **folder_metadata,
+                'date': None,
+                **no_face_result()
+            }]
+        
+        predictions = {  # 대표 이미지 경로 → 예측 결과
+            task['path']: task['prediction'] for task in job['tasks'] if task['prediction'] is not None
+        }
+        representative_of = job['representative_of']
+        rows = []
+        for img_path in image_files:
+            representative = representative_of[img_path]
+            if representative not in predictions:
+                continue
             
-            # DeepFace API로 나이 예측
-            prediction = predictor.predict_age(image, folder_metadata)
-            prediction['date'] = date
+            prediction = dict(predictions[representative])
+            prediction.update(folder_metadata)
+            prediction['date'] = extract_metadata_from_filename(os.path.basename(img_path))
             prediction['image_name'] = os.path.basename(img_path)
+            if self.deduplicator:
+                in_folder = os.path.dirname(representative) == os.path.dirname(img_path)
+                representative_name = os.path.basename(representative) if in_folder else representative
+                prediction['dup_group'] = representative_name
+                prediction['dup_of'] = representative_name if representative != img_path else None
             
-            results.append(prediction)
+            rows.append(prediction)
+        
+        # 폴더별 처리 범위 (이번 실행에서 처리한 이미지 / 처리 대상 이미지)
+        tracker = job['tracker']
+        early_exit = {row['image_name'] for row in rows if row.get('skip_reason') == SKIP_EARLY_EXIT}
+        for row in rows:
+            row['images_processed'] = len(rows) - len(early_exit)
+            row['images_available'] = len(image_files)
+            row['verdict'] = tracker.verdict if tracker is not None else None
+        
+        # 결과가 생성된 이미지만 처리 완료로 기록 (오류 이미지는 다음 실행에서 재시도)
+        # 판정 확정으로 건너뛴 이미지는 표시해 두고 전체 처리 대상이 되면 다시 처리
+        processed = {row.get('image_name') for row in rows}
+        changed = set(image_files)
+        with self._lock:
+            for rel_path, entry in job['entries'].items():
+                if os.path.basename(rel_path) in early_exit:
+                    entry = {**entry, 'early_exit': True}
+                if os.path.basename(rel_path) in processed or os.path.join(self.data_path, rel_path) not in changed:
+                    self.manifest_updates[rel_path] = entry
+        return rows
+    
+    def collect(self, rows):
+        """폴더의 리포트 행을 모읍니다. (write 단계)"""
+        self.all_results.extend(rows)
+        self._collected_folders += 1
+        if self.scheduler and self.scheduler.should_checkpoint(self._collected_folders):
+            self.write_partial()
+        return []
+    
+    def _is_deleted(self, fb_uid, image_name, folder_exists):
+        """
+        이전 실행에서 처리했지만 지금은 없는 이미지(또는 폴더)이면 True를 반환합니다.
+        이번 실행에서 나열한 폴더는 나열 결과로, 나열하지 않은 폴더(시간 예산으로 건너뜀 등)는
+        폴더가 남아 있으면 유지합니다.
+        """
+        present = self.present_images.get(fb_uid)
+        if present is not None:
+            return bool(present) if image_name is None else image_name not in present
+        if fb_uid not in folder_exists:
+            folder_exists[fb_uid] = os.path.isdir(os.path.join(self.data_path, fb_uid or ''))
+        return not folder_exists[fb_uid]
+
+    def drop_deleted_rows(self, rows):
+        """삭제된 이미지(분류 도구가 지운 캡처 등)의 리포트 행을 뺍니다."""
+        folder_exists = {}
+        return [row for row in rows if not self._is_deleted(row.get('fbUid'), row.get('image_name'), folder_exists)]
+
+    def current_manifest(self):
+        """이전 처리 파일 목록에 이번 실행의 갱신을 합치고 삭제된 이미지의 항목을 뺍니다."""
+        manifest = {**self.manifest, **self.manifest_updates}
+        folder_exists = {}
+        return {
+            rel_path: entry for rel_path, entry in manifest.items()
+            if not self._is_deleted(Path(rel_path).parts[0], os.path.basename(rel_path), folder_exists)
+        }
+
+    def _sorted_results(self):
+        return sorted(self.all_results, key=lambda row: (row['fbUid'] or '', row.get('image_name') or ''))
+    
+    def write_partial(self):
+        """
+        지금까지 모은 결과로 리포트 CSV만 저장합니다. (실행이 중간에 끊겨도 결과가 남도록)
+        처리 파일 목록은 마지막에만 저장하므로 중단되면 다음 증분 실행에서 다시 처리합니다.
+        """
+        output_file = os.path.join(self.output_path, 'age_prediction_report.csv')
+        all_results = self._sorted_results()
+        if self.incremental:
+            all_results = self.drop_deleted_rows(merge_report_rows(load_report_rows(output_file), all_results))
+        if all_results:
+            os.makedirs(self.output_path, exist_ok=True)
+            write_report(all_results, output_file)
+    
+    def write(self):
+        """리포트, 처리 파일 목록, 통계, 미성년자 리포트를 저장합니다. (write 단계 마무리)"""
+        all_results = self._sorted_results()
+        output_path = self.output_path
+        os.makedirs(output_path, exist_ok=True)
+        output_file = os.path.join(output_path, 'age_prediction_report.csv')
+        
+        skipped_users = []
+        if self.scheduler:
+            skipped_file = self.scheduler.save_skipped(output_path)
+            skipped_users = self.scheduler.skipped_users()
+            if skipped_file:
+                logging.warning(f"시간 예산을 넘겨 건너뛴 사용자 {len(skipped_users)}명: {skipped_file}")
+        
+        if self.incremental:
+            logging.info(f"증분 실행: 새로 처리한 이미지 {len([r for r in all_results if r.get('image_name')])}개")
+            existing_rows = load_report_rows(output_file)
+            report_rows = self.drop_deleted_rows(merge_report_rows(existing_rows, all_results))
+            if not all_results and len(report_rows) == len(existing_rows):
+                save_manifest(output_path, self.current_manifest())
+                logging.info("새로 추가되거나 변경된 이미지가 없습니다")
+                return []
+        else:
+            report_rows = all_results
+        
+        # CSV 파일로 저장
+        if report_rows:
+            write_report(report_rows, output_file)
+            logging.info(f"리포트 생성 완료: {output_file}")
             
-        except Exception as e:
-            logging.error(f"이미지 처리 중 오류 발생 {img_path}: {str(e)}")
+            # 처리 파일 목록은 리포트 저장 후에 기록 (중간에 중단되면 다음 실행에서 재처리)
+            save_manifest(output_path, self.current_manifest())
+            
+            # 통계 정보 생성 (병합된 전체 결과 기준)
+            generate_statistics(report_rows, output_path, skipped_users)
+            
+            # 미성년자 이미지 복사 (이번 실행 결과만) 및 리포트 생성
+            copy_underage_images(all_results, output_path, self.data_path)
+            generate_underage_report(report_rows, output_path)
+        else:
+            logging.warning("CSV로 저장할 결과가 없습니다")
+        return []
+    
+    def build(self):
+        """설정의 pipeline.report 구성으로 파이프라인을 만듭니다."""
+        if self.crop_mode:
+            # 크롭 모드 예측은 여러 폴더의 크롭을 모으는 상태를 가진 단계
+            predict = Stage('predict', self.predict_crop, flush=self.flush_crops)
+        else:
+            predict = Stage('predict', self._task_stage(self.predict_full),
+                            process_work=_predict_in_worker, initializer=_init_predict_worker,
+                            initargs=(self.config,))
+        return Pipeline.from_config(self.config, 'report', [
+            Stage('list', self.list_folder),
+            Stage('dedup', self.split_folder),
+            Stage('detect', self._task_stage(self.detect),
+                  process_work=_prefilter_in_worker if self.prefilter else None,
+                  initializer=_init_prefilter_worker, initargs=(self.config,)),
+            Stage('quality', self._task_stage(self.check_quality)),
+            predict,
+            Stage('aggregate', self.aggregate, flush=self.flush_aggregate),
+            Stage('write', self.collect, flush=self.write)
+        ])
+
+def load_manifest(output_path):
+    """이전 실행에서 처리한 파일 목록을 로드합니다."""
+    manifest_file = os.path.join(output_path, MANIFEST_FILE)
+    if not os.path.exists(manifest_file):
+        return {}
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError) as e:
+        logging.warning(f"처리 파일 목록을 읽을 수 없어 전체를 다시 처리합니다: {str(e)}")
+        return {}
+
+def save_manifest(output_path, manifest):
+    """처리한 파일 목록(경로, 크기, 수정 시각, 해시)을 저장합니다."""
+    manifest_file = os.path.join(output_path, MANIFEST_FILE)
+    tmp_file = manifest_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'files': manifest}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, manifest_file)
+
+def select_changed_images(image_files, data_path, manifest, rescan_early_exit=False):
+    """
+    처리 파일 목록과 비교해 새로 추가되었거나 변경된 이미지만 골라냅니다.
+    
+    크기와 수정 시각이 같으면 변경되지 않은 것으로 보고, 다르면 내용 해시를
+    비교합니다 (복사 등으로 수정 시각만 바뀐 파일은 다시 처리하지 않음).
+    rescan_early_exit이면 판정 확정으로 건너뛰었던 이미지도 다시 처리합니다.
+    
+    Returns:
+        (list, dict, dict): 처리할 이미지 경로, 이미지별 내용 해시, 갱신할 목록 항목
+    """
+    changed = []
+    content_hashes = {}
+    entries = {}
+    
+    for img_path in image_files:
+        rel_path = os.path.relpath(img_path, data_path)
+        stat = os.stat(img_path)
+        entry = {'size': stat.st_size, 'mtime': stat.st_mtime}
+        previous = manifest.get(rel_path)
+        if previous and rescan_early_exit and previous.get('early_exit'):
+            previous = None
+        
+        if previous and previous['size'] == entry['size'] and previous['mtime'] == entry['mtime']:
+            continue
+        
+        entry['hash'] = hash_file(img_path)
+        entries[rel_path] = entry
+        if previous and previous.get('hash') == entry['hash']:
+            continue
+        
+        changed.append(img_path)
+        content_hashes[img_path] = entry['hash']
     
-    return results
+    return changed, content_hashes, entries
 
-def copy_underage_images(results, output_path):
+def _parse_bool(value):
+    if value in ('True', 'true', '1'):
+        return True
+    if value in ('False', 'false', '0'):
+        return False
+    return None
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def load_report_rows(report_file):
+    """기존 리포트 CSV를 읽어 결과 딕셔너리 리스트로 변환합니다."""
+    if not os.path.exists(report_file):
+        return []
+    
+    rows = []
+    with open(report_file, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            row = {key: (value if value != '' else None) for key, value in row.items()}
+            row['has_face'] = bool(_parse_bool(row.get('has_face')))
+            row['is_reliable'] = bool(_parse_bool(row.get('is_reliable')))
+            row['is_underage'] = _parse_bool(row.get('is_underage'))
+            row['predicted_age'] = _parse_float(row.get('predicted_age'))
+            row['confidence'] = _parse_float(row.get('confidence'))
+            row['tier1_age'] = _parse_float(row.get('tier1_age'))
+            row['tier1_confidence'] = _parse_float(row.get('tier1_confidence'))
+            row['images_processed'] = _parse_int(row.get('images_processed'))
+            row['images_available'] = _parse_int(row.get('images_available'))
+            rows.append(row)
+    return rows
+
+def merge_report_rows(existing_rows, new_rows):
+    """기존 리포트 행 중 새로 처리한 이미지의 행을 새 결과로 교체합니다."""
+    def row_key(row):
+        return row.get('fbUid'), row.get('image_name')
+    
+    replaced = {row_key(row) for row in new_rows}
+    merged = [row for row in existing_rows if row_key(row) not in replaced]
+    merged.extend(new_rows)
+    return merged
+
+def write_report(rows, output_file):
+    """리포트 CSV를 작성합니다."""
+    with get_timer().stage('csv_write'), open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDNAMES, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+def copy_underage_images(results, output_path, data_path='data/policemonitor_20241216-20241222'):
     """미성년자로 예측된 이미지들을 별도 폴더로 복사합니다."""
     underage_dir = os.path.join(output_path, 'underage_images')
     os.makedirs(underage_dir, exist_ok=True)
@@ -142,7 +884,7 @@ def copy_underage_images(results, output_path):
     for result in underage_results:
         try:
             # 원본 이미지 경로 구성
-            src_path = os.path.join('data/policemonitor_20241216-20241222', 
+            src_path = os.path.join(data_path, 
                                   result['fbUid'], 
                                   result['image_name'])
             
@@ -225,66 +967,123 @@ def generate_underage_report(results, output_path):
         count = len(stats['predictions'])
         logging.info(f"{fbUid:30} | {avg_age:8.1f} | {avg_conf:10.3f} | {count}")
 
-def generate_report(data_path, output_path):
-    """전체 데이터셋에 대한 나이 예측 리포트를 생성합니다."""
+def generate_report(data_path, output_path, incremental=False, config=None, predictor=None, warmup=False,
+                    full_scan=False):
+    """
+    전체 데이터셋에 대한 나이 예측 리포트를 생성합니다.
+    
+    Args:
+        data_path: 사용자 폴더들이 있는 데이터 경로
+        output_path: 리포트 출력 경로
+        incremental: True이면 처리 파일 목록(manifest.json)과 비교해 새로 추가되었거나
+            변경된 이미지만 처리하고, 결과를 기존 리포트와 통계에 병합합니다.
+        config: 설정 딕셔너리 (None이면 config/config.yaml 로드)
+        predictor: 사용할 나이 예측기 (None이면 cascade 설정에 따라 CascadeAgePredictor,
+            아니면 추론 서버 또는 DeepFaceAgePredictor 사용)
+        warmup: True이면 처리 전에 DeepFace 모델을 로드하고 한 번 추론합니다.
+            (False이면 처리할 이미지가 있을 때 처음 예측하면서 로드)
+        full_scan: True이면 적응형 샘플링을 끄고 모든 이미지를 처리합니다.
+        
+    scheduler.enabled이면 폴더를 위험도 순서로 처리하고, 시간 예산을 넘기면
+    남은 폴더를 건너뛰어 skipped_users.csv와 statistics.json에 기록합니다.
+    """
     # 설정 로드
-    config = load_config()
+    if config is None:
+        config = load_config()
+    
+    # 단계별 처리 시간 기록 (timings.json)
+    timer = activate_from_config(config)
     
     # DeepFace 나이 예측기 초기화
-    predictor = DeepFaceAgePredictor(config)
+    if predictor is None:
+        # 추론 서버가 설정되어 있고 실행 중이면 서버의 모델 사용
+        predictor = create_predictor(config, InferenceClient.from_config(config))
+    if warmup:
+        start = time.perf_counter()
+        predictor.warmup()
+        logging.info(f"모델 준비 완료: {time.perf_counter() - start:.1f}초")
+    
+    # 예측 결과 캐시 (설정에서 활성화된 경우)
+    cache = PredictionCache.from_config(config)
+    
+    # 증분 실행이면 이전에 처리한 파일 목록 로드
+    manifest = load_manifest(output_path) if incremental else {}
     
-    # 결과를 저장할 리스트
-    all_results = []
+    # Haar 사전 필터, 얼굴 품질 검사, 근접 중복 그룹화 (설정에서 활성화된 경우)
+    report = ReportPipeline(
+        config, data_path, output_path, predictor, cache,
+        prefilter=HaarPrefilter.from_config(config),
+        quality_gate=FaceQualityGate.from_config(config),
+        deduplicator=NearDuplicateGrouper.from_config(config, cache),
+        manifest=manifest,
+        incremental=incremental,
+        adaptive=None if full_scan else AdaptiveSampler.from_config(config),
+        scheduler=UserScheduler.from_config(config)
+    )
+    pipeline = report.build()
+    logging.info(f"파이프라인: {pipeline.describe()}")
     
-    # 각 폴더 처리
+    # 각 폴더 처리 (리포트와 통계는 write 단계에서 저장)
     folders = [f.path for f in os.scandir(data_path) if f.is_dir()]
-    for folder in tqdm(folders, desc="폴더 처리 중"):
-        results = process_folder(folder, predictor)
-        if results:
-            all_results.extend(results)
+    if report.scheduler:
+        report.scheduler.start()
+        folders = report.scheduler.order(folders)
+    pipeline.run(tqdm(folders, desc="폴더 처리 중"))
     
-    # CSV 파일로 저장
-    if all_results:
-        output_file = os.path.join(output_path, 'age_prediction_report.csv')
-        os.makedirs(output_path, exist_ok=True)
-        
-        fieldnames = [
-            'fbUid', 'nick', 'country', 'gender', 'date',
-            'image_name', 'has_face',
-            'predicted_age', 'age_range', 'age_group',
-            'confidence', 'is_reliable', 'is_underage'
-        ]
-        
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(all_results)
-        
-        logging.info(f"리포트 생성 완료: {output_file}")
-        
-        # 통계 정보 생성
-        generate_statistics(all_results, output_path)
-        
-        # 미성년자 이미지 복사 및 리포트 생성
-        copy_underage_images(all_results, output_path)
-        generate_underage_report(all_results, output_path)
-    else:
-        logging.warning("CSV로 저장할 결과가 없습니다")
+    if cache:
+        cache.close()
+    save_timings(timer, output_path)
 
-def generate_statistics(results, output_path):
-    """결과에 대한 통계 정보를 생성합니다."""
+def save_timings(timer, output_path):
+    """단계별 처리 시간 요약을 statistics.json과 같은 폴더의 timings.json으로 저장합니다."""
+    if not timer.enabled:
+        return
+    timings_file = timer.save(output_path)
+    logging.info(f"처리 시간 정보 생성 완료: {timings_file}")
+    for stage, summary in timer.summary()['run'].items():
+        logging.info(
+            f"  {stage:14} | {summary['count']:6}회 | p50 {summary['p50_ms']:9.1f}ms | "
+            f"p95 {summary['p95_ms']:9.1f}ms | p99 {summary['p99_ms']:9.1f}ms"
+        )
+
+def generate_statistics(results, output_path, skipped_users=None):
+    """
+    결과에 대한 통계 정보를 생성합니다.
+    skipped_users는 시간 예산을 넘겨 이번 실행에서 처리하지 못한 사용자 ID 목록입니다.
+    """
     stats = {
         'total_users': len(set(r['fbUid'] for r in results)),
         'total_images': len(results),
         'images_with_faces': len([r for r in results if r['has_face']]),
-        'images_without_faces': len([r for r in results if not r['has_face']]),
+        'images_without_faces': len([
+            r for r in results if not r['has_face'] and r.get('skip_reason') != SKIP_EARLY_EXIT
+        ]),
         'reliable_predictions': len([r for r in results if r['is_reliable']]),
         'underage_predictions': len([r for r in results if r['is_underage'] and r['is_reliable']]),
         'adult_predictions': len([r for r in results if not r['is_underage'] and r['is_reliable']]),
         'average_age': np.mean([r['predicted_age'] for r in results if r['predicted_age'] is not None]),
+        'prefilter_skipped': len([r for r in results if r.get('skip_reason') == 'prefilter_no_face']),
+        'duplicates_propagated': len([r for r in results if r.get('dup_of')]),
+        'early_exit_skipped': len([r for r in results if r.get('skip_reason') == SKIP_EARLY_EXIT]),
+        'users_settled_early': len(set(
+            r['fbUid'] for r in results if r.get('skip_reason') == SKIP_EARLY_EXIT
+        )),
+        'skipped_by_reason': {},
+        'budget_skipped_users': list(skipped_users or []),
+        'predictions_by_tier': {},
         'age_distribution': {}
     }
     
+    # 예측을 건너뛴 이미지 수 (사유별)
+    for r in results:
+        if r.get('skip_reason'):
+            stats['skipped_by_reason'][r['skip_reason']] = stats['skipped_by_reason'].get(r['skip_reason'], 0) + 1
+    
+    # 2단계 모드에서 예측에 사용된 단계별 이미지 수
+    for r in results:
+        if r.get('tier'):
+            stats['predictions_by_tier'][r['tier']] = stats['predictions_by_tier'].get(r['tier'], 0) + 1
+    
     # 나이 분포 계산 (신뢰할 수 있는 예측만)
     reliable_results = [r for r in results if r['is_reliable'] and r['predicted_age'] is not None]
     if reliable_results:
@@ -314,6 +1113,15 @@ def generate_statistics(results, output_path):
     logging.info(f"총 사용자 수: {stats['total_users']}")
     logging.info(f"총 이미지 수: {stats['total_images']}")
     logging.info(f"얼굴이 있는 이미지 수: {stats['images_with_faces']}")
+    logging.info(f"사전 필터로 건너뛴 이미지 수: {stats['prefilter_skipped']}")
+    logging.info(f"중복 그룹 결과를 재사용한 이미지 수: {stats['duplicates_propagated']}")
+    if stats['early_exit_skipped']:
+        logging.info(f"판정 확정으로 건너뛴 이미지 수: {stats['early_exit_skipped']} "
+                     f"(사용자 {stats['users_settled_early']}명)")
+    if stats['budget_skipped_users']:
+        logging.info(f"시간 예산을 넘겨 건너뛴 사용자 수: {len(stats['budget_skipped_users'])}")
+    for tier, count in stats['predictions_by_tier'].items():
+        logging.info(f"{tier} 단계로 예측한 이미지 수: {count}")
     logging.info(f"신뢰할 수 있는 예측 수: {stats['reliable_predictions']}")
     logging.info(f"미성년자 예측 수: {stats['underage_predictions']}")
     logging.info(f"성인 예측 수: {stats['adult_predictions']}")
@@ -324,6 +1132,15 @@ def generate_statistics(results, output_path):
         logging.info(f"  {label}: {count}")
 
 if __name__ == "__main__":
-    data_path = "data/policemonitor_20241216-20241222"
-    output_path = "output"
-    generate_report(data_path, output_path) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="DeepFace 나이 예측 리포트 생성")
+    parser.add_argument("--data", default="data/policemonitor_20241216-20241222",
+                        help="사용자 폴더들이 있는 데이터 경로")
+    parser.add_argument("--output", default="output", help="리포트 출력 경로")
+    parser.add_argument("--incremental", action="store_true",
+                        help="새로 추가되거나 변경된 이미지만 처리하고 기존 리포트에 병합")
+    parser.add_argument("--warmup", action="store_true",
+                        help="처리 전에 DeepFace 모델을 로드하고 한 번 추론")
+    parser.add_argument("--full-scan", action="store_true",
+                        help="적응형 샘플링을 끄고 모든 사용자의 모든 이미지를 처리")
+    args = parser.parse_args()
+    generate_report(args.data, args.output, args.incremental, warmup=args.warmup, full_scan=args.full_scan) 
\ No newline at end of file
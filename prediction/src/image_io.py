@@ -0,0 +1,100 @@
+"""
+검출 단계용 저해상도 이미지 디코딩
+
+JPEG은 DCT 단계에서 1/2, 1/4, 1/8 크기로 축소 디코딩(PIL draft 모드)할 수 있어
+전체 해상도로 디코딩한 뒤 줄이는 것보다 훨씬 빠릅니다. 검출은 축소 이미지에서
+수행하고, 전체 해상도는 얼굴이 검출된 이미지의 크롭에만 사용합니다.
+"""
+
+import math
+from typing import List, Sequence, Tuple
+from PIL import Image
+
+# 기본 최대 픽셀 수 (이보다 큰 이미지는 디코딩하지 않음)
+DEFAULT_MAX_PIXELS = 50_000_000
+
+class ImageTooLargeError(ValueError):
+    """이미지 픽셀 수가 허용 범위를 넘을 때 발생하는 예외"""
+
+def check_image_size(image: Image.Image, path: str, max_pixels: int = DEFAULT_MAX_PIXELS) -> None:
+    """헤더의 이미지 크기를 확인하고 너무 크면 디코딩 전에 예외를 발생시킵니다."""
+    width, height = image.size
+    if max_pixels and width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"이미지가 너무 큽니다 ({width}x{height} > {max_pixels} 픽셀): {path}"
+        )
+
+def _draft(image: Image.Image, mode: str, width: int, height: int) -> None:
+    """JPEG이면 요청 크기 이상인 가장 작은 DCT 축소 비율로 디코딩하도록 설정합니다."""
+    if image.format == 'JPEG':
+        image.draft(mode, (width, height))
+
+def open_for_detection(path: str, max_side: int, mode: str = 'RGB',
+                       max_pixels: int = DEFAULT_MAX_PIXELS) -> Tuple[Image.Image, float]:
+    """
+    검출용으로 긴 변이 max_side 이하가 되도록 축소 디코딩합니다.
+
+    Args:
+        path: 이미지 파일 경로
+        max_side: 축소 후 긴 변의 최대 길이 (0 또는 None이면 축소하지 않음)
+        mode: 변환할 색상 모드 ('RGB', 'L')
+        max_pixels: 허용할 최대 픽셀 수
+
+    Returns:
+        (Image.Image, float): 축소된 이미지와 원본 대비 비율 (축소 좌표 / 비율 = 원본 좌표)
+    """
+    with Image.open(path) as image:
+        check_image_size(image, path, max_pixels)
+        width, height = image.size
+
+        if max_side and max(width, height) > max_side:
+            ratio = max_side / max(width, height)
+            target = (max(1, math.ceil(width * ratio)), max(1, math.ceil(height * ratio)))
+            _draft(image, mode, *target)
+            image = image.convert(mode)
+
+            # DCT 축소 후에도 남은 크기는 리사이즈로 맞춤
+            if max(image.size) > max_side:
+                image = image.resize(target, Image.BILINEAR)
+        else:
+            image = image.convert(mode)
+
+    return image, image.size[0] / width
+
+def scale_boxes(boxes: Sequence[Sequence[float]], scale: float) -> List[List[int]]:
+    """축소 이미지 기준 (x, y, width, height) 영역을 원본 해상도 좌표로 변환합니다."""
+    if scale == 1.0:
+        return [[int(v) for v in box] for box in boxes]
+    return [[int(round(v / scale)) for v in box] for box in boxes]
+
+def load_full_resolution(path: str, max_pixels: int = DEFAULT_MAX_PIXELS) -> Image.Image:
+    """크기를 확인한 뒤 전체 해상도 RGB 이미지로 디코딩합니다."""
+    with Image.open(path) as image:
+        check_image_size(image, path, max_pixels)
+        return image.convert('RGB')
+
+def load_header(path: str, ratio: float, min_width: int = 0,
+                max_pixels: int = DEFAULT_MAX_PIXELS) -> Image.Image:
+    """
+    OCR용으로 이미지 상단 영역을 디코딩합니다.
+
+    너비가 min_width의 2배 이상이면 글자가 읽힐 수 있는 범위에서 축소 디코딩합니다.
+
+    Args:
+        path: 이미지 파일 경로
+        ratio: 상단 영역 높이 비율
+        min_width: OCR에 필요한 최소 너비 (0이면 축소하지 않음)
+        max_pixels: 허용할 최대 픽셀 수
+
+    Returns:
+        Image.Image: 상단 영역 RGB 이미지
+    """
+    with Image.open(path) as image:
+        check_image_size(image, path, max_pixels)
+        width, height = image.size
+        if min_width and width >= min_width * 2:
+            _draft(image, 'RGB', min_width, max(1, math.ceil(height * min_width / width)))
+        image = image.convert('RGB')
+
+    decoded_width, decoded_height = image.size
+    return image.crop((0, 0, decoded_width, int(decoded_height * ratio)))
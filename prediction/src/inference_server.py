@@ -0,0 +1,473 @@
+"""
+얼굴 감지/나이 예측 모델을 메모리에 유지하는 로컬 추론 서버와 클라이언트
+
+예측 스크립트, 분류 도구, 노트북이 각자 모델을 로드하지 않도록 한 프로세스가
+FaceDetector, AgePredictor, DeepFaceAgePredictor를 유지하고 Unix 도메인 소켓으로
+요청을 받습니다. 여러 클라이언트의 동시 요청은 최대 지연 시간 안에서
+마이크로 배치로 묶어 한 번에 추론합니다.
+
+메시지 형식: 4바이트(빅엔디언) 헤더 길이 + JSON 헤더 + 헤더의 arrays 순서대로
+이어지는 원시 배열 바이트 (이미지는 uint8 RGB 배열로 전송)
+
+서버 실행 (prediction 폴더에서):
+    python -m src.inference_server --config config/config.yaml --warmup
+
+클라이언트는 이 파일만으로 동작하므로 generate_age_report.py처럼 src 폴더를
+기준으로 실행하는 스크립트에서도 import할 수 있습니다.
+"""
+
+import os
+import json
+import time
+import queue
+import socket
+import struct
+import logging
+import threading
+import socketserver
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+DEFAULT_SOCKET_PATH = '/tmp/age-inference.sock'
+
+_HEADER_LENGTH = struct.Struct('>I')
+
+def _to_builtin(value: Any) -> Any:
+    """numpy 스칼라/배열 등을 JSON으로 보낼 수 있는 값으로 변환합니다."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray:
+    """소켓에서 정확히 size 바이트를 읽습니다."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ConnectionError("연결이 종료되었습니다")
+        received += count
+    return buffer
+
+def send_message(sock: socket.socket, header: Dict, arrays: Tuple[np.ndarray, ...] = ()) -> None:
+    """JSON 헤더와 배열들을 한 메시지로 보냅니다."""
+    arrays = [np.ascontiguousarray(array) for array in arrays]
+    header = dict(header)
+    header['arrays'] = [{'dtype': array.dtype.str, 'shape': list(array.shape)} for array in arrays]
+    payload = json.dumps(header, default=_to_builtin).encode('utf-8')
+    sock.sendall(_HEADER_LENGTH.pack(len(payload)) + payload)
+    for array in arrays:
+        sock.sendall(memoryview(array).cast('B'))
+
+def recv_message(sock: socket.socket) -> Tuple[Dict, List[np.ndarray]]:
+    """send_message로 보낸 메시지를 읽어 (헤더, 배열 리스트)를 반환합니다."""
+    (length,) = _HEADER_LENGTH.unpack(_recv_exact(sock, _HEADER_LENGTH.size))
+    header = json.loads(bytes(_recv_exact(sock, length)).decode('utf-8'))
+    arrays = []
+    for spec in header.pop('arrays', []):
+        dtype = np.dtype(spec['dtype'])
+        nbytes = int(np.prod(spec['shape'], dtype=np.int64)) * dtype.itemsize
+        arrays.append(np.frombuffer(_recv_exact(sock, nbytes), dtype=dtype).reshape(spec['shape']))
+    return header, arrays
+
+def _image_array(image: Image.Image) -> np.ndarray:
+    """PIL 이미지를 전송용 uint8 RGB 배열로 변환합니다."""
+    return np.asarray(image.convert('RGB'), dtype=np.uint8)
+
+class MicroBatcher:
+    """
+    여러 스레드의 요청을 모아 배치 함수를 한 번에 호출하는 마이크로 배처
+
+    첫 요청이 도착한 뒤 max_latency 안에 들어온 요청을 최대 max_batch개까지 묶습니다.
+    배치 함수는 전용 스레드 하나에서만 호출되므로 스레드 안전하지 않은 모델도
+    사용할 수 있습니다.
+    """
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], List[Any]], max_batch: int, max_latency: float):
+        """
+        Args:
+            name: 스레드 이름
+            fn: 항목 리스트를 받아 같은 순서의 결과 리스트를 반환하는 함수
+            max_batch: 최대 배치 크기
+            max_latency: 첫 요청 이후 배치를 기다리는 최대 시간 (초)
+        """
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """항목을 대기열에 넣고 결과를 받을 Future를 반환합니다."""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self._execute(batch)
+
+    def _execute(self, batch: List[Tuple[Any, Future]]) -> None:
+        try:
+            results = self.fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def close(self) -> None:
+        """남은 요청을 처리한 뒤 스레드를 종료합니다."""
+        self._queue.put(None)
+        self._thread.join()
+
+class InferenceService:
+    """모델을 유지하고 요청 종류별 마이크로 배처로 추론을 수행하는 서비스"""
+
+    def __init__(self, config: dict):
+        """
+        추론 서비스를 초기화. 모델은 처음 요청을 받을 때 (또는 warmup에서) 로드합니다.
+
+        Args:
+            config: 설정 딕셔너리
+        """
+        # 서버는 패키지로 실행 (python -m src.inference_server)
+        from .utils import get_device
+        from .face_detector import FaceDetector
+        from .age_predictor import create_age_predictor
+        from .deepface_age_predictor import DeepFaceAgePredictor
+
+        server_config = config.get('inference_server') or {}
+        max_batch = server_config.get('max_batch', config['processing']['batch_size'])
+        max_latency = server_config.get('max_latency_ms', 10) / 1000
+
+        self.face_detector = FaceDetector(config)
+        self.age_predictor = create_age_predictor(config, get_device(config))
+        self.deepface_predictor = DeepFaceAgePredictor(config)
+
+        # MTCNN과 DeepFace는 같은 TF/Keras 런타임을 쓰며 동시 호출에 안전하지 않으므로
+        # 각 배처는 자기 스레드에서 돌더라도 TF 모델 호출은 이 락으로 하나씩만 실행
+        self._tf_lock = threading.Lock()
+        self.batchers = {
+            'detect_faces': MicroBatcher('detect', self._with_tf_lock(self._detect_batch), max_batch, max_latency),
+            'detect_faces_detailed': MicroBatcher(
+                'detect-detailed', self._with_tf_lock(self._detect_detailed_batch), max_batch, max_latency
+            ),
+            'predict_age': MicroBatcher('vit', self.age_predictor.predict_batch, max_batch, max_latency),
+            'predict_deepface': MicroBatcher(
+                'deepface', self._with_tf_lock(self.deepface_predictor.predict_batch), max_batch, max_latency
+            ),
+            'predict_deepface_crops': MicroBatcher(
+                'deepface-crops', self._with_tf_lock(self.deepface_predictor.predict_crops), max_batch, max_latency
+            )
+        }
+
+    def _with_tf_lock(self, fn: Callable[[List[Any]], List[Any]]) -> Callable[[List[Any]], List[Any]]:
+        """TF 모델을 사용하는 배치 함수가 다른 TF 배처와 동시에 실행되지 않도록 감쌉니다."""
+        def run(items: List[Any]) -> List[Any]:
+            with self._tf_lock:
+                return fn(items)
+        return run
+
+    def _detect_batch(self, images: List[Image.Image]) -> List[Tuple[bool, list]]:
+        """검출기는 배치 API가 없으므로 배처 스레드에서 순서대로 실행합니다."""
+        return [self.face_detector.detect_faces(image) for image in images]
+
+    def _detect_detailed_batch(self, images: List[Image.Image]) -> List[list]:
+        """얼굴별 영역, 신뢰도, 랜드마크를 검출합니다. (품질 검사용)"""
+        return [self.face_detector.detect_faces_detailed(image) for image in images]
+
+    def warmup(self) -> None:
+        """모든 모델을 로드하고 빈 이미지로 한 번씩 추론합니다."""
+        dummy = Image.new('RGB', (224, 224))
+        self.face_detector.detect_faces(dummy)
+        self.age_predictor.warmup()
+        self.deepface_predictor.warmup()
+
+    def info(self) -> Dict:
+        """클라이언트가 캐시 네임스페이스 등을 맞출 수 있도록 모델 정보를 반환합니다."""
+        return {
+            'face_detection_method': self.face_detector.method,
+            'vit_model_name': self.age_predictor.model_name,
+            'vit_backend': self.age_predictor.backend,
+            'deepface_crop_mode': self.deepface_predictor.crop_mode,
+            'deepface_cache_namespace': self.deepface_predictor.cache_namespace,
+            'deepface_crop_cache_namespace': self.deepface_predictor.crop_cache_namespace
+        }
+
+    def handle(self, header: Dict, arrays: List[np.ndarray]) -> Dict:
+        """
+        요청 하나를 처리합니다. 이미지마다 배처에 넣고 모든 결과를 기다립니다.
+
+        Args:
+            header: 요청 헤더 ('op', 'pre_detected')
+            arrays: uint8 RGB 이미지 배열 리스트
+
+        Returns:
+            dict: {'results': [...]} 또는 {'info': {...}}
+        """
+        op = header.get('op')
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'info':
+            return {'info': self.info()}
+
+        if op == 'predict_deepface' and header.get('pre_detected'):
+            op = 'predict_deepface_crops'
+        batcher = self.batchers.get(op)
+        if batcher is None:
+            raise ValueError(f"지원하지 않는 요청: {op}")
+
+        futures = [batcher.submit(Image.fromarray(array)) for array in arrays]
+        return {'results': [future.result() for future in futures]}
+
+    def close(self) -> None:
+        for batcher in self.batchers.values():
+            batcher.close()
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """연결 하나에서 요청을 반복해서 읽고 응답합니다."""
+
+    def handle(self) -> None:
+        while True:
+            try:
+                header, arrays = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                response = self.server.service.handle(header, arrays)
+            except Exception as e:
+                logging.exception("추론 요청 처리 중 오류 발생")
+                response = {'error': f"{type(e).__name__}: {e}"}
+            try:
+                send_message(self.request, response)
+            except (ConnectionError, OSError):
+                return
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """연결마다 스레드를 만드는 Unix 도메인 소켓 서버"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: InferenceService):
+        if os.path.exists(socket_path):
+            # 이전 실행이 남긴 소켓 파일 제거
+            os.unlink(socket_path)
+        self.service = service
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o660)
+
+def serve(config: dict, socket_path: Optional[str] = None, warmup: bool = False) -> None:
+    """
+    추론 서버를 실행합니다. (Ctrl+C 또는 SIGTERM까지)
+
+    Args:
+        config: 설정 딕셔너리
+        socket_path: 소켓 경로 (None이면 inference_server.socket_path)
+        warmup: True이면 요청을 받기 전에 모든 모델을 로드
+    """
+    import signal
+
+    server_config = config.get('inference_server') or {}
+    socket_path = socket_path or server_config.get('socket_path', DEFAULT_SOCKET_PATH)
+    service = InferenceService(config)
+    if warmup or server_config.get('warmup', False):
+        start = time.perf_counter()
+        service.warmup()
+        logging.info(f"모델 준비 완료: {time.perf_counter() - start:.1f}초")
+
+    server = InferenceServer(socket_path, service)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logging.info(f"추론 서버 대기 중: {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+class InferenceClient:
+    """
+    추론 서버 클라이언트 (스레드 안전, 연결이 끊기면 한 번 재연결)
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 300):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()
+        self._info = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['InferenceClient']:
+        """
+        설정의 inference_server 섹션으로 클라이언트를 생성합니다.
+        비활성화되어 있거나 서버에 연결할 수 없으면 None을 반환합니다.
+        """
+        server_config = config.get('inference_server') or {}
+        if not server_config.get('enabled', False):
+            return None
+        client = cls(server_config.get('socket_path', DEFAULT_SOCKET_PATH), server_config.get('timeout', 300))
+        try:
+            client.request({'op': 'ping'})
+        except OSError as e:
+            logging.warning(f"추론 서버에 연결할 수 없어 모델을 직접 로드합니다: {str(e)}")
+            return None
+        return client
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def request(self, header: Dict, images: List[Image.Image] = ()) -> Dict:
+        """요청을 보내고 응답 헤더를 반환합니다. 서버 오류는 RuntimeError로 발생시킵니다."""
+        arrays = [_image_array(image) for image in images]
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    send_message(self._sock, header, arrays)
+                    response, _ = recv_message(self._sock)
+                    break
+                except (ConnectionError, BrokenPipeError):
+                    self.close_connection()
+                    if attempt:
+                        raise
+                except Exception:
+                    # 타임아웃 등으로 응답을 다 읽지 못한 연결은 늦게 온 응답이 다음 요청의
+                    # 응답으로 읽히지 않도록 재사용하지 않음
+                    self.close_connection()
+                    raise
+        if 'error' in response:
+            raise RuntimeError(f"추론 서버 오류: {response['error']}")
+        return response
+
+    def info(self) -> Dict:
+        """서버의 모델 정보를 반환합니다. (한 번만 조회)"""
+        if self._info is None:
+            self._info = self.request({'op': 'info'})['info']
+        return self._info
+
+    def close_connection(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+def _merge_user_info(results: List[Dict], user_infos: Optional[List[Dict]]) -> List[Dict]:
+    """예측기와 같이 사용자 정보를 결과에 추가합니다."""
+    for i, result in enumerate(results):
+        if user_infos and i < len(user_infos) and user_infos[i]:
+            result.update(user_infos[i])
+    return results
+
+class RemoteFaceDetector:
+    """FaceDetector와 같은 인터페이스로 추론 서버의 얼굴 감지기를 사용"""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+        self.method = client.info()['face_detection_method']
+
+    def detect_faces(self, image: Image.Image) -> tuple:
+        has_face, boxes = self.client.request({'op': 'detect_faces'}, [image])['results'][0]
+        return has_face, boxes
+
+    def detect_faces_detailed(self, image: Image.Image) -> list:
+        return self.client.request({'op': 'detect_faces_detailed'}, [image])['results'][0]
+
+    def crop_face(self, image: Image.Image, face_box: tuple) -> Image.Image:
+        x, y, width, height = face_box
+        return image.crop((x, y, x + width, y + height))
+
+class RemoteAgePredictor:
+    """AgePredictor와 같은 인터페이스로 추론 서버의 ViT 나이 예측기를 사용"""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+        info = client.info()
+        self.model_name = info['vit_model_name']
+        self.backend = info['vit_backend']
+
+    def predict_age(self, image: Image.Image, user_info: Optional[Dict] = None) -> dict:
+        return self.predict_batch([image], [user_info] if user_info else None)[0]
+
+    def predict_batch(self, images: List[Image.Image], user_infos: Optional[List[Dict]] = None) -> List[Dict]:
+        if not images:
+            return []
+        results = self.client.request({'op': 'predict_age'}, images)['results']
+        for result in results:
+            result['age_range'] = tuple(result['age_range'])
+        return _merge_user_info(results, user_infos)
+
+class RemoteDeepFacePredictor:
+    """DeepFaceAgePredictor와 같은 인터페이스로 추론 서버의 DeepFace 예측기를 사용"""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+        info = client.info()
+        self.crop_mode = info['deepface_crop_mode']
+        self.cache_namespace = info['deepface_cache_namespace']
+        self.crop_cache_namespace = info['deepface_crop_cache_namespace']
+
+    def predict_age(self, image: Image.Image, user_info: Optional[Dict] = None,
+                    pre_detected: bool = False) -> dict:
+        return self.predict_batch([image], [user_info] if user_info else None, pre_detected)[0]
+
+    def predict_batch(self, images: list, user_infos: Optional[list] = None,
+                      pre_detected: bool = False) -> list:
+        if not images:
+            return []
+        results = self.client.request({'op': 'predict_deepface', 'pre_detected': pre_detected}, images)['results']
+        return _merge_user_info(results, user_infos)
+
+    def warmup(self) -> None:
+        """서버가 모델을 유지하므로 연결만 확인합니다."""
+        self.client.request({'op': 'ping'})
+
+if __name__ == "__main__":
+    import argparse
+    import yaml
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Local inference server for face detection and age prediction")
+    parser.add_argument("--config", default="config/config.yaml", help="Path to configuration file")
+    parser.add_argument("--socket", default=None, help="Unix socket path (overrides inference_server.socket_path)")
+    parser.add_argument("--warmup", action="store_true", help="Load all models before accepting requests")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        serve(yaml.safe_load(f), args.socket, args.warmup)
@@ -0,0 +1,157 @@
+"""
+캡처 상단의 사용자 정보(fbUid, nick, country, gender)를 읽는 OCR 엔진 풀
+"""
+
+import re
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List
+from PIL import Image
+import pytesseract
+from .utils import preprocess_image_for_ocr, parse_user_info
+from .image_io import DEFAULT_MAX_PIXELS, load_header
+from .timing import get_timer
+
+try:
+    import tesserocr
+except ImportError:  # tesserocr가 없으면 호출마다 tesseract 프로세스를 실행하는 pytesseract 사용
+    tesserocr = None
+
+def tesseract_options(tesseract_config: str) -> Dict[str, int]:
+    """tesseract 명령줄 설정에서 tesserocr API에 넘길 psm/oem 값을 읽습니다."""
+    options = {}
+    for name in ('psm', 'oem'):
+        match = re.search(rf'--{name}[ =](\d+)', tesseract_config)
+        if match:
+            options[name] = int(match.group(1))
+    return options
+
+def is_complete_user_info(user_info: Dict) -> bool:
+    """닉네임, 국가, 성별을 모두 읽었는지 확인합니다."""
+    return bool(user_info['nick'] and user_info['country'] and user_info['gender'])
+
+def default_user_info(fb_uid: str) -> Dict:
+    """정보를 읽지 못한 사용자의 기본값 (fbUid만 채움)을 반환합니다."""
+    return {
+        'fbUid': fb_uid,
+        'nick': None,
+        'country': None,
+        'gender': None
+    }
+
+class OCREngine:
+    """
+    스레드 풀에서 동작하는 OCR 엔진
+
+    - tesserocr가 설치되어 있으면 스레드마다 tesseract API를 한 번만 초기화해 재사용
+    - (fbUid, 상단 영역 해시)별로 결과를 캐시해 같은 헤더는 다시 읽지 않음
+    - 사용자 단위 작업은 정보를 모두 읽은 첫 이미지에서 중단
+    """
+
+    def __init__(self, config: dict, cache=None):
+        """
+        OCR 엔진을 초기화.
+
+        Args:
+            config: 설정 딕셔너리
+            cache: PredictionCache (선택사항, 디스크에 OCR 결과 저장)
+        """
+        ocr_config = config.get('ocr') or {}
+        self.lang = ocr_config.get('lang', 'eng')
+        self.tesseract_config = ocr_config.get('tesseract_config', '--oem 3 --psm 6')
+        self.header_ratio = ocr_config.get('header_ratio', 0.15)
+        self.denoise = ocr_config.get('denoise', 'median')
+        self.min_header_width = ocr_config.get('min_header_width', 1000)
+        self.max_pixels = (config.get('decode') or {}).get('max_pixels', DEFAULT_MAX_PIXELS)
+        self.cache = cache
+        self.backend = 'tesserocr' if tesserocr is not None else 'pytesseract'
+        self.cache_namespace = f"ocr:header:{self.backend}:{self.lang}:{self.tesseract_config}:{self.denoise}"
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=ocr_config.get('num_workers', 2),
+            thread_name_prefix='ocr'
+        )
+        self._local = threading.local()
+        self._results: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _get_api(self):
+        """현재 스레드의 tesserocr API를 반환합니다. (최초 호출 시 초기화)"""
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            # tesserocr는 명령줄 설정을 받지 않으므로 --psm/--oem만 API 인자로 전달 (기본값은 SINGLE_BLOCK)
+            options = tesseract_options(self.tesseract_config)
+            options.setdefault('psm', tesserocr.PSM.SINGLE_BLOCK)
+            api = tesserocr.PyTessBaseAPI(lang=self.lang, **options)
+            self._local.api = api
+        return api
+
+    def _recognize(self, image: Image.Image) -> str:
+        """전처리된 이미지에서 텍스트를 읽습니다."""
+        if tesserocr is not None:
+            api = self._get_api()
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        return pytesseract.image_to_string(image, lang=self.lang, config=self.tesseract_config)
+
+    def read_header(self, image_path: str, fb_uid: str) -> Dict:
+        """
+        이미지 상단 영역에서 사용자 정보를 읽습니다.
+
+        Args:
+            image_path: 이미지 파일 경로
+            fb_uid: 사용자 ID (캐시 키)
+
+        Returns:
+            dict: 추출된 사용자 정보 (fbUid, nick, country, gender)
+        """
+        header = load_header(image_path, self.header_ratio, self.min_header_width, self.max_pixels)
+
+        header_hash = hashlib.sha1(header.tobytes()).hexdigest()
+        key = f"{fb_uid}:{header.size[0]}x{header.size[1]}:{header_hash}"
+
+        with self._lock:
+            user_info = self._results.get(key)
+        if user_info is None and self.cache is not None:
+            user_info = self.cache.get(key, self.cache_namespace)
+        if user_info is not None:
+            return dict(user_info)
+
+        text = self._recognize(preprocess_image_for_ocr(header, self.denoise))
+        user_info = parse_user_info(text, image_path)
+        logging.debug(f"OCR {image_path}: {user_info}")
+
+        with self._lock:
+            self._results[key] = user_info
+        if self.cache is not None:
+            self.cache.put(key, self.cache_namespace, user_info)
+        return dict(user_info)
+
+    def resolve_user(self, fb_uid: str, image_paths: List[str]) -> Dict:
+        """
+        사용자의 이미지를 순서대로 읽어 정보를 모두 찾은 첫 결과를 반환합니다.
+        찾지 못하면 fbUid만 채운 기본값을 반환합니다.
+        """
+        timer = get_timer()
+        for image_path in image_paths:
+            try:
+                # 상단 영역 디코딩과 인식 시간을 함께 ocr 단계로 기록
+                with timer.stage('ocr', fb_uid):
+                    user_info = self.read_header(image_path, fb_uid)
+            except Exception as e:
+                logging.warning(f"사용자 정보 추출 중 오류 발생 {image_path}: {str(e)}")
+                continue
+            if is_complete_user_info(user_info):
+                return user_info
+
+        return default_user_info(fb_uid)
+
+    def submit_user(self, fb_uid: str, image_paths: List[str]) -> Future:
+        """사용자 정보 추출을 백그라운드에서 시작하고 Future를 반환합니다."""
+        return self._executor.submit(self.resolve_user, fb_uid, image_paths)
+
+    def close(self) -> None:
+        """스레드 풀을 종료합니다."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,229 @@
+"""
+단계 그래프 파이프라인 실행기
+
+항목(사용자 폴더, 이미지 작업 등)을 단계 함수들에 차례로 흘려보냅니다.
+단계마다 스레드 또는 프로세스 워커 수를 따로 정하고, 단계 사이에는 크기가
+제한된 큐를 두어 느린 단계 앞에 항목(디코딩한 이미지 등)이 무한히 쌓이지 않도록 합니다.
+
+단계 구성(순서, 워커 수, 실행 방식)은 config.yaml의 pipeline 섹션에서 읽고,
+각 진입점(main.py, generate_age_report.py)은 단계 이름별 함수를 제공합니다.
+두 진입점에서 모두 import되므로 이 모듈은 표준 라이브러리만 사용합니다.
+"""
+
+import logging
+import queue
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+EXECUTORS = ('thread', 'process')
+DEFAULT_QUEUE_SIZE = 64
+
+# 단계 워커에게 입력이 끝났음을 알리는 표식
+_DONE = object()
+
+class Stage:
+    """진입점이 제공하는 파이프라인 단계"""
+
+    def __init__(self, name: str, fn: Callable, flush: Optional[Callable] = None,
+                 work: Optional[Callable] = None, process_work: Optional[Callable] = None,
+                 initializer: Optional[Callable] = None, initargs: Tuple = (),
+                 optional: bool = False):
+        """
+        파이프라인 단계를 정의합니다.
+
+        Args:
+            name: 단계 이름 (config.yaml pipeline 섹션의 name)
+            fn: 항목 하나를 받아 다음 단계로 보낼 항목 리스트를 반환하는 함수.
+                work가 있으면 fn(item, call)로 호출하며, call(payload)은 무거운 계산을
+                현재 스레드(work) 또는 프로세스 풀(process_work)에서 실행합니다.
+            flush: 입력이 모두 끝난 뒤 호출해 남은 항목을 반환하는 함수
+                (배치, 집계처럼 상태를 가진 단계이며 스레드 하나로만 실행)
+            work: 스레드 실행 시 call이 호출할 함수
+            process_work: 프로세스 실행 시 call이 호출할 모듈 수준 함수 (인자와 결과는 pickle 가능해야 함)
+            initializer: 프로세스 워커 시작 시 호출할 함수 (모델 로드 등)
+            initargs: initializer 인자
+            optional: True이면 설정에서 생략할 수 있음
+        """
+        self.name = name
+        self.fn = fn
+        self.flush = flush
+        self.work = work
+        self.process_work = process_work
+        self.initializer = initializer
+        self.initargs = initargs
+        self.optional = optional
+
+def _stage_settings(pipeline_name: str, stage: Stage, entry: Dict, queue_size: int) -> Dict:
+    """설정 항목을 검증해 단계 실행 설정(workers, executor, queue_size)을 반환합니다."""
+    workers = int(entry.get('workers', 1))
+    executor = entry.get('executor', 'thread')
+    if workers < 1:
+        raise ValueError(f"{pipeline_name}.{stage.name}: workers는 1 이상이어야 합니다")
+    if executor not in EXECUTORS:
+        raise ValueError(f"{pipeline_name}.{stage.name}: 지원하지 않는 executor: {executor}")
+    if stage.flush is not None and (workers > 1 or executor != 'thread'):
+        raise ValueError(f"{pipeline_name}.{stage.name}: 상태를 가진 단계는 스레드 하나로만 실행할 수 있습니다")
+    if executor == 'process' and stage.process_work is None:
+        raise ValueError(f"{pipeline_name}.{stage.name}: 프로세스 실행을 지원하지 않는 단계입니다")
+    return {
+        'workers': workers,
+        'executor': executor,
+        'queue_size': int(entry.get('queue_size', queue_size))
+    }
+
+class Pipeline:
+    """단계들을 크기가 제한된 큐로 연결해 동시에 실행하는 파이프라인"""
+
+    def __init__(self, name: str, stages: List[Stage], settings: List[Dict]):
+        """
+        Args:
+            name: 파이프라인 이름 (로그용)
+            stages: 실행 순서대로 나열한 단계
+            settings: 단계별 실행 설정 (workers, executor, queue_size)
+        """
+        self.name = name
+        self.stages = stages
+        self.settings = settings
+
+    @classmethod
+    def from_config(cls, config: dict, name: str, stages: List[Stage]) -> 'Pipeline':
+        """
+        config의 pipeline.<name> 단계 목록으로 파이프라인을 만듭니다.
+
+        단계는 설정에 나열한 순서로 연결되지만 stages의 순서(데이터 의존 순서)를
+        바꿀 수는 없고, optional 단계만 생략할 수 있습니다. 설정이 없으면
+        모든 단계를 스레드 하나씩으로 실행합니다.
+
+        Args:
+            config: 설정 딕셔너리
+            name: 파이프라인 이름 ('processor' 또는 'report')
+            stages: 진입점이 제공하는 단계 (실행 순서대로)
+        """
+        pipeline_config = config.get('pipeline') or {}
+        queue_size = pipeline_config.get('queue_size', DEFAULT_QUEUE_SIZE)
+        declared = pipeline_config.get(name) or [{'name': stage.name} for stage in stages]
+
+        by_name = {stage.name: stage for stage in stages}
+        selected, settings = [], []
+        for entry in declared:
+            if isinstance(entry, str):
+                entry = {'name': entry}
+            stage = by_name.get(entry.get('name'))
+            if stage is None:
+                raise ValueError(f"{name} 파이프라인에 없는 단계입니다: {entry.get('name')} "
+                                 f"(사용 가능: {', '.join(by_name)})")
+            selected.append(stage)
+            settings.append(_stage_settings(name, stage, entry, queue_size))
+
+        names = [stage.name for stage in selected]
+        expected = [stage.name for stage in stages if stage.name in names]
+        if names != expected:
+            raise ValueError(f"{name} 파이프라인 단계 순서가 잘못되었습니다: {names} (순서: {expected})")
+        missing = [stage.name for stage in stages if not stage.optional and stage.name not in names]
+        if missing:
+            raise ValueError(f"{name} 파이프라인에 필요한 단계가 없습니다: {', '.join(missing)}")
+        return cls(name, selected, settings)
+
+    def describe(self) -> str:
+        """단계 구성을 한 줄로 요약합니다. (예: list -> decode[thread x4] -> ...)"""
+        parts = []
+        for stage, settings in zip(self.stages, self.settings):
+            if settings['workers'] == 1 and settings['executor'] == 'thread':
+                parts.append(stage.name)
+            else:
+                parts.append(f"{stage.name}[{settings['executor']} x{settings['workers']}]")
+        return ' -> '.join(parts)
+
+    def _make_call(self, stage: Stage, settings: Dict, pools: List) -> Optional[Callable]:
+        """단계의 무거운 계산을 실행할 call 함수를 만듭니다. (work가 없는 단계는 None)"""
+        if settings['executor'] == 'process':
+            # torch/TensorFlow는 fork 이후 안전하지 않으므로 spawn 사용
+            pool = ProcessPoolExecutor(
+                max_workers=settings['workers'],
+                mp_context=mp.get_context('spawn'),
+                initializer=stage.initializer,
+                initargs=stage.initargs
+            )
+            pools.append(pool)
+            return lambda payload: pool.submit(stage.process_work, payload).result()
+        return stage.work
+
+    def run(self, items: Iterable) -> List:
+        """
+        항목들을 모든 단계에 통과시키고 마지막 단계가 내보낸 항목들을 반환합니다.
+
+        단계 함수에서 예외가 발생하면 그 항목만 버리고 오류를 기록합니다.
+        (항목을 끝까지 전달해야 하는 진입점은 단계 함수에서 직접 예외를 처리)
+        """
+        count = len(self.stages)
+        queues = [queue.Queue(maxsize=settings['queue_size']) for settings in self.settings]
+        outputs = []
+        lock = threading.Lock()
+        remaining_workers = [settings['workers'] for settings in self.settings]
+        pools = []
+
+        def emit(index, item):
+            if index + 1 < count:
+                queues[index + 1].put(item)
+            else:
+                with lock:
+                    outputs.append(item)
+
+        def finish(index):
+            # 단계의 마지막 워커가 남은 항목을 내보내고 다음 단계에 종료를 알림
+            stage = self.stages[index]
+            if stage.flush is not None:
+                try:
+                    for result in stage.flush() or ():
+                        emit(index, result)
+                except Exception:
+                    logging.exception(f"{self.name} 파이프라인 {stage.name} 단계 마무리 중 오류 발생")
+            if index + 1 < count:
+                for _ in range(self.settings[index + 1]['workers']):
+                    queues[index + 1].put(_DONE)
+
+        def worker(index, call):
+            stage = self.stages[index]
+            while True:
+                item = queues[index].get()
+                if item is _DONE:
+                    break
+                try:
+                    results = stage.fn(item, call) if call is not None else stage.fn(item)
+                    for result in results or ():
+                        emit(index, result)
+                except Exception:
+                    logging.exception(f"{self.name} 파이프라인 {stage.name} 단계 처리 중 오류 발생")
+            with lock:
+                remaining_workers[index] -= 1
+                last = remaining_workers[index] == 0
+            if last:
+                finish(index)
+
+        threads = []
+        try:
+            for index, (stage, settings) in enumerate(zip(self.stages, self.settings)):
+                call = self._make_call(stage, settings, pools)
+                for worker_index in range(settings['workers']):
+                    thread = threading.Thread(
+                        target=worker, args=(index, call),
+                        name=f"{self.name}-{stage.name}-{worker_index}", daemon=True
+                    )
+                    thread.start()
+                    threads.append(thread)
+
+            try:
+                for item in items:
+                    queues[0].put(item)
+            finally:
+                for _ in range(self.settings[0]['workers']):
+                    queues[0].put(_DONE)
+
+            for thread in threads:
+                thread.join()
+        finally:
+            for pool in pools:
+                pool.shutdown()
+        return outputs
@@ -0,0 +1,190 @@
+"""
+이미지 내용 해시 기반 예측 결과 캐시
+
+같은 캡처가 여러 주차 폴더에 다시 수집되거나 리포트를 재실행할 때
+얼굴 검출, 나이 예측, OCR 결과를 다시 계산하지 않도록 SQLite에 저장합니다.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Optional
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """파일 내용의 SHA-256 해시를 반환합니다."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _to_builtin(value: Any) -> Any:
+    """numpy 스칼라/배열 등을 JSON으로 저장 가능한 값으로 변환합니다."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+class PredictionCache:
+    """(내용 해시, 네임스페이스)를 키로 하는 크기 제한 LRU 캐시"""
+
+    # 몇 번의 저장마다 전체 크기를 확인할지
+    EVICT_CHECK_INTERVAL = 100
+
+    def __init__(self, path: str, max_size_mb: float = 512, version: Any = 1):
+        """
+        캐시를 초기화.
+
+        Args:
+            path: SQLite 파일 경로
+            max_size_mb: 저장할 결과의 최대 크기 (MB), 초과 시 오래 사용되지 않은 항목부터 삭제
+            version: 캐시 버전 (전처리/후처리 로직 변경 시 올려서 기존 항목 무효화)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.version = str(version)
+        self._puts_since_evict = 0
+
+        # 여러 워커 프로세스가 같은 파일을 공유할 수 있도록 WAL 모드 사용
+        # (같은 프로세스의 OCR 스레드와도 연결을 공유하므로 잠금으로 보호)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                content_hash TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (content_hash, namespace)
+            )
+            """
+        )
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)'
+        )
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['PredictionCache']:
+        """설정의 cache 섹션으로 캐시를 생성합니다. 비활성화되어 있으면 None을 반환합니다."""
+        cache_config = config.get('cache') or {}
+        if not cache_config.get('enabled', False):
+            return None
+        return cls(
+            cache_config.get('path', 'cache/predictions.sqlite'),
+            cache_config.get('max_size_mb', 512),
+            cache_config.get('version', 1)
+        )
+
+    def _namespace(self, namespace: str) -> str:
+        return f"{namespace}@v{self.version}"
+
+    def get(self, content_hash: str, namespace: str) -> Optional[Any]:
+        """
+        캐시된 값을 조회.
+
+        Args:
+            content_hash: 이미지(또는 이미지 영역) 내용 해시
+            namespace: 결과 종류와 모델/백엔드 버전 (예: 'age:vit:<모델명>')
+
+        Returns:
+            캐시된 값, 없으면 None
+        """
+        key = self._namespace(namespace)
+        try:
+            with self._lock:
+                row = self.conn.execute(
+                    'SELECT payload FROM entries WHERE content_hash = ? AND namespace = ?',
+                    (content_hash, key)
+                ).fetchone()
+                if row is None:
+                    return None
+                self.conn.execute(
+                    'UPDATE entries SET last_access = ? WHERE content_hash = ? AND namespace = ?',
+                    (time.time(), content_hash, key)
+                )
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logging.warning(f"캐시 조회 중 오류 발생: {str(e)}")
+            return None
+
+    def put(self, content_hash: str, namespace: str, value: Any) -> None:
+        """
+        값을 캐시에 저장.
+
+        Args:
+            content_hash: 이미지(또는 이미지 영역) 내용 해시
+            namespace: 결과 종류와 모델/백엔드 버전
+            value: JSON으로 직렬화 가능한 값
+        """
+        payload = json.dumps(value, default=_to_builtin, ensure_ascii=False)
+        try:
+            with self._lock:
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO entries (content_hash, namespace, payload, size, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (content_hash, self._namespace(namespace), payload, len(payload), time.time())
+                )
+                self._puts_since_evict += 1
+        except sqlite3.Error as e:
+            logging.warning(f"캐시 저장 중 오류 발생: {str(e)}")
+            return
+
+        if self._puts_since_evict >= self.EVICT_CHECK_INTERVAL:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        전체 크기가 최대 크기를 넘으면 가장 오래 사용되지 않은 항목부터 삭제.
+
+        Returns:
+            int: 삭제된 항목 수
+        """
+        with self._lock:
+            return self._evict()
+
+    def _evict(self) -> int:
+        """잠금을 잡은 상태에서 호출되는 evict()의 본체"""
+        self._puts_since_evict = 0
+        removed = 0
+        try:
+            total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            # 매번 경계에서 삭제가 반복되지 않도록 최대 크기의 90%까지 줄임
+            target = int(self.max_bytes * 0.9)
+            if total <= self.max_bytes:
+                return 0
+
+            rows = self.conn.execute(
+                'SELECT rowid, size FROM entries ORDER BY last_access'
+            ).fetchall()
+            victims = []
+            for rowid, size in rows:
+                if total <= target:
+                    break
+                victims.append((rowid,))
+                total -= size
+
+            self.conn.executemany('DELETE FROM entries WHERE rowid = ?', victims)
+            removed = len(victims)
+            logging.info(f"캐시 정리: {removed}개 항목 삭제")
+        except sqlite3.Error as e:
+            logging.warning(f"캐시 정리 중 오류 발생: {str(e)}")
+        return removed
+
+    def close(self) -> None:
+        """남은 정리 작업을 수행하고 연결을 닫습니다."""
+        self.evict()
+        with self._lock:
+            self.conn.close()
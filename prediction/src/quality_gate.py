@@ -0,0 +1,111 @@
+"""
+얼굴 크롭 품질 검사
+
+너무 작거나, 흐리거나, 검출 신뢰도가 낮거나, 정면에서 크게 벗어난 얼굴은
+나이 모델에 넣어도 예측이 불안정하므로 추론 전에 건너뛰고 사유를 기록합니다.
+"""
+
+from typing import Dict, Optional, Sequence
+import cv2
+import numpy as np
+from PIL import Image
+
+# 건너뛴 사유 (리포트의 skip_reason 값)
+SKIP_TOO_SMALL = 'face_too_small'
+SKIP_LOW_CONFIDENCE = 'low_detector_confidence'
+SKIP_EXTREME_POSE = 'extreme_pose'
+SKIP_BLURRY = 'face_blurry'
+
+# 흐림 정도는 크롭 크기에 따라 달라지므로 이 크기로 맞춘 뒤 계산
+BLUR_MEASURE_SIZE = 128
+
+def laplacian_variance(image: Image.Image) -> float:
+    """그레이스케일로 변환해 고정 크기로 맞춘 뒤 라플라시안 분산(선명도)을 계산합니다."""
+    gray = np.asarray(image.convert('L'))
+    height, width = gray.shape
+    factor = BLUR_MEASURE_SIZE / max(height, width)
+    if factor < 1:
+        gray = cv2.resize(gray, (max(1, int(width * factor)), max(1, int(height * factor))),
+                          interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+def pose_offset(keypoints: Dict[str, Sequence[float]]) -> Optional[float]:
+    """
+    눈 사이 중점에서 코까지의 가로 거리를 눈 사이 거리로 나눈 값을 반환합니다.
+    정면이면 0에 가깝고 옆으로 돌아갈수록 커집니다.
+
+    Args:
+        keypoints: MTCNN 랜드마크 ('left_eye', 'right_eye', 'nose')
+
+    Returns:
+        float: 정면 이탈 정도, 랜드마크가 없으면 None
+    """
+    try:
+        left_x = keypoints['left_eye'][0]
+        right_x = keypoints['right_eye'][0]
+        nose_x = keypoints['nose'][0]
+    except (KeyError, TypeError, IndexError):
+        return None
+    eye_distance = abs(right_x - left_x)
+    if eye_distance < 1:
+        return float('inf')
+    return abs(nose_x - (left_x + right_x) / 2) / eye_distance
+
+class FaceQualityGate:
+    """검출 결과와 크롭의 품질을 검사해 건너뛸 사유를 반환하는 클래스"""
+
+    def __init__(self, config: dict):
+        """
+        품질 검사기를 초기화.
+
+        Args:
+            config: 설정 딕셔너리 (age_detection.face_size_threshold, quality_gate 섹션)
+        """
+        gate_config = config.get('quality_gate') or {}
+        self.min_face_size = config['age_detection'].get('face_size_threshold', 50)
+        self.min_detector_confidence = gate_config.get('min_detector_confidence', 0.9)
+        self.min_deepface_confidence = gate_config.get('min_deepface_confidence', 0.5)
+        self.max_pose_offset = gate_config.get('max_pose_offset', 0.45)
+        self.min_blur_variance = gate_config.get('min_blur_variance', 40.0)
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['FaceQualityGate']:
+        """설정의 quality_gate 섹션으로 검사기를 생성합니다. 비활성화되어 있으면 None을 반환합니다."""
+        if not (config.get('quality_gate') or {}).get('enabled', False):
+            return None
+        return cls(config)
+
+    def check_detection(self, box: Sequence[float], confidence: Optional[float] = None,
+                        keypoints: Optional[Dict] = None) -> Optional[str]:
+        """
+        크롭하기 전에 검출 결과만으로 검사합니다. (전체 해상도 디코딩 전에 호출)
+
+        Args:
+            box: 원본 해상도 기준 (x, y, width, height)
+            confidence: 검출기 신뢰도 (없으면 검사하지 않음, 예: Haar/dlib)
+            keypoints: 얼굴 랜드마크 (없으면 자세를 검사하지 않음)
+
+        Returns:
+            str: 건너뛸 사유, 통과하면 None
+        """
+        if min(box[2], box[3]) < self.min_face_size:
+            return SKIP_TOO_SMALL
+        if confidence is not None and confidence < self.min_detector_confidence:
+            return SKIP_LOW_CONFIDENCE
+        if keypoints:
+            offset = pose_offset(keypoints)
+            if offset is not None and offset > self.max_pose_offset:
+                return SKIP_EXTREME_POSE
+        return None
+
+    def check_crop(self, crop: Image.Image) -> Optional[str]:
+        """크롭의 선명도를 검사합니다. 통과하면 None, 아니면 건너뛸 사유를 반환합니다."""
+        if self.min_blur_variance and laplacian_variance(crop) < self.min_blur_variance:
+            return SKIP_BLURRY
+        return None
+
+    def check_confidence(self, confidence: Optional[float]) -> Optional[str]:
+        """예측 후에만 알 수 있는 검출 신뢰도(DeepFace 전체 이미지 모드)를 검사합니다."""
+        if confidence is not None and confidence < self.min_deepface_confidence:
+            return SKIP_LOW_CONFIDENCE
+        return None
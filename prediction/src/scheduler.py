@@ -0,0 +1,210 @@
+"""
+위험도 우선, 시간 예산 사용자 스케줄러
+
+이전 실행의 미성년자 리포트, 분류 도구(sorter)의 주간 분류 결과, 스크래퍼의
+연속 탐지 주 수(user_history.json, integrated_data_*.json)로 사용자별 위험도를
+계산해 위험한 사용자부터 처리합니다. 시간 예산이 설정되어 있으면 예산을 넘긴 뒤
+시작하지 못한 사용자는 건너뛰고 skipped_users.csv에 기록합니다.
+
+두 진입점에서 모두 import되므로 이 모듈은 상대 import를 사용하지 않습니다.
+"""
+
+import os
+import csv
+import glob
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# 건너뛴 사용자 목록 파일 (출력 폴더에 저장)
+SKIPPED_USERS_FILE = 'skipped_users.csv'
+
+# 건너뛴 사유
+SKIP_TIME_BUDGET = 'time_budget'
+
+def _expand(patterns) -> List[str]:
+    """경로 또는 glob 패턴 목록을 실제 파일 경로 목록으로 바꿉니다."""
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = []
+    for pattern in patterns or []:
+        paths.extend(sorted(glob.glob(pattern)))
+    return paths
+
+def load_underage_reports(patterns) -> Dict[str, int]:
+    """
+    이전 실행의 underage_report.csv들을 읽어 사용자별로 미성년자로 예측된 리포트 수를 반환합니다.
+    (한 리포트에 여러 행이 있어도 한 번으로 셈)
+    """
+    counts = {}
+    for report_file in _expand(patterns):
+        try:
+            with open(report_file, 'r', newline='', encoding='utf-8') as f:
+                users = {row['fbUid'] for row in csv.DictReader(f) if row.get('fbUid')}
+        except (OSError, KeyError, csv.Error) as e:
+            logging.warning(f"미성년자 리포트를 읽을 수 없습니다 {report_file}: {str(e)}")
+            continue
+        for fb_uid in users:
+            counts[fb_uid] = counts.get(fb_uid, 0) + 1
+    return counts
+
+def load_sorter_classifications(history_dir: Optional[str]) -> Dict[str, int]:
+    """
+    분류 도구가 history/<주차>/<주차>.xlsx에 저장한 분류 결과를 읽어
+    사용자별로 문제 사용자로 분류된 주 수를 반환합니다. (openpyxl이 없으면 빈 결과)
+    """
+    if not history_dir or not os.path.isdir(history_dir):
+        return {}
+    try:
+        import openpyxl
+    except ImportError:
+        logging.warning("openpyxl이 설치되어 있지 않아 이전 분류 결과를 사용하지 않습니다")
+        return {}
+
+    counts = {}
+    for week_dir in sorted(Path(history_dir).iterdir()):
+        excel_file = week_dir / f"{week_dir.name}.xlsx"
+        if not week_dir.is_dir() or not excel_file.exists():
+            continue
+        try:
+            workbook = openpyxl.load_workbook(excel_file, read_only=True)
+            users = {str(row[0]) for row in workbook.active.iter_rows(values_only=True) if row and row[0]}
+            workbook.close()
+        except Exception as e:
+            logging.warning(f"분류 결과를 읽을 수 없습니다 {excel_file}: {str(e)}")
+            continue
+        for fb_uid in users:
+            counts[fb_uid] = counts.get(fb_uid, 0) + 1
+    return counts
+
+def load_consecutive_weeks(history_dir: Optional[str], integrated_patterns) -> Dict[str, int]:
+    """
+    스크래퍼의 user_history.json과 가장 최근 integrated_data_*.json에서
+    사용자별 연속 탐지 주 수(consecutiveWeeks)를 읽어 큰 값을 반환합니다.
+    """
+    weeks = {}
+
+    def update(fb_uid, value):
+        if fb_uid and isinstance(value, (int, float)):
+            weeks[fb_uid] = max(weeks.get(fb_uid, 0), int(value))
+
+    history_file = os.path.join(history_dir, 'user_history.json') if history_dir else None
+    if history_file and os.path.exists(history_file):
+        try:
+            with open(history_file, 'r', encoding='utf-8') as f:
+                for fb_uid, history in json.load(f).items():
+                    update(fb_uid, history.get('consecutiveWeeks'))
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"사용자 히스토리를 읽을 수 없습니다 {history_file}: {str(e)}")
+
+    integrated_files = _expand(integrated_patterns)
+    if integrated_files:
+        # 파일 이름의 수집 시각 순서로 정렬되므로 마지막 파일이 가장 최근
+        integrated_file = integrated_files[-1]
+        try:
+            with open(integrated_file, 'r', encoding='utf-8') as f:
+                for user in json.load(f).get('users', []):
+                    update(user.get('fbUid'), (user.get('activityMetrics') or {}).get('consecutiveWeeks'))
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"통합 데이터를 읽을 수 없습니다 {integrated_file}: {str(e)}")
+    return weeks
+
+def deadline_passed(deadline: Optional[float]) -> bool:
+    """마감 시각(time.time() 기준, None이면 제한 없음)이 지났으면 True를 반환합니다."""
+    return deadline is not None and time.time() >= deadline
+
+class UserScheduler:
+    """사용자를 위험도 순서로 정렬하고 시간 예산을 넘기면 남은 사용자를 건너뛰는 스케줄러"""
+
+    def __init__(self, config: dict):
+        """
+        스케줄러를 초기화하고 이전 위험 신호를 읽습니다.
+
+        Args:
+            config: 설정 딕셔너리 (scheduler 섹션)
+        """
+        scheduler_config = config.get('scheduler') or {}
+        weights = scheduler_config.get('weights') or {}
+        self.underage_weight = weights.get('underage_report', 10.0)
+        self.classified_weight = weights.get('classified_week', 5.0)
+        self.consecutive_weight = weights.get('consecutive_week', 1.0)
+        self.time_budget = float(scheduler_config.get('time_budget_minutes') or 0) * 60
+        self.checkpoint_every = scheduler_config.get('checkpoint_every', 10)
+
+        history_dir = scheduler_config.get('history_dir')
+        self.underage = load_underage_reports(scheduler_config.get('underage_reports'))
+        self.classified = load_sorter_classifications(history_dir)
+        self.consecutive = load_consecutive_weeks(history_dir, scheduler_config.get('integrated_data'))
+
+        self.deadline = None
+        self.skipped = []  # (사용자 ID, 위험도)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['UserScheduler']:
+        """설정의 scheduler 섹션으로 생성합니다. 비활성화되어 있으면 None을 반환합니다."""
+        if not (config.get('scheduler') or {}).get('enabled', False):
+            return None
+        return cls(config)
+
+    def risk(self, user_id: str) -> float:
+        """이전 미성년자 예측, 분류 도구의 문제 분류, 연속 탐지 주 수로 위험도를 계산합니다."""
+        return (
+            self.underage_weight * self.underage.get(user_id, 0)
+            + self.classified_weight * self.classified.get(user_id, 0)
+            + self.consecutive_weight * self.consecutive.get(user_id, 0)
+        )
+
+    def order(self, paths: Iterable[str]) -> List[str]:
+        """사용자 폴더 경로를 위험도가 높은 순서로 정렬합니다. (같으면 폴더 이름 순)"""
+        return sorted(paths, key=lambda path: (-self.risk(os.path.basename(path)), os.path.basename(path)))
+
+    def start(self) -> None:
+        """
+        시간 예산 측정을 시작합니다. (예산이 0이면 제한 없음)
+        마감 시각은 워커 프로세스에도 전달할 수 있도록 time.time() 기준입니다.
+        """
+        self.deadline = time.time() + self.time_budget if self.time_budget > 0 else None
+        self.skipped = []
+
+    def admit(self, user_id: str) -> bool:
+        """
+        사용자 처리를 시작해도 되면 True를 반환합니다.
+        시간 예산을 넘겼으면 건너뛴 사용자로 기록하고 False를 반환합니다.
+        """
+        if not deadline_passed(self.deadline):
+            return True
+        self.mark_skipped(user_id)
+        return False
+
+    def mark_skipped(self, user_id: str) -> None:
+        """시간 예산을 넘겨 처리하지 못한 사용자를 기록합니다."""
+        with self._lock:
+            if not self.skipped:
+                logging.warning(f"시간 예산({self.time_budget / 60:g}분)을 넘겨 남은 사용자를 건너뜁니다")
+            self.skipped.append((user_id, self.risk(user_id)))
+
+    def should_checkpoint(self, completed: int) -> bool:
+        """완료한 사용자 수가 checkpoint_every의 배수이면 중간 결과를 저장합니다."""
+        return bool(self.checkpoint_every) and completed % self.checkpoint_every == 0
+
+    def save_skipped(self, output_dir: str) -> Optional[str]:
+        """건너뛴 사용자 목록을 skipped_users.csv로 저장합니다. (없으면 이전 목록 삭제)"""
+        skipped_file = os.path.join(output_dir, SKIPPED_USERS_FILE)
+        if not self.skipped:
+            if os.path.exists(skipped_file):
+                os.remove(skipped_file)
+            return None
+        with open(skipped_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['fbUid', 'risk', 'reason'])
+            for user_id, risk in sorted(self.skipped, key=lambda item: (-item[1], item[0])):
+                writer.writerow([user_id, f"{risk:g}", SKIP_TIME_BUDGET])
+        return skipped_file
+
+    def skipped_users(self) -> List[str]:
+        """건너뛴 사용자 ID를 위험도 순서로 반환합니다."""
+        return [user_id for user_id, _ in sorted(self.skipped, key=lambda item: (-item[1], item[0]))]
@@ -0,0 +1,155 @@
+"""
+파이프라인 단계별 처리 시간 계측
+
+항상 켜 두어도 부담이 없도록 단계마다 perf_counter 두 번과 리스트 추가만 수행하고,
+분위수(p50/p95/p99)와 히스토그램은 실행이 끝난 뒤 한 번에 계산합니다.
+"""
+
+import os
+import json
+import math
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+# 히스토그램 구간 상한 (밀리초)
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """정렬된 값에서 nearest-rank 방식으로 분위수를 구합니다."""
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+def summarize(samples: List[float]) -> Dict:
+    """
+    초 단위 측정값들을 요약합니다.
+
+    Returns:
+        dict: 횟수, 합계, 평균, p50/p95/p99, 최대값 (밀리초)과 히스토그램
+    """
+    values = sorted(sample * 1000 for sample in samples)
+    histogram = {}
+    start = 0
+    for bound in HISTOGRAM_BOUNDS_MS + [float('inf')]:
+        end = start
+        while end < len(values) and values[end] <= bound:
+            end += 1
+        label = f"<={bound}ms" if bound != float('inf') else f">{HISTOGRAM_BOUNDS_MS[-1]}ms"
+        histogram[label] = end - start
+        start = end
+
+    return {
+        'count': len(values),
+        'total_ms': round(sum(values), 3),
+        'mean_ms': round(sum(values) / len(values), 3),
+        'p50_ms': round(_percentile(values, 50), 3),
+        'p95_ms': round(_percentile(values, 95), 3),
+        'p99_ms': round(_percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3),
+        'histogram': histogram
+    }
+
+class StageTimer:
+    """단계별, 사용자별 처리 시간 기록기"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.user_samples: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+        self.started_at = time.time()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def for_user(self, user: Optional[str]):
+        """이 블록 안에서 현재 스레드가 기록하는 시간을 user에 귀속시킵니다."""
+        previous = getattr(self._local, 'user', None)
+        self._local.user = user
+        try:
+            yield
+        finally:
+            self._local.user = previous
+
+    def record(self, stage: str, seconds: float, user: Optional[str] = None) -> None:
+        """측정값 하나를 기록합니다. user가 없으면 현재 스레드의 사용자를 사용합니다."""
+        if not self.enabled:
+            return
+        if user is None:
+            user = getattr(self._local, 'user', None)
+        with self._lock:
+            self.samples[stage].append(seconds)
+            if user is not None:
+                self.user_samples[user][stage].append(seconds)
+
+    def stage(self, name: str, user: Optional[str] = None):
+        """블록의 실행 시간을 name 단계로 기록하는 컨텍스트 매니저를 반환합니다."""
+        if not self.enabled:
+            return nullcontext()
+        return self._measure(name, user)
+
+    @contextmanager
+    def _measure(self, name: str, user: Optional[str]):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, user)
+
+    def export(self) -> Dict:
+        """다른 프로세스로 보낼 수 있도록 원시 측정값을 내보냅니다."""
+        with self._lock:
+            return {
+                'samples': {stage: list(values) for stage, values in self.samples.items()},
+                'user_samples': {
+                    user: {stage: list(values) for stage, values in stages.items()}
+                    for user, stages in self.user_samples.items()
+                }
+            }
+
+    def merge(self, exported: Dict) -> None:
+        """export()로 내보낸 다른 기록기(워커 프로세스)의 측정값을 합칩니다."""
+        with self._lock:
+            for stage, values in exported.get('samples', {}).items():
+                self.samples[stage].extend(values)
+            for user, stages in exported.get('user_samples', {}).items():
+                for stage, values in stages.items():
+                    self.user_samples[user][stage].extend(values)
+
+    def summary(self) -> Dict:
+        """실행 전체와 사용자별 단계 요약을 반환합니다."""
+        with self._lock:
+            return {
+                'wall_time_s': round(time.time() - self.started_at, 3),
+                'run': {stage: summarize(values) for stage, values in self.samples.items() if values},
+                'users': {
+                    user: {stage: summarize(values) for stage, values in stages.items() if values}
+                    for user, stages in sorted(self.user_samples.items())
+                }
+            }
+
+    def save(self, output_path: str, filename: str = 'timings.json') -> str:
+        """요약을 출력 폴더의 timings.json으로 저장하고 경로를 반환합니다."""
+        os.makedirs(output_path, exist_ok=True)
+        timings_file = os.path.join(output_path, filename)
+        with open(timings_file, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False)
+        return timings_file
+
+# 현재 실행의 기록기 (비활성 상태에서는 아무것도 기록하지 않음)
+_active_timer = StageTimer(enabled=False)
+
+def activate(timer: StageTimer) -> StageTimer:
+    """timer를 현재 프로세스의 기록기로 설정하고 반환합니다."""
+    global _active_timer
+    _active_timer = timer
+    return timer
+
+def get_timer() -> StageTimer:
+    """현재 프로세스의 기록기를 반환합니다."""
+    return _active_timer
+
+def activate_from_config(config: dict) -> StageTimer:
+    """설정의 timing 섹션에 따라 기록기를 만들어 활성화합니다."""
+    return activate(StageTimer(enabled=(config.get('timing') or {}).get('enabled', True)))
@@ -1,7 +1,6 @@
 import os
 import yaml
 from pathlib import Path
-import torch
 from PIL import Image
 import re
 from datetime import datetime
@@ -14,8 +13,10 @@ def load_config(config_path: str) -> dict:
     with open(config_path, 'r') as f:
         return yaml.safe_load(f)
 
-def get_device(config: dict) -> torch.device:
+def get_device(config: dict) -> 'torch.device':
     """설정에 따라 적절한 디바이스를 반환합니다."""
+    # torch는 import에 수 초가 걸리므로 디바이스가 필요할 때 가져옴
+    import torch
     device_name = config['processing']['device']
     
     if device_name == "mps" and torch.backends.mps.is_available():
@@ -40,27 +41,68 @@ def extract_date_from_filename(filename: str) -> str:
     except:
         return None
 
-def preprocess_image_for_ocr(image):
-    """OCR을 위한 이미지 전처리를 수행합니다."""
+def preprocess_image_for_ocr(image, denoise: str = 'nlmeans'):
+    """
+    OCR을 위한 이미지 전처리를 수행합니다.
+    
+    Args:
+        image: PIL Image 객체
+        denoise: 노이즈 제거 방식 ('none', 'median', 'nlmeans')
+    """
     # PIL Image를 numpy 배열로 변환
     img_np = np.array(image)
     
     # BGR로 변환 (OpenCV 형식)
     if len(img_np.shape) == 3:
         img_np = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+        # 그레이스케일로 변환
+        gray = cv2.cvtColor(img_np, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = img_np
     
-    # 그레이스케일로 변환
-    gray = cv2.cvtColor(img_np, cv2.COLOR_BGR2GRAY)
-    
-    # 노이즈 제거
-    denoised = cv2.fastNlMeansDenoising(gray)
+    # 노이즈 제거 (nlmeans는 품질이 좋지만 매우 느림)
+    if denoise == 'nlmeans':
+        gray = cv2.fastNlMeansDenoising(gray)
+    elif denoise == 'median':
+        gray = cv2.medianBlur(gray, 3)
     
     # 이진화
-    _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     
     # 다시 PIL Image로 변환
     return Image.fromarray(binary)
 
+def parse_user_info(text: str, image_path: str) -> dict:
+    """
+    OCR 텍스트에서 사용자 정보를 추출합니다.
+    
+    Args:
+        text: OCR로 읽은 텍스트
+        image_path: 이미지 파일 경로 (fbUid를 찾지 못했을 때 파일 이름에서 추출)
+        
+    Returns:
+        dict: 추출된 사용자 정보 (fbUid, nick, country, gender)
+    """
+    # 대소문자 구분 없이 검색
+    text = text.lower()
+    
+    fields = {}
+    for key, pattern in (
+        ('fbUid', r'fbuid:?\s*([^,\s]+)'),
+        ('nick', r'nick:?\s*([^,\s]+)'),
+        ('country', r'country:?\s*([^,\s]+)'),
+        ('gender', r'gender:?\s*([^,\s]+)')
+    ):
+        match = re.search(pattern, text, re.IGNORECASE)
+        fields[key] = match.group(1) if match else None
+    
+    return {
+        'fbUid': fields['fbUid'] or os.path.basename(image_path).split('_')[0],
+        'nick': fields['nick'],
+        'country': fields['country'],
+        'gender': fields['gender']
+    }
+
 def extract_user_info_from_image(image_path: str) -> dict:
     """
     이미지에서 사용자 정보를 추출합니다.
@@ -71,13 +113,11 @@ def extract_user_info_from_image(image_path: str) -> dict:
     Returns:
         dict: 추출된 사용자 정보 (fbUid, nick, country, gender)
     """
+    # 모듈은 src 폴더 기준 스크립트(generate_age_report.py 등)에서도 import하므로 패키지 import는 여기서
+    from .image_io import load_header
     try:
-        # 이미지 로드
-        image = Image.open(image_path)
-        
-        # 이미지의 상단 부분만 크롭 (전체 높이의 15%만)
-        width, height = image.size
-        top_section = image.crop((0, 0, width, int(height * 0.15)))
+        # 이미지의 상단 부분만 로드 (전체 높이의 15%만)
+        top_section = load_header(image_path, 0.15)
         
         # 이미지 전처리
         processed_image = preprocess_image_for_ocr(top_section)
@@ -89,44 +129,14 @@ def extract_user_info_from_image(image_path: str) -> dict:
         text = pytesseract.image_to_string(processed_image, lang='eng', config=custom_config)
         
         # 텍스트에서 정보 추출
-        fb_uid = None
-        nick = None
-        country = None
-        gender = None
-        
-        # 대소문자 구분 없이 검색
-        text = text.lower()
-        
-        # fbUid 추출 (대소문자 구분 없이)
-        fb_uid_match = re.search(r'fbuid:?\s*([^,\s]+)', text, re.IGNORECASE)
-        if fb_uid_match:
-            fb_uid = fb_uid_match.group(1)
-        
-        # nick 추출
-        nick_match = re.search(r'nick:?\s*([^,\s]+)', text, re.IGNORECASE)
-        if nick_match:
-            nick = nick_match.group(1)
-        
-        # country 추출
-        country_match = re.search(r'country:?\s*([^,\s]+)', text, re.IGNORECASE)
-        if country_match:
-            country = country_match.group(1)
-        
-        # gender 추출
-        gender_match = re.search(r'gender:?\s*([^,\s]+)', text, re.IGNORECASE)
-        if gender_match:
-            gender = gender_match.group(1)
+        user_info = parse_user_info(text, image_path)
         
         print(f"이미지 경로: {image_path}")
-        print(f"추출된 텍스트:\n{text}")
-        print(f"추출된 정보: fbUid={fb_uid}, nick={nick}, country={country}, gender={gender}\n")
+        print(f"추출된 텍스트:\n{text.lower()}")
+        print(f"추출된 정보: fbUid={user_info['fbUid']}, nick={user_info['nick']}, "
+              f"country={user_info['country']}, gender={user_info['gender']}\n")
         
-        return {
-            'fbUid': fb_uid or os.path.basename(image_path).split('_')[0],
-            'nick': nick,
-            'country': country,
-            'gender': gender
-        }
+        return user_info
         
     except Exception as e:
         print(f"사용자 정보 추출 중 오류 발생: {str(e)}")
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import logging
+from pathlib import Path
+from openpyxl import load_workbook
+
+INDEX_FILE = 'classification_index.sqlite'
+
+
+def parse_classification(classification_data):
+    """'분류_날짜,날짜' 형식을 (분류, 문제 날짜 리스트)로 나눕니다."""
+    classification, _, dates = str(classification_data).partition('_')
+    return classification, [date for date in dates.split(',') if date]
+
+
+def read_workbook_rows(excel_file):
+    """주간 엑셀 파일의 (사용자 ID, 분류, 문제 날짜 리스트)를 읽습니다. (헤더 행은 건너뜀)"""
+    wb = load_workbook(excel_file, read_only=True)
+    try:
+        rows = []
+        for row in wb.active.iter_rows(values_only=True):
+            if not row or len(row) < 2 or not row[0] or not row[1] or row[0] == 'ID':
+                continue
+            classification, problem_dates = parse_classification(row[1])
+            rows.append((str(row[0]), classification, problem_dates))
+        return rows
+    finally:
+        wb.close()
+
+
+class ClassificationIndex:
+    """
+    history/ 아래 주차별 엑셀(YYYYMMDD-YYYYMMDD.xlsx)의 분류 결과를 (사용자 ID, 주차)로
+    색인한 SQLite 파일. 수정 시각/크기가 바뀐 엑셀만 다시 읽습니다.
+    """
+
+    def __init__(self, history_dir):
+        self.history_dir = Path(history_dir)
+        self.conn = sqlite3.connect(str(self.history_dir / INDEX_FILE))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS workbooks (
+                week TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS classifications (
+                fb_uid TEXT NOT NULL,
+                week TEXT NOT NULL,
+                classification TEXT NOT NULL,
+                problem_dates TEXT NOT NULL,
+                PRIMARY KEY (fb_uid, week)
+            );
+        """)
+
+    def refresh(self):
+        """새로 생기거나 바뀐 주간 엑셀만 다시 읽고, 없어진 주차는 색인에서 지웁니다."""
+        indexed = {week: (mtime, size) for week, mtime, size in
+                   self.conn.execute("SELECT week, mtime, size FROM workbooks")}
+        weeks = set()
+        for week_dir in self.history_dir.iterdir():
+            excel_file = week_dir / f"{week_dir.name}.xlsx"
+            if not week_dir.is_dir() or not week_dir.name[0].isdigit() or not excel_file.exists():
+                continue
+            weeks.add(week_dir.name)
+            stat = excel_file.stat()
+            if indexed.get(week_dir.name) == (stat.st_mtime, stat.st_size):
+                continue
+            try:
+                rows = read_workbook_rows(excel_file)
+            except Exception as e:
+                logging.error(f"분류 색인 생성 중 엑셀 파일을 읽을 수 없습니다: {excel_file}. 오류: {e}")
+                continue
+            with self.conn:
+                self._replace_week(week_dir.name, rows)
+                self.conn.execute("INSERT OR REPLACE INTO workbooks (week, mtime, size) VALUES (?, ?, ?)",
+                                  (week_dir.name, stat.st_mtime, stat.st_size))
+            logging.info(f"분류 색인 갱신: {week_dir.name} ({len(rows)}명)")
+
+        with self.conn:
+            for week in set(indexed) - weeks:
+                self._replace_week(week, [])
+                self.conn.execute("DELETE FROM workbooks WHERE week = ?", (week,))
+
+    def _replace_week(self, week, rows):
+        self.conn.execute("DELETE FROM classifications WHERE week = ?", (week,))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO classifications (fb_uid, week, classification, problem_dates) VALUES (?, ?, ?, ?)",
+            [(fb_uid, week, classification, ','.join(dates)) for fb_uid, classification, dates in rows]
+        )
+
+    def previous_classifications(self, fb_uid, exclude_week=None, limit=3):
+        """사용자의 이전 분류를 최근 주차부터 (주차, 분류, 문제 날짜 리스트)로 반환합니다."""
+        rows = self.conn.execute(
+            "SELECT week, classification, problem_dates FROM classifications "
+            "WHERE fb_uid = ? AND week != ? ORDER BY week DESC LIMIT ?",
+            (fb_uid, exclude_week or '', limit)
+        )
+        return [(week, classification, [date for date in dates.split(',') if date])
+                for week, classification, dates in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def find_history_dir(folder):
+    """folder 또는 그 상위에서 history 디렉토리를 찾아 (history 경로, 주차 이름)을 반환합니다."""
+    path = Path(folder).resolve()
+    for parent in [path] + list(path.parents):
+        if parent.name == 'history':
+            relative = path.relative_to(parent).parts
+            return parent, (relative[0] if relative else None)
+    return None, None
+
+
+def open_index(history_dir):
+    """history 디렉토리의 분류 색인을 열고 갱신합니다. 실패하면 None을 반환합니다."""
+    if not history_dir or not os.path.isdir(history_dir):
+        return None
+    try:
+        index = ClassificationIndex(history_dir)
+        index.refresh()
+        return index
+    except sqlite3.Error as e:
+        logging.error(f"분류 색인을 열 수 없습니다: {history_dir}. 오류: {e}")
+        return None
@@ -0,0 +1,142 @@
+import os
+import json
+import logging
+from datetime import datetime
+from openpyxl import Workbook
+from classification_index import read_workbook_rows
+
+
+def journal_path_for(excel_file):
+    """주간 엑셀 파일 옆의 분류 저널 경로 (<주차>.journal.jsonl)"""
+    return os.path.splitext(str(excel_file))[0] + '.journal.jsonl'
+
+
+def replay_journal(journal_file, classifications=None):
+    """
+    저널의 분류 이벤트를 classifications(없으면 빈 결과)에 순서대로 적용해 {사용자 ID: 분류 정보}를 반환합니다.
+    쓰는 도중 종료되어 잘린 마지막 줄 등 읽을 수 없는 줄은 건너뜁니다.
+    """
+    classifications = {} if classifications is None else classifications
+    if not os.path.exists(journal_file):
+        return classifications
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+                if event.get('removed'):
+                    classifications.pop(event['fbUid'], None)
+                    continue
+                classifications[event['fbUid']] = {
+                    'classification': event['classification'],
+                    'problem_dates': event.get('problem_dates', [])
+                }
+            except (ValueError, KeyError) as e:
+                logging.error(f"저널의 {line_number}번째 줄을 읽을 수 없습니다: {journal_file}. 오류: {e}")
+    return classifications
+
+
+def load_workbook_classifications(excel_file):
+    """엑셀 파일의 분류 정보를 읽습니다. 파일이 없으면 빈 결과, 읽을 수 없으면 예외가 발생합니다."""
+    if not os.path.exists(excel_file):
+        return {}
+    return {
+        user_id: {'classification': classification, 'problem_dates': problem_dates}
+        for user_id, classification, problem_dates in read_workbook_rows(excel_file)
+    }
+
+
+def export_workbook(excel_file, classifications):
+    """
+    분류 정보를 HistoryManager.updateClassificationsFromExcel 형식(헤더 없음, [fbUid, "분류_날짜,날짜"])의
+    엑셀로 저장합니다. 임시 파일에 쓴 뒤 교체하므로 중간에 종료되어도 기존 파일은 남습니다.
+    """
+    wb = Workbook()
+    ws = wb.active
+    for user_id, data in classifications.items():
+        ws.append([user_id, f"{data['classification']}_{','.join(data['problem_dates'])}"])
+    temp_file = f"{excel_file}.tmp"
+    wb.save(temp_file)
+    with open(temp_file, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(temp_file, excel_file)
+
+
+class ClassificationJournal:
+    """
+    분류 결정을 한 줄씩 추가하고 바로 디스크에 기록(fsync)하는 주간 분류 저널
+
+    엑셀 파일은 compact()에서만 다시 쓰며, 그 전에 종료되어도 다음 시작 때
+    recover()로 저널을 다시 적용해 엑셀을 만듭니다.
+    """
+
+    def __init__(self, excel_file):
+        self.excel_file = str(excel_file)
+        self.journal_file = journal_path_for(self.excel_file)
+        self._file = open(self.journal_file, 'a', encoding='utf-8')
+        # 쓰는 도중 종료되어 줄바꿈 없이 잘린 줄이 있으면 다음 이벤트가 붙지 않도록 줄을 끝냄
+        if self._ends_mid_line():
+            self._file.write('\n')
+            self._file.flush()
+
+    def _ends_mid_line(self):
+        if not self.has_events():
+            return False
+        with open(self.journal_file, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+
+    def append(self, user_id, classification, problem_dates):
+        """분류 결정 하나를 저널 끝에 추가합니다. (파일 크기와 상관없이 일정한 시간)"""
+        event = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'fbUid': user_id,
+            'classification': classification,
+            'problem_dates': list(problem_dates)
+        }
+        self._write(event)
+
+    def remove(self, user_id):
+        """사용자의 분류를 취소하는 이벤트를 추가합니다. (결정 되돌리기)"""
+        self._write({
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'fbUid': user_id,
+            'removed': True
+        })
+
+    def _write(self, event):
+        self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def has_events(self):
+        return os.path.getsize(self.journal_file) > 0
+
+    def load(self):
+        """엑셀 파일의 분류 정보에 저널 이벤트를 적용한 결과를 반환합니다."""
+        return replay_journal(self.journal_file, load_workbook_classifications(self.excel_file))
+
+    def compact(self):
+        """저널을 엑셀 파일에 반영하고 저널을 비웁니다. 저장한 사용자 수를 반환합니다."""
+        classifications = self.load()
+        export_workbook(self.excel_file, classifications)
+        # 엑셀 교체 후 저널을 비우므로, 그 사이에 종료되어도 다시 적용하면 같은 결과
+        self._file.truncate(0)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        logging.info(f"분류 저널 반영: {self.excel_file} ({len(classifications)}명)")
+        return len(classifications)
+
+    def recover(self):
+        """
+        이전 실행에서 엑셀에 반영하지 못한 저널이 남아 있으면 반영합니다.
+        반영 여부와 상관없이 현재 분류 정보를 반환합니다.
+        """
+        if self.has_events():
+            logging.info(f"반영되지 않은 분류 저널을 복구합니다: {self.journal_file}")
+            self.compact()
+        return self.load()
+
+    def close(self):
+        self._file.close()
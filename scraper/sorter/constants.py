@@ -1,3 +1,9 @@
 IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png']
 CLASSIFICATIONS = ['NOLOOK', 'BLACK', 'NAKED', 'MALE']
 SETTINGS_FILE = 'settings.json'
+PREFETCH_COUNT = 3  # 현재 이미지 앞뒤로, 그리고 다음 사용자 폴더에서 미리 로드할 이미지 수
+PIXMAP_CACHE_MB = 256  # 화면 크기로 축소한 이미지 캐시의 최대 메모리
+LOADER_THREADS = 2  # 이미지를 디코딩하는 백그라운드 스레드 수
+THUMBNAIL_SIZE = 200  # 그리드 보기 썸네일의 긴 변 길이 (픽셀)
+THUMBNAIL_THREADS = 4  # 썸네일을 만드는 백그라운드 스레드 수
+THUMBNAIL_DIR = '.thumbs'  # 주차 폴더 아래 썸네일 캐시 폴더 이름
@@ -0,0 +1,223 @@
+from PyQt5.QtCore import QThread
+from collections import deque
+import os
+import json
+import shutil
+import logging
+import threading
+
+JOURNAL_FILE = '.file_operations.jsonl'  # 주차 폴더 아래 파일 작업 저널
+TRASH_DIR = '.trash'  # 되돌리기를 위해 삭제할 이미지를 잠시 옮겨두는 폴더
+
+
+class FileBatch:
+    """한 사용자 결정에 대한 파일 작업 묶음 (이미지 이동과 사용자 폴더 삭제)"""
+
+    def __init__(self, batch_id, moves, remove_dirs, trash_dir):
+        self.batch_id = batch_id
+        self.moves = moves  # [(원본 경로, 대상 경로)]
+        self.remove_dirs = remove_dirs
+        self.trash_dir = trash_dir
+
+    def to_dict(self):
+        return {'id': self.batch_id, 'moves': self.moves, 'remove_dirs': self.remove_dirs, 'trash_dir': self.trash_dir}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], [tuple(move) for move in data['moves']], data['remove_dirs'], data['trash_dir'])
+
+    def apply(self):
+        """작업을 실행합니다. 이미 옮겨진 파일은 건너뛰므로 다시 실행해도 같은 결과입니다."""
+        for source, target in self.moves:
+            if not os.path.exists(source):
+                if not os.path.exists(target):
+                    logging.error(f"이동할 이미지가 없습니다: {source}")
+                continue
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(source, target)
+                logging.info(f"이미지 이동: {source} -> {target}")
+            except OSError as e:
+                logging.error(f"이미지 이동 실패: {e}")
+        for folder_path in self.remove_dirs:
+            try:
+                os.rmdir(folder_path)
+                logging.info(f"빈 폴더 삭제: {folder_path}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.error(f"폴더를 삭제할 수 없습니다: {folder_path}. 오류: {e}")
+
+    def revert(self):
+        """실행한 작업을 되돌립니다. 다시 실행해도 같은 결과입니다."""
+        for folder_path in self.remove_dirs:
+            os.makedirs(folder_path, exist_ok=True)
+        for source, target in reversed(self.moves):
+            if os.path.exists(target) and not os.path.exists(source):
+                try:
+                    os.replace(target, source)
+                    logging.info(f"이미지 복원: {target} -> {source}")
+                except OSError as e:
+                    logging.error(f"이미지 복원 실패: {e}")
+        # 이동하면서 만든 빈 폴더 정리 (classified/<사용자>, .trash/<배치>/<사용자>)
+        for folder_path in sorted({os.path.dirname(target) for _, target in self.moves}, reverse=True):
+            try:
+                os.removedirs(folder_path)
+            except OSError:
+                pass
+
+    def purge(self):
+        """되돌릴 수 없게 된 배치의 삭제 이미지를 실제로 지웁니다."""
+        if os.path.exists(self.trash_dir):
+            shutil.rmtree(self.trash_dir, ignore_errors=True)
+            logging.info(f"삭제 이미지 정리: {self.trash_dir}")
+
+
+class FileOperationQueue(QThread):
+    """
+    사용자 결정의 이미지 이동/삭제를 백그라운드에서 실행하는 작업자
+
+    쌓인 결정은 한 번에 꺼내 저널에 한 번 기록(fsync)한 뒤 실행하므로, 도중에 종료되어도
+    다음 시작 때 recover()가 남은 작업을 마칩니다. 삭제할 이미지는 먼저 <주차>/.trash/로 옮기고
+    다음 결정이 실행된 뒤에 지우므로 마지막 결정 하나는 undo_last()로 되돌릴 수 있습니다.
+    """
+
+    def __init__(self, week_dir, parent=None):
+        super().__init__(parent)
+        self.week_dir = week_dir
+        self.journal_file = os.path.join(week_dir, JOURNAL_FILE)
+        self.trash_root = os.path.join(week_dir, TRASH_DIR)
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._stop = False
+        self._last = None  # 되돌릴 수 있는 마지막 배치
+        self._applied = []  # 실행했지만 아직 삭제 이미지를 지우지 않은 배치
+        self._next_id = 1
+        self.recover()
+        self._journal = open(self.journal_file, 'a', encoding='utf-8')
+
+    def recover(self):
+        """이전 실행에서 끝내지 못한 작업을 마치고, 남은 삭제 이미지를 지운 뒤 저널을 비웁니다."""
+        if not os.path.exists(self.journal_file):
+            return
+        batches = {}
+        state = {}
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 쓰는 도중 잘린 줄 (기록되지 않은 작업은 실행되지도 않았음)
+                if record['event'] == 'planned':
+                    for data in record['batches']:
+                        batches[data['id']] = FileBatch.from_dict(data)
+                        state[data['id']] = 'planned'
+                else:
+                    state[record['id']] = record['event']
+
+        for batch_id, batch in batches.items():
+            if state[batch_id] == 'planned':
+                logging.info(f"끝나지 않은 파일 작업을 다시 실행합니다: {batch_id}")
+                batch.apply()
+            elif state[batch_id] == 'reverting':
+                logging.info(f"끝나지 않은 되돌리기를 다시 실행합니다: {batch_id}")
+                batch.revert()
+        # 다시 시작하면 되돌릴 결정이 없으므로 남은 삭제 이미지를 모두 지움
+        shutil.rmtree(self.trash_root, ignore_errors=True)
+        open(self.journal_file, 'w').close()
+
+    def _write(self, records):
+        for record in records:
+            self._journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def submit(self, user_path, moves, delete_paths):
+        """
+        한 사용자의 결정을 예약합니다. moves의 이미지를 옮기고 delete_paths의 이미지를 삭제한 뒤
+        사용자 폴더를 지웁니다. 바로 반환하며 실제 작업은 백그라운드에서 실행됩니다.
+        """
+        with self._cond:
+            batch_id = self._next_id
+            self._next_id += 1
+            trash_dir = os.path.join(self.trash_root, str(batch_id))
+            trash_moves = [(path, os.path.join(trash_dir, os.path.relpath(path, self.week_dir))) for path in delete_paths]
+            batch = FileBatch(batch_id, list(moves) + trash_moves, [user_path], trash_dir)
+            self._queue.append(batch)
+            self._last = batch
+            self._cond.notify_all()
+
+    def undo_last(self):
+        """
+        마지막 결정의 파일 작업을 되돌립니다. 아직 실행 전이면 취소하고, 실행 중이면 끝날 때까지 기다립니다.
+        되돌릴 결정이 있었으면 True를 반환합니다.
+        """
+        with self._cond:
+            batch = self._last
+            if batch is None:
+                return False
+            if batch in self._queue:
+                self._queue.remove(batch)
+                self._last = None
+                return True
+            while self._busy:
+                self._cond.wait()
+            self._last = None
+            self._applied.remove(batch)
+            self._write([{'event': 'reverting', 'id': batch.batch_id}])
+            batch.revert()
+            self._write([{'event': 'reverted', 'id': batch.batch_id}])
+            return True
+
+    def wait_idle(self):
+        """예약된 작업이 모두 끝날 때까지 기다립니다."""
+        with self._cond:
+            while self._queue or self._busy:
+                self._cond.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stop:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batches = list(self._queue)
+                self._queue.clear()
+                self._busy = True
+            try:
+                self._write([{'event': 'planned', 'batches': [batch.to_dict() for batch in batches]}])
+                for batch in batches:
+                    batch.apply()
+                self._write([{'event': 'applied', 'id': batch.batch_id} for batch in batches])
+            except Exception as e:
+                logging.error(f"파일 작업 중 오류 발생: {e}")
+            with self._cond:
+                self._applied.extend(batches)
+                # 마지막 결정을 제외한 배치는 되돌릴 수 없으므로 삭제 이미지를 지움
+                expired = [batch for batch in self._applied if batch is not self._last]
+                self._applied = [batch for batch in self._applied if batch is self._last]
+            for batch in expired:
+                batch.purge()
+            if expired:
+                self._write([{'event': 'purged', 'id': batch.batch_id} for batch in expired])
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def shutdown(self):
+        """남은 작업을 모두 실행하고 삭제 이미지를 지운 뒤 저널을 비웁니다."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self.isRunning():
+            self.wait()
+        else:
+            self.run()
+        for batch in self._applied:
+            batch.purge()
+        self._applied = []
+        self._last = None
+        self._journal.close()
+        open(self.journal_file, 'w').close()
@@ -1,9 +1,15 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QScrollArea, QFileDialog, QInputDialog, QMessageBox, QProgressBar, QTabWidget, QTextEdit
-from PyQt5.QtGui import QPixmap, QKeyEvent, QResizeEvent
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QScrollArea, QFileDialog, QInputDialog, QMessageBox, QProgressBar, QTabWidget, QTextEdit, QStackedWidget, QShortcut
+from PyQt5.QtGui import QKeyEvent, QResizeEvent, QKeySequence
 from PyQt5.QtCore import Qt, QSize
 from image_processor import ImageProcessor
-from utils import load_excel_file, create_new_excel_file, save_to_excel, get_image_files
-from constants import CLASSIFICATIONS, SETTINGS_FILE
+from image_loader import ImageLoader
+from thumbnail_grid import ThumbnailGrid
+from classification_index import open_index, find_history_dir
+from classification_journal import ClassificationJournal
+from file_operations import FileOperationQueue
+from utils import create_new_excel_file, get_image_files
+from constants import (CLASSIFICATIONS, SETTINGS_FILE, PREFETCH_COUNT, PIXMAP_CACHE_MB, LOADER_THREADS,
+                       THUMBNAIL_SIZE, THUMBNAIL_THREADS, THUMBNAIL_DIR)
 import os
 import json
 import logging
@@ -26,9 +32,18 @@ class ImageClassifier(QWidget):
         self.current_user_index = 0
         self.problem_images = set()
         self.current_pixmap = None
+        self.current_pixmap_path = None
+        self.folder_images = {}  # 미리 로드용 사용자 폴더 이미지 목록
         self.excel_file = None
         self.total_images = 0
         self.total_problem_images = 0
+        self.classification_index = None  # 이전 주차 분류 색인 (history/classification_index.sqlite)
+        self.current_week = None
+        self.classification_journal = None  # 분류 결정 저널 (<주차>.journal.jsonl)
+        self.image_processor = None  # 썸네일 생성 작업자
+        self.file_operations = None  # 이미지 이동/삭제 작업자
+        self.last_decision = None  # 되돌릴 수 있는 마지막 결정 (사용자 인덱스, 분류, 문제 이미지)
+        self.grid_mode = False
         
         # history 디렉토리 구조 설정
         try:
@@ -62,6 +77,11 @@ class ImageClassifier(QWidget):
         self.setWindowTitle('Image Classifier')
         self.setGeometry(100, 100, 1000, 800)
 
+        # 이미지 디코딩/축소는 백그라운드 스레드에서 하고 결과는 캐시에서 표시
+        self.image_loader = ImageLoader(PIXMAP_CACHE_MB * 1024 * 1024, LOADER_THREADS, self)
+        self.image_loader.image_ready.connect(self.on_image_ready)
+        self.image_loader.image_failed.connect(self.on_image_failed)
+
         # 메인 레이아웃
         main_layout = QVBoxLayout()
 
@@ -80,7 +100,16 @@ class ImageClassifier(QWidget):
         self.scroll_area.setWidgetResizable(True)
         self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        main_tab_layout.addWidget(self.scroll_area)
+
+        # 그리드 보기 (사용자의 모든 캡처를 썸네일로 표시)
+        self.thumbnail_grid = ThumbnailGrid(THUMBNAIL_SIZE)
+        self.thumbnail_grid.toggled.connect(self.toggle_problem_image)
+        self.thumbnail_grid.currentRowChanged.connect(self.on_grid_row_changed)
+
+        self.view_stack = QStackedWidget()
+        self.view_stack.addWidget(self.scroll_area)
+        self.view_stack.addWidget(self.thumbnail_grid)
+        main_tab_layout.addWidget(self.view_stack)
 
         # 상태 레이블 설정
         status_layout = QHBoxLayout()
@@ -100,6 +129,13 @@ class ImageClassifier(QWidget):
         self.select_folder_button.clicked.connect(self.select_folder)
         main_tab_layout.addWidget(self.select_folder_button)
 
+        self.grid_button = QPushButton('Grid View (G)')
+        self.grid_button.setCheckable(True)
+        self.grid_button.toggled.connect(self.set_grid_mode)
+        main_tab_layout.addWidget(self.grid_button)
+        QShortcut(QKeySequence('G'), self, self.grid_button.toggle)
+        QShortcut(QKeySequence.Undo, self, self.undo_last_decision)
+
         self.save_button = QPushButton('Save to Excel')
         self.save_button.clicked.connect(self.save_to_excel)
         self.save_button.setEnabled(False)
@@ -143,20 +179,62 @@ class ImageClassifier(QWidget):
             
         if folder:
             self.current_folder = folder
-            # 폴더명을 기반으로 엑셀 파일명 생성
-            folder_name = os.path.basename(folder)
-            self.excel_file = os.path.join(folder, f"{folder_name}.xlsx")
+            self.open_classification_index()
+            self.excel_file = self.weekly_excel_file()
             self.load_existing_classifications()
+            self.start_file_operations()
+            self.start_image_processing()
             self.load_user_folders()
             self.save_settings()
-            self.start_image_processing()
 
-    def load_existing_classifications(self):
-        if os.path.exists(self.excel_file):
-            self.classifications = load_excel_file(self.excel_file)
+    def weekly_excel_file(self):
+        """분류 결과를 저장할 주간 엑셀 파일 경로 (history/<주차>/<주차>.xlsx)"""
+        history_dir, week = find_history_dir(self.current_folder)
+        if history_dir is not None and week:
+            history_week_dir = os.path.join(history_dir, week)
         else:
+            history_week_dir = os.path.dirname(os.path.dirname(self.current_folder))
+        return os.path.join(history_week_dir, f"{os.path.basename(history_week_dir)}.xlsx")
+
+    def load_existing_classifications(self):
+        """주간 엑셀과 저널을 읽습니다. 이전 실행에서 반영하지 못한 저널이 있으면 엑셀에 반영합니다."""
+        if self.classification_journal:
+            self.classification_journal.close()
+        self.classification_journal = ClassificationJournal(self.excel_file)
+        try:
+            self.classifications = self.classification_journal.recover()
+        except Exception as e:
+            logging.error(f"분류 저널 복구 중 오류 발생: {e}")
+            self.classifications = {}
+        if not os.path.exists(self.excel_file):
             create_new_excel_file(self.excel_file)
 
+    def open_classification_index(self):
+        """선택한 폴더의 history 디렉토리에서 분류 색인을 열고 바뀐 주간 엑셀만 다시 읽습니다."""
+        history_dir, self.current_week = find_history_dir(self.current_folder)
+        if history_dir is None:
+            history_dir = getattr(self, 'history_dir', None)
+            self.current_week = self.week_dir.name if getattr(self, 'week_dir', None) else None
+        if self.classification_index:
+            self.classification_index.close()
+        self.classification_index = open_index(history_dir)
+
+    def update_history_label(self, user_id):
+        """색인에서 사용자의 이전 주차 분류(최근 3개)를 한 번에 조회해 표시합니다."""
+        history_text = '이전 분류: -'
+        if self.classification_index:
+            try:
+                previous_classifications = [
+                    f"{week.split('-')[0]}: {classification}"
+                    for week, classification, _ in self.classification_index.previous_classifications(
+                        user_id, exclude_week=self.current_week, limit=3)
+                ]
+                if previous_classifications:
+                    history_text = '이전 분류: ' + ' | '.join(previous_classifications)
+            except Exception as e:
+                logging.error(f"이전 분류 데이터 조회 중 오류 발생: {e}")
+        self.history_label.setText(history_text)
+
     def load_user_folders(self):
         self.user_folders = [f for f in os.listdir(self.current_folder) if os.path.isdir(os.path.join(self.current_folder, f))]
         self.user_folders = [f for f in self.user_folders if f not in self.classifications]
@@ -175,11 +253,15 @@ class ImageClassifier(QWidget):
             user_path = os.path.join(self.current_folder, user_folder)
             if os.path.exists(user_path):
                 self.current_images = get_image_files(user_path)
+                self.folder_images[user_path] = list(self.current_images)
                 self.total_images += len(self.current_images)
                 self.current_index = 0
                 self.problem_images.clear()
+                self.update_history_label(user_folder)
                 if self.current_images:
                     self.show_current_image()
+                    if self.grid_mode:
+                        self.show_thumbnails()
                 else:
                     self.delete_empty_folder(user_path)
                     self.next_user()
@@ -190,12 +272,25 @@ class ImageClassifier(QWidget):
             self.save_button.setEnabled(True)
             QMessageBox.information(self, '완료', '모든 사용자 분류가 완료되었습니다.')
 
+    def current_image_path(self):
+        user_folder = self.user_folders[self.current_user_index]
+        return os.path.join(self.current_folder, user_folder, self.current_images[self.current_index])
+
     def show_current_image(self):
         if self.current_images and self.current_index < len(self.current_images):
-            user_folder = self.user_folders[self.current_user_index]
-            image_path = os.path.join(self.current_folder, user_folder, self.current_images[self.current_index])
-            self.current_pixmap = QPixmap(image_path)
-            self.update_image_label()
+            image_path = self.current_image_path()
+            size = self.scroll_area.size()
+            pixmap = self.image_loader.cache.get(image_path, size)
+            if pixmap is not None:
+                self.current_pixmap = pixmap
+                self.current_pixmap_path = image_path
+                self.update_image_label()
+            elif self.current_pixmap and self.current_pixmap_path == image_path:
+                # 창 크기만 바뀐 경우 새 크기로 로드될 때까지 빠르게 늘려서 표시
+                self.image_label.setPixmap(self.current_pixmap.scaled(size, Qt.KeepAspectRatio, Qt.FastTransformation))
+            else:
+                self.image_label.setText('로딩 중...')
+            self.image_loader.prefetch(self.prefetch_paths(), size)
             
             self.problem_label.setText(f"문제 있음: {'예' if self.current_images[self.current_index] in self.problem_images else '아니오'}")
             self.update_progress_label()
@@ -203,14 +298,110 @@ class ImageClassifier(QWidget):
             self.image_label.clear()
             self.problem_label.setText("문제 있음: -")
 
+    def prefetch_paths(self):
+        """현재 이미지, 앞뒤 PREFETCH_COUNT개 이미지, 이웃 사용자 폴더의 첫 이미지들을 로드할 순서대로 반환합니다."""
+        user_path = os.path.join(self.current_folder, self.user_folders[self.current_user_index])
+        paths = [self.current_image_path()]
+        for offset in range(1, PREFETCH_COUNT + 1):
+            for index in (self.current_index + offset, self.current_index - offset):
+                if 0 <= index < len(self.current_images):
+                    paths.append(os.path.join(user_path, self.current_images[index]))
+        
+        # 좌우 방향키로 넘어갈 다음 사용자들과 이전 사용자의 첫 이미지
+        neighbors = list(range(self.current_user_index + 1, self.current_user_index + 1 + PREFETCH_COUNT))
+        neighbors.append(self.current_user_index - 1)
+        for user_index in neighbors:
+            if 0 <= user_index < len(self.user_folders):
+                folder_path = os.path.join(self.current_folder, self.user_folders[user_index])
+                images = self.get_folder_images(folder_path)
+                if images:
+                    paths.append(os.path.join(folder_path, images[0]))
+        return paths
+
+    def get_folder_images(self, folder_path):
+        if folder_path not in self.folder_images:
+            try:
+                self.folder_images[folder_path] = get_image_files(folder_path)
+            except OSError:
+                self.folder_images[folder_path] = []
+        return self.folder_images[folder_path]
+
+    def on_image_ready(self, path, size):
+        """백그라운드 로드가 끝난 이미지가 지금 보여줄 이미지이면 표시합니다."""
+        if not self.current_images or self.current_index >= len(self.current_images):
+            return
+        if path == self.current_image_path() and size == self.scroll_area.size():
+            self.current_pixmap = self.image_loader.cache.get(path, size)
+            self.current_pixmap_path = path
+            self.update_image_label()
+
+    def on_image_failed(self, path, size):
+        """지금 보여줄 이미지를 읽을 수 없으면 로딩 문구 대신 오류 문구를 표시합니다."""
+        if not self.current_images or self.current_index >= len(self.current_images):
+            return
+        if path == self.current_image_path() and size == self.scroll_area.size():
+            self.current_pixmap = None
+            self.current_pixmap_path = None
+            self.image_label.setText(f"이미지를 읽을 수 없습니다: {os.path.basename(path)}")
+
+    def set_grid_mode(self, enabled):
+        """한 장씩 보기와 썸네일 그리드 보기를 전환합니다."""
+        self.grid_mode = enabled
+        self.view_stack.setCurrentWidget(self.thumbnail_grid if enabled else self.scroll_area)
+        if enabled:
+            self.show_thumbnails()
+            self.thumbnail_grid.setFocus()
+        else:
+            self.show_current_image()
+            self.setFocus()
+
+    def show_thumbnails(self):
+        """현재 사용자의 모든 이미지를 그리드에 표시하고, 없는 썸네일은 먼저 만들도록 요청합니다."""
+        if not self.current_images or self.current_user_index >= len(self.user_folders):
+            self.thumbnail_grid.set_images([], set())
+            return
+        user_path = os.path.join(self.current_folder, self.user_folders[self.current_user_index])
+        self.thumbnail_grid.set_images(self.current_images, self.problem_images)
+        if not self.image_processor:
+            return
+        missing = []
+        for image in self.current_images:
+            image_path = os.path.join(user_path, image)
+            thumb_path = self.image_processor.cached_thumbnail(image_path)
+            if thumb_path:
+                self.thumbnail_grid.set_thumbnail(image, thumb_path)
+            else:
+                missing.append(image_path)
+        self.image_processor.request(missing)
+
+    def on_thumbnail_ready(self, image_path):
+        """현재 그리드에 있는 이미지의 썸네일이 만들어지면 표시합니다."""
+        if not self.grid_mode or not self.current_images or self.current_user_index >= len(self.user_folders):
+            return
+        user_path = os.path.join(self.current_folder, self.user_folders[self.current_user_index])
+        if os.path.dirname(image_path) == user_path:
+            thumb_path = self.image_processor.cached_thumbnail(image_path)
+            if thumb_path:
+                self.thumbnail_grid.set_thumbnail(os.path.basename(image_path), thumb_path)
+
+    def on_grid_row_changed(self, row):
+        # 그리드에서 고른 이미지를 한 장씩 보기로 돌아갔을 때 보여줌
+        if 0 <= row < len(self.current_images):
+            self.current_index = row
+
+    def toggle_problem_image(self, image):
+        if image in self.problem_images:
+            self.problem_images.remove(image)
+        else:
+            self.problem_images.add(image)
+            self.total_problem_images += 1
+        self.thumbnail_grid.set_problem(image, image in self.problem_images)
+        if self.current_images and self.current_index < len(self.current_images) and self.current_images[self.current_index] == image:
+            self.problem_label.setText(f"문제 있음: {'예' if image in self.problem_images else '아니오'}")
+
     def update_image_label(self):
         if self.current_pixmap:
-            scaled_pixmap = self.current_pixmap.scaled(
-                self.scroll_area.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
+            self.image_label.setPixmap(self.current_pixmap)
 
     def update_progress_label(self):
         total = len(self.user_folders)
@@ -239,51 +430,61 @@ class ImageClassifier(QWidget):
             return
 
     def finalize_current_folder(self, classification=None):
+        user_folder = self.user_folders[self.current_user_index]
+        moves = []
         if classification:
-            # 원본 폴더 경로
-            user_folder = self.user_folders[self.current_user_index]
+            # 문제가 있는 이미지만 주차 폴더의 classified/<사용자>로 이동
             source_path = os.path.join(self.current_folder, user_folder)
-            
-            # classified 폴더 경로 (상위 디렉토리의 classified 폴더)
-            history_week_dir = os.path.dirname(os.path.dirname(self.current_folder))
-            classified_dir = os.path.join(history_week_dir, 'classified', user_folder)
-            
-            # classified 디렉토리 생성
-            os.makedirs(classified_dir, exist_ok=True)
-            
-            # 문제가 있는 이미지만 classified 폴더로 이동
-            for image in self.problem_images:
-                source_file = os.path.join(source_path, image)
-                target_file = os.path.join(classified_dir, image)
-                try:
-                    os.rename(source_file, target_file)
-                    logging.info(f"이미지 이동: {source_file} -> {target_file}")
-                except OSError as e:
-                    logging.error(f"이미지 이동 실패: {e}")
-            
-            # 나머지 이미지 삭제
-            self.delete_non_problem_images()
-            
+            classified_dir = os.path.join(os.path.dirname(self.excel_file), 'classified', user_folder)
+            moves = [(os.path.join(source_path, image), os.path.join(classified_dir, image))
+                     for image in sorted(self.problem_images)]
+
+        # 이동과 나머지 이미지 삭제는 백그라운드에서 실행하고 바로 다음 사용자로 넘어감
+        self.delete_non_problem_images(moves)
+
+        if classification:
             # 분류 정보 저장
             self.save_classification(classification)
-        else:
-            self.delete_non_problem_images()
+        self.last_decision = (self.current_user_index, classification, set(self.problem_images))
 
-    def delete_non_problem_images(self):
+    def delete_non_problem_images(self, moves=()):
+        """문제 이미지 이동(moves)과 나머지 이미지 삭제, 빈 사용자 폴더 삭제를 예약합니다."""
         user_folder = self.user_folders[self.current_user_index]
         user_path = os.path.join(self.current_folder, user_folder)
-        for image in self.current_images[:]:
-            if image not in self.problem_images:
-                image_path = os.path.join(user_path, image)
-                try:
-                    os.remove(image_path)
-                    self.current_images.remove(image)
-                    logging.info(f"이미지 삭제: {image_path}")
-                except OSError as e:
-                    logging.error(f"이미지를 삭제할 수 없습니다: {image_path}. 오류: {e}")
-        
-        if not self.current_images:
-            self.delete_empty_folder(user_path)
+        delete_paths = [os.path.join(user_path, image) for image in self.current_images
+                        if image not in self.problem_images]
+        self.file_operations.submit(user_path, moves, delete_paths)
+        self.folder_images.pop(user_path, None)
+
+    def start_file_operations(self):
+        """주차 폴더의 이미지 이동/삭제 작업자를 시작합니다. 이전 실행에서 끝내지 못한 작업은 먼저 마칩니다."""
+        if self.file_operations:
+            self.file_operations.shutdown()
+        self.last_decision = None
+        self.file_operations = FileOperationQueue(os.path.dirname(self.excel_file), self)
+        self.file_operations.start()
+
+    def undo_last_decision(self):
+        """마지막 사용자 결정(이미지 이동/삭제와 분류)을 되돌리고 그 사용자로 돌아갑니다."""
+        if not self.last_decision or not self.file_operations.undo_last():
+            return
+        user_index, classification, problem_images = self.last_decision
+        self.last_decision = None
+        user_id = self.user_folders[user_index]
+        if classification:
+            self.classifications.pop(user_id, None)
+            try:
+                self.classification_journal.remove(user_id)
+            except OSError as e:
+                logging.error(f"분류 저널 기록 중 오류 발생: {e}")
+        logging.info(f"결정 되돌리기: {user_id}")
+
+        self.current_user_index = user_index
+        self.load_images()
+        self.problem_images = set(problem_images)
+        self.show_current_image()
+        if self.grid_mode:
+            self.show_thumbnails()
 
     def delete_empty_folder(self, folder_path):
         try:
@@ -297,6 +498,7 @@ class ImageClassifier(QWidget):
             self.current_user_index += 1
             self.load_images()
         else:
+            self.compact_journal()
             self.generate_report()
             QMessageBox.information(self, '완료', '모든 사용자 분류가 완료되었습니다.')
             self.save_button.setEnabled(True)
@@ -308,13 +510,24 @@ class ImageClassifier(QWidget):
             'classification': classification,
             'problem_dates': problem_dates
         }
-        
-        # excel 파일 경로를 history 주간 폴더로 변경
-        history_week_dir = os.path.dirname(os.path.dirname(self.current_folder))
-        folder_name = os.path.basename(history_week_dir)
-        self.excel_file = os.path.join(history_week_dir, f"{folder_name}.xlsx")
-        
-        save_to_excel(self.excel_file, {user_id: self.classifications[user_id]})
+
+        # 결정마다 저널에 한 줄씩 기록하고, 엑셀은 저장 버튼/분류 완료/종료 시 저널을 반영해 만듦
+        try:
+            self.classification_journal.append(user_id, classification, problem_dates)
+        except OSError as e:
+            logging.error(f"분류 저널 기록 중 오류 발생: {e}")
+            QMessageBox.critical(self, '오류', '분류 결과를 저장하지 못했습니다.')
+
+    def compact_journal(self):
+        """저널의 분류 결정을 주간 엑셀에 반영합니다. 성공하면 True를 반환합니다."""
+        if not self.classification_journal:
+            return False
+        try:
+            self.classification_journal.compact()
+            return True
+        except Exception as e:
+            logging.error(f"엑셀 파일 저장 중 오류 발생: {e}")
+            return False
 
     def generate_report(self):
         # 리포트 파일 경로를 history 주간 폴더로 변경
@@ -348,8 +561,13 @@ class ImageClassifier(QWidget):
             logging.error(f"설정 파일 저장 중 오류 발생: {e}")
 
     def start_image_processing(self):
-        self.image_processor = ImageProcessor(self.current_folder)
+        """주차 폴더의 썸네일 캐시(<주차>/.thumbs)를 백그라운드에서 채우기 시작합니다."""
+        if self.image_processor:
+            self.image_processor.shutdown()
+        thumbs_dir = os.path.join(os.path.dirname(self.excel_file), THUMBNAIL_DIR)
+        self.image_processor = ImageProcessor(self.current_folder, thumbs_dir, THUMBNAIL_SIZE, THUMBNAIL_THREADS, self)
         self.image_processor.progress_updated.connect(self.update_progress_bar)
+        self.image_processor.thumbnail_ready.connect(self.on_thumbnail_ready)
         self.image_processor.finished.connect(self.on_image_processing_finished)
         self.image_processor.start()
 
@@ -357,11 +575,15 @@ class ImageClassifier(QWidget):
         self.progress_bar.setValue(value)
 
     def on_image_processing_finished(self):
-        QMessageBox.information(self, '처리 완료', '모든 이미지 처리가 완료되었습니다.')
+        # 분류 중에 끝날 수 있으므로 대화상자 대신 진행바와 로그로만 알림
+        self.progress_bar.setValue(100)
+        logging.info(f"썸네일 생성 완료: {self.current_folder}")
 
     def keyPressEvent(self, event: QKeyEvent):
         if event.key() == Qt.Key_Left:  # 왼쪽 화살표 키
             if self.current_user_index > 0:
+                # 이전 사용자 폴더의 이동/삭제가 끝난 뒤 상태를 확인
+                self.file_operations.wait_idle()
                 prev_folder = self.user_folders[self.current_user_index - 1]
                 prev_path = os.path.join(self.current_folder, prev_folder)
                 
@@ -386,13 +608,7 @@ class ImageClassifier(QWidget):
                 
         elif event.key() == Qt.Key_Space:  # 스페이스바
             if self.current_images and self.current_index < len(self.current_images):
-                current_image = self.current_images[self.current_index]
-                if current_image in self.problem_images:
-                    self.problem_images.remove(current_image)
-                else:
-                    self.problem_images.add(current_image)
-                    self.total_problem_images += 1
-                self.problem_label.setText(f"문제 있음: {'예' if current_image in self.problem_images else '아니오'}")
+                self.toggle_problem_image(self.current_images[self.current_index])
                 
         event.accept()
 
@@ -401,16 +617,28 @@ class ImageClassifier(QWidget):
         if self.current_pixmap:
             self.show_current_image()
 
+    def closeEvent(self, event):
+        self.image_loader.shutdown()
+        if self.image_processor:
+            self.image_processor.shutdown()
+        if self.file_operations:
+            self.file_operations.shutdown()
+        if self.classification_index:
+            self.classification_index.close()
+        if self.classification_journal:
+            if self.classification_journal.has_events():
+                self.compact_journal()
+            self.classification_journal.close()
+        super().closeEvent(event)
+
     def save_to_excel(self):
         if not self.classifications:
             QMessageBox.warning(self, '경고', '저장할 분류 데이터가 없습니다.')
             return
 
-        try:
-            save_to_excel(self.excel_file, self.classifications)
+        if self.compact_journal():
             QMessageBox.information(self, '저장 완료', f'분류 데이터가 {self.excel_file}에 저장되었습니다.')
-        except Exception as e:
-            logging.error(f"엑셀 파일 저장 중 오류 발생: {e}")
+        else:
             QMessageBox.critical(self, '오류', '엑셀 파일 저장 중 오류가 발생했습니다.')
 
     def load_current_folder(self):
@@ -428,44 +656,8 @@ class ImageClassifier(QWidget):
             self.current_image_index = 0
             self.problem_images.clear()
             
-            # 이전 분류 내역 확인
-            user_id = self.current_folder.name
-            history_text = '이전 분류: -'
-            
-            # history 디렉토리의 이전 주차 폴더들을 확인
-            week_folders = sorted([d for d in self.history_dir.iterdir() 
-                                 if d.is_dir() and d.name[0].isdigit()], reverse=True)
-            
-            previous_classifications = []
-            for week_folder in week_folders:
-                if week_folder == self.week_dir:  # 현재 주차는 건너뛰기
-                    continue
-                    
-                excel_file = week_folder / f"{week_folder.name}.xlsx"
-                if excel_file.exists():
-                    try:
-                        wb = openpyxl.load_workbook(excel_file)
-                        ws = wb.active
-                        
-                        for row in ws.iter_rows(values_only=True):
-                            if row and row[0] == user_id:
-                                classification_data = row[1]
-                                if '_' in classification_data:
-                                    classification, dates = classification_data.split('_', 1)
-                                else:
-                                    classification = classification_data
-                                    dates = ''
-                                
-                                week_start = week_folder.name.split('-')[0]
-                                previous_classifications.append(f"{week_start}: {classification}")
-                                break
-                    except Exception as e:
-                        self.logger.error(f"이전 분류 데이터 로드 중 오류 발생: {e}")
-            
-            if previous_classifications:
-                history_text = '이전 분류: ' + ' | '.join(previous_classifications[-3:])  # 최근 3개만 표시
-            
-            self.history_label.setText(history_text)
+            # 이전 분류 내역 확인 (분류 색인 조회)
+            self.update_history_label(self.current_folder.name)
             
             # 날짜 상태 초기화
             self.update_date_status()
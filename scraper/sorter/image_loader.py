@@ -0,0 +1,144 @@
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QRunnable, QSize, QThreadPool, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+import logging
+
+
+class PixmapCache:
+    """화면 크기에 맞춰 축소한 이미지를 (경로, 화면 크기)별로 보관하는 메모리 제한 LRU 캐시"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+
+    @staticmethod
+    def key(path, size):
+        return (path, size.width(), size.height())
+
+    @staticmethod
+    def _cost(pixmap):
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def get(self, path, size):
+        key = self.key(path, size)
+        pixmap = self._items.get(key)
+        if pixmap is not None:
+            self._items.move_to_end(key)
+        return pixmap
+
+    def put(self, path, size, pixmap):
+        key = self.key(path, size)
+        if key in self._items:
+            self.total_bytes -= self._cost(self._items.pop(key))
+        self._items[key] = pixmap
+        self.total_bytes += self._cost(pixmap)
+        # 가장 오래 사용하지 않은 이미지부터 제거 (방금 넣은 이미지는 유지)
+        while self.total_bytes > self.max_bytes and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self.total_bytes -= self._cost(evicted)
+
+    def clear(self):
+        self._items.clear()
+        self.total_bytes = 0
+
+
+def decode_scaled(path, size):
+    """
+    이미지를 화면 크기에 맞게 축소해 디코딩합니다. (UI 스레드 밖에서 호출)
+    원본이 화면보다 훨씬 크면 디코딩 단계에서 먼저 줄여(JPEG은 DCT 축소) 시간을 줄이고,
+    마지막 축소는 기존 화면과 같은 SmoothTransformation으로 합니다.
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid():
+        target = original.scaled(size, Qt.KeepAspectRatio)
+        if original.width() > target.width() * 2:
+            reader.setScaledSize(target * 2)
+    image = reader.read()
+    if image.isNull():
+        logging.error(f"이미지를 읽을 수 없습니다: {path}. 오류: {reader.errorString()}")
+        return image
+    return image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class _LoadSignals(QObject):
+    loaded = pyqtSignal(str, QSize, QImage)
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, path, size, signals, started):
+        super().__init__()
+        self.path = path
+        self.size = size
+        self.signals = signals
+        self.started = started
+
+    def run(self):
+        # 시작한 작업은 prefetch()의 취소 대상이 아님 (UI 스레드의 _on_loaded에서 정리)
+        self.started.add(PixmapCache.key(self.path, self.size))
+        try:
+            image = decode_scaled(self.path, self.size)
+        except Exception as e:
+            logging.error(f"이미지 로드 중 오류 발생: {self.path}. 오류: {e}")
+            image = QImage()
+        self.signals.loaded.emit(self.path, self.size, image)
+
+
+class ImageLoader(QObject):
+    """
+    백그라운드 스레드에서 이미지를 디코딩/축소하고 PixmapCache에 채우는 로더
+
+    image_ready(path, size)는 UI 스레드에서 발생하며, 그때 cache.get(path, size)로 꺼낼 수 있습니다.
+    이미지를 읽을 수 없으면 대신 image_failed(path, size)가 발생합니다.
+    """
+    image_ready = pyqtSignal(str, QSize)
+    image_failed = pyqtSignal(str, QSize)
+
+    def __init__(self, max_cache_bytes, num_threads=2, parent=None):
+        super().__init__(parent)
+        self.cache = PixmapCache(max_cache_bytes)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(num_threads)
+        self._pending = set()
+        self._started = set()  # 작업 스레드가 시작한 로드 (작업 스레드에서 추가)
+        self._signals = _LoadSignals()
+        # 작업 스레드에서 emit하면 큐 연결로 UI 스레드의 _on_loaded가 호출됨
+        self._signals.loaded.connect(self._on_loaded)
+
+    def request(self, path, size, priority=0):
+        """캐시에 없으면 로드를 예약합니다. 이미 캐시에 있으면 True를 반환합니다."""
+        if self.cache.get(path, size) is not None:
+            return True
+        key = PixmapCache.key(path, size)
+        if key not in self._pending:
+            self._pending.add(key)
+            self.pool.start(_LoadTask(path, QSize(size), self._signals, self._started), priority)
+        return False
+
+    def prefetch(self, paths, size):
+        """
+        아직 시작하지 않은 예약을 취소하고 paths를 앞쪽일수록 높은 우선순위로 미리 로드합니다.
+        (빠르게 넘길 때 지나간 이미지의 로드가 쌓이지 않도록)
+        """
+        self.pool.clear()
+        # 이미 시작한 로드는 끝나면 캐시에 들어오므로 다시 예약하지 않음
+        self._pending &= self._started
+        for index, path in enumerate(paths):
+            self.request(path, size, priority=-index)
+
+    def _on_loaded(self, path, size, image):
+        key = PixmapCache.key(path, size)
+        self._pending.discard(key)
+        self._started.discard(key)
+        if image.isNull():
+            self.image_failed.emit(path, size)
+            return
+        # QPixmap은 UI 스레드에서만 만들 수 있음
+        self.cache.put(path, size, QPixmap.fromImage(image))
+        self.image_ready.emit(path, size)
+
+    def shutdown(self):
+        self.pool.clear()
+        self.pool.waitForDone()
@@ -1,21 +1,184 @@
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import QObject, QRunnable, QSize, QThreadPool, pyqtSignal
 from constants import IMAGE_EXTENSIONS
+from image_loader import decode_scaled
 import os
+import hashlib
+import logging
+
+
+def folder_prefix(folder_path):
+    """썸네일 이름 앞에 붙는 폴더별 접두사 (같은 주차의 다른 폴더 썸네일과 구분)"""
+    return hashlib.sha1(os.path.abspath(folder_path).encode('utf-8')).hexdigest()[:12] + '-'
+
+
+def thumbnail_name(image_path, prefix=''):
+    """원본 경로와 수정 시각/크기로 만든 썸네일 파일 이름 (원본이 바뀌면 이름도 바뀜)"""
+    stat = os.stat(image_path)
+    key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+    return prefix + hashlib.sha1(key.encode('utf-8')).hexdigest() + '.jpg'
+
+
+class _ThumbnailSignals(QObject):
+    done = pyqtSignal(str, bool)
+    scanned = pyqtSignal(list, int)  # [(원본 경로, 썸네일 경로)] 중 썸네일이 없는 것, 전체 이미지 수
 
-class ImageProcessor(QThread):
-    progress_updated = pyqtSignal(int)
-    finished = pyqtSignal()
 
-    def __init__(self, folder_path):
+class _ScanTask(QRunnable):
+    """폴더의 이미지를 찾아 썸네일 이름을 계산하고, 이 폴더의 쓰지 않는 썸네일을 지웁니다."""
+
+    def __init__(self, folder_path, thumbs_dir, signals):
         super().__init__()
         self.folder_path = folder_path
+        self.thumbs_dir = thumbs_dir
+        self.signals = signals
+
+    def run(self):
+        missing = []
+        total = 0
+        try:
+            os.makedirs(self.thumbs_dir, exist_ok=True)
+            prefix = folder_prefix(self.folder_path)
+            used = set()
+            for root, dirs, files in os.walk(self.folder_path):
+                for file in files:
+                    if not any(file.lower().endswith(ext) for ext in IMAGE_EXTENSIONS):
+                        continue
+                    image_path = os.path.join(root, file)
+                    try:
+                        name = thumbnail_name(image_path, prefix)
+                    except OSError:
+                        continue
+                    total += 1
+                    used.add(name)
+                    thumb_path = os.path.join(self.thumbs_dir, name)
+                    if not os.path.exists(thumb_path):
+                        missing.append((image_path, thumb_path))
+            self._prune(prefix, used)
+        except Exception as e:
+            logging.error(f"썸네일 대상 이미지를 찾는 중 오류 발생: {self.folder_path}. 오류: {e}")
+        self.signals.scanned.emit(missing, total)
+
+    def _prune(self, prefix, used):
+        # 같은 주차의 다른 폴더 썸네일과 만들고 있는 임시 파일은 건드리지 않음
+        for name in os.listdir(self.thumbs_dir):
+            if name.startswith(prefix) and name.endswith('.jpg') and name not in used:
+                try:
+                    os.remove(os.path.join(self.thumbs_dir, name))
+                except OSError as e:
+                    logging.error(f"오래된 썸네일을 삭제할 수 없습니다: {name}. 오류: {e}")
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, image_path, thumb_path, size, signals):
+        super().__init__()
+        self.image_path = image_path
+        self.thumb_path = thumb_path
+        self.size = size
+        self.signals = signals
 
     def run(self):
-        total_files = sum([len(files) for r, d, files in os.walk(self.folder_path)])
-        processed_files = 0
-        for root, dirs, files in os.walk(self.folder_path):
-            for file in files:
-                if any(file.lower().endswith(ext) for ext in IMAGE_EXTENSIONS):
-                    processed_files += 1
-                    self.progress_updated.emit(int(processed_files / total_files * 100))
-        self.finished.emit()
+        ok = os.path.exists(self.thumb_path)
+        # 우선 요청과 전체 생성이 같은 이미지를 예약했을 수 있고, 분류 후 삭제된 이미지는 건너뜀
+        if not ok and os.path.exists(self.image_path):
+            try:
+                image = decode_scaled(self.image_path, self.size)
+                if not image.isNull():
+                    os.makedirs(os.path.dirname(self.thumb_path), exist_ok=True)
+                    temp_path = f"{self.thumb_path}.{os.getpid()}.{id(self)}.tmp"
+                    ok = image.save(temp_path, 'JPG', 85)
+                    if ok:
+                        os.replace(temp_path, self.thumb_path)
+            except Exception as e:
+                logging.error(f"썸네일 생성 중 오류 발생: {self.image_path}. 오류: {e}")
+                ok = False
+        self.signals.done.emit(self.image_path, ok)
+
+
+class ImageProcessor(QObject):
+    """
+    주차 폴더의 모든 이미지 썸네일을 백그라운드 스레드들에서 미리 만드는 작업자
+
+    썸네일은 <주차>/.thumbs/에 (폴더별 접두사 + 원본 경로+수정 시각) 기준 이름으로 저장되어
+    다음 실행에도 재사용됩니다. 폴더 탐색과 정리도 백그라운드에서 하며, 정리는 이 폴더의 썸네일만 대상입니다.
+    request()로 요청한 이미지(현재 사용자)는 전체 생성보다 먼저 만듭니다.
+    """
+    progress_updated = pyqtSignal(int)
+    thumbnail_ready = pyqtSignal(str)  # 원본 이미지 경로
+    finished = pyqtSignal()
+
+    def __init__(self, folder_path, thumbs_dir, thumbnail_size, num_threads=4, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path
+        self.thumbs_dir = thumbs_dir
+        self.size = QSize(thumbnail_size, thumbnail_size)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(num_threads)
+        self._signals = _ThumbnailSignals()
+        self._signals.done.connect(self._on_done)
+        self._signals.scanned.connect(self._on_scanned)
+        self._prefix = folder_prefix(folder_path)
+        self._closed = False
+        self._remaining = set()  # 전체 생성에서 아직 끝나지 않은 이미지
+        self._total = 0
+        self._requested = set()
+
+    def thumbnail_path(self, image_path):
+        """썸네일 파일 경로. 원본을 읽을 수 없으면 None을 반환합니다."""
+        try:
+            return os.path.join(self.thumbs_dir, thumbnail_name(image_path, self._prefix))
+        except OSError:
+            return None
+
+    def cached_thumbnail(self, image_path):
+        """이미 만들어진 썸네일 경로, 없으면 None을 반환합니다."""
+        thumb_path = self.thumbnail_path(image_path)
+        return thumb_path if thumb_path and os.path.exists(thumb_path) else None
+
+    def start(self):
+        """
+        폴더 탐색, 썸네일 이름 계산, 쓰지 않는 썸네일 정리를 백그라운드에서 시작합니다.
+        끝나면 UI 스레드에서 썸네일이 없는 이미지들을 예약합니다.
+        """
+        self.pool.start(_ScanTask(self.folder_path, self.thumbs_dir, self._signals), 2)
+
+    def _on_scanned(self, missing, total):
+        if self._closed:
+            return
+        self._total = total
+        for image_path, thumb_path in missing:
+            self._remaining.add(image_path)
+            self.pool.start(_ThumbnailTask(image_path, thumb_path, self.size, self._signals), 0)
+        if not self._remaining:
+            self.progress_updated.emit(100)
+            self.finished.emit()
+        else:
+            self._emit_progress()
+
+    def request(self, image_paths):
+        """현재 보고 있는 이미지들의 썸네일을 전체 생성보다 먼저 만듭니다."""
+        for image_path in image_paths:
+            if image_path in self._requested:
+                continue
+            thumb_path = self.thumbnail_path(image_path)
+            if thumb_path and not os.path.exists(thumb_path):
+                self._requested.add(image_path)
+                self.pool.start(_ThumbnailTask(image_path, thumb_path, self.size, self._signals), 1)
+
+    def _emit_progress(self):
+        if self._total:
+            self.progress_updated.emit(int((self._total - len(self._remaining)) / self._total * 100))
+
+    def _on_done(self, image_path, ok):
+        self._requested.discard(image_path)
+        if ok:
+            self.thumbnail_ready.emit(image_path)
+        if image_path in self._remaining:
+            self._remaining.discard(image_path)
+            self._emit_progress()
+            if not self._remaining:
+                self.finished.emit()
+
+    def shutdown(self):
+        self._closed = True
+        self.pool.clear()
+        self.pool.waitForDone()
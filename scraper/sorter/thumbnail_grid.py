@@ -0,0 +1,66 @@
+from PyQt5.QtWidgets import QListWidget, QListWidgetItem, QListView
+from PyQt5.QtGui import QColor, QIcon, QPixmap
+from PyQt5.QtCore import Qt, QSize, pyqtSignal
+
+PROBLEM_COLOR = QColor(255, 120, 120)
+
+
+class ThumbnailGrid(QListWidget):
+    """
+    한 사용자의 모든 캡처를 썸네일로 보여주는 그리드
+
+    클릭, 스페이스/엔터(선택한 이미지), 숫자 1~9(N번째 이미지)로 문제 이미지 여부를 바꾸며
+    toggled(파일 이름)을 발생시킵니다. 좌우 방향키는 사용자 이동에 쓰도록 부모에게 넘깁니다.
+    """
+    toggled = pyqtSignal(str)
+
+    def __init__(self, thumbnail_size, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setIconSize(QSize(thumbnail_size, thumbnail_size))
+        self.setGridSize(QSize(thumbnail_size + 24, thumbnail_size + 40))
+        self.setResizeMode(QListView.Adjust)
+        self.setMovement(QListView.Static)
+        self.setWrapping(True)
+        self.setSelectionMode(QListWidget.SingleSelection)
+        self.itemClicked.connect(lambda item: self.toggled.emit(item.data(Qt.UserRole)))
+        self._items = {}
+
+    def set_images(self, image_names, problem_images):
+        self.clear()
+        self._items = {}
+        for number, name in enumerate(image_names, 1):
+            item = QListWidgetItem(f"{number}. {name}")
+            item.setData(Qt.UserRole, name)
+            item.setTextAlignment(Qt.AlignHCenter)
+            self.addItem(item)
+            self._items[name] = item
+            self.set_problem(name, name in problem_images)
+        if image_names:
+            self.setCurrentRow(0)
+
+    def set_thumbnail(self, name, thumb_path):
+        item = self._items.get(name)
+        if item is not None:
+            item.setIcon(QIcon(QPixmap(thumb_path)))
+
+    def set_problem(self, name, is_problem):
+        item = self._items.get(name)
+        if item is not None:
+            item.setBackground(PROBLEM_COLOR if is_problem else QColor(0, 0, 0, 0))
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        if key in (Qt.Key_Left, Qt.Key_Right):
+            event.ignore()
+        elif key in (Qt.Key_Space, Qt.Key_Return, Qt.Key_Enter):
+            item = self.currentItem()
+            if item is not None:
+                self.toggled.emit(item.data(Qt.UserRole))
+        elif Qt.Key_1 <= key <= Qt.Key_9:
+            row = key - Qt.Key_1
+            if row < self.count():
+                self.setCurrentRow(row)
+                self.toggled.emit(self.item(row).data(Qt.UserRole))
+        else:
+            super().keyPressEvent(event)